@@ -0,0 +1,174 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+import click
+
+from tmetrics_wrapper.benchmark.generators import generate_config, generate_task_definition
+from tmetrics_wrapper.benchmark.mock_server import (
+    MockSettings,
+    MockTMetricsServer,
+    RequestRecord,
+)
+
+PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_PATH = os.path.join(PACKAGE_PATH, "tmetrics_wrapper.py")
+SOURCE_PATH = os.path.join(PACKAGE_PATH, "src")
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class CommandResult:
+    command: str
+    exit_code: int
+    duration_sec: float
+    output: str
+
+
+def run_cli(*args) -> CommandResult:
+    """Run the cli in a separate process, so it does not share the GIL with the mock server."""
+    env = {**os.environ, "PYTHONPATH": SOURCE_PATH}
+    start = time.perf_counter()
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, CLI_PATH, *args], capture_output=True, text=True, env=env, check=False
+    )
+    return CommandResult(args[0], process.returncode, time.perf_counter() - start, process.stdout + process.stderr)
+
+
+def run_end_to_end(  # noqa: PLR0913
+    settings: MockSettings,
+    task_count: int,
+    day_count: int,
+    concurrency: int,
+    rate_limit: float,
+    max_retries: int,
+    work_dir: str,
+) -> tuple[list[CommandResult], MockTMetricsServer]:
+    """Run ``init-config`` and ``run`` against a fresh mock server and return their results and the stopped server."""
+    config_path = os.path.join(work_dir, "config.json")
+    tasks_path = os.path.join(work_dir, "tasks.txt")
+    with open(config_path, "w", encoding="utf-8") as file:
+        json.dump(generate_config(settings.project_count), file)
+    with open(tasks_path, "w", encoding="utf-8") as file:
+        file.write(generate_task_definition(task_count, day_count))
+
+    with MockTMetricsServer(settings) as server:
+        shared_args = ["--account-id", "1", "--user-token", "token", "--host", server.url, "-y"]
+        shared_args += ["--max-retries", str(max_retries)]
+        result_list = [
+            run_cli("init-config", *shared_args, "--out-file", os.path.join(work_dir, "generated.json")),
+            run_cli(
+                "run",
+                *shared_args,
+                "--tasks-file",
+                tasks_path,
+                "--config-file",
+                config_path,
+                "--concurrency",
+                str(concurrency),
+                "--rate-limit",
+                str(rate_limit),
+                "--no-journal",
+            ),
+        ]
+    return result_list, server
+
+
+def summarize_latency(record_list: list[RequestRecord]) -> dict[str, dict[str, float]]:
+    """Return count and latency percentiles in milliseconds per method and endpoint."""
+    durations: dict[str, list[float]] = {}
+    for record in record_list:
+        durations.setdefault(f"{record.method} {record.endpoint}", []).append(record.duration_sec * 1000)
+    summary = {}
+    for name, duration_list in sorted(durations.items()):
+        cut_points = statistics.quantiles(duration_list, n=100, method="inclusive") if len(duration_list) > 1 else []
+        summary[name] = {"count": len(duration_list)}
+        for percentile in PERCENTILES:
+            summary[name][f"p{percentile}"] = cut_points[percentile - 1] if cut_points else duration_list[0]
+    return summary
+
+
+@click.command()
+@click.option("--tasks", "task_count", default=200, show_default=True, type=click.IntRange(min=1))
+@click.option("--days", "day_count", default=20, show_default=True, type=click.IntRange(min=1))
+@click.option("--concurrency", default=8, show_default=True, type=click.IntRange(min=1))
+@click.option("--rate-limit", default=1000.0, show_default=True, help="--rate-limit passed to the cli.")
+@click.option("--max-retries", default=5, show_default=True, type=click.IntRange(min=0))
+@click.option("--latency", default=0.02, show_default=True, help="Added latency of every response in seconds.")
+@click.option("--latency-jitter", default=0.01, show_default=True)
+@click.option("--error-rate", default=0.0, type=click.FloatRange(0, 1), show_default=True)
+@click.option("--throttle-rate", default=0.0, type=click.FloatRange(0, 1), show_default=True)
+@click.option("--max-requests-per-sec", type=click.FloatRange(min=0, min_open=True))
+@click.option("--retry-after", default=0.1, show_default=True, help="Retry-After of throttled responses in seconds.")
+@click.option("--entry-padding", default=0, type=click.IntRange(min=0), show_default=True)
+@click.option("--out", type=click.Path(dir_okay=False), help="Write the report as JSON to this file.")
+def main(  # noqa: PLR0913
+    task_count,
+    day_count,
+    concurrency,
+    rate_limit,
+    max_retries,
+    latency,
+    latency_jitter,
+    error_rate,
+    throttle_rate,
+    max_requests_per_sec,
+    retry_after,
+    entry_padding,
+    out,
+):
+    """Drive init-config and run against a local mock TMetrics server and report throughput and latency."""
+    settings = MockSettings(
+        latency_sec=latency,
+        latency_jitter_sec=latency_jitter,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        max_requests_per_sec=max_requests_per_sec,
+        retry_after_sec=retry_after,
+        entry_padding=entry_padding,
+    )
+    with tempfile.TemporaryDirectory() as work_dir:
+        result_list, server = run_end_to_end(
+            settings, task_count, day_count, concurrency, rate_limit, max_retries, work_dir
+        )
+
+    record_list = server.records
+    run_result = result_list[-1]
+    pushed_count = len(server.time_entries)
+    report = {
+        "commands": {
+            result.command: {"exit_code": result.exit_code, "duration_sec": result.duration_sec}
+            for result in result_list
+        },
+        "pushed_entries": pushed_count,
+        "entries_per_sec": pushed_count / run_result.duration_sec,
+        "statuses": dict(Counter(f"{record.method} {record.endpoint} {record.status}" for record in record_list)),
+        "latency_ms": summarize_latency(record_list),
+    }
+
+    for result in result_list:
+        click.echo(f"{result.command:<12} exit {result.exit_code}  {result.duration_sec:.2f}s")
+        if result.exit_code:
+            click.echo(result.output[-2000:], err=True)
+    click.echo(f"Pushed {pushed_count} time entries, {report['entries_per_sec']:.1f} entries/s")
+    for name, summary in report["latency_ms"].items():
+        percentiles = "  ".join(f"p{percentile} {summary[f'p{percentile}']:7.2f}ms" for percentile in PERCENTILES)
+        click.echo(f"{name:<20} {summary['count']:6d} requests  {percentiles}")
+    for status, count in sorted(report["statuses"].items()):
+        click.echo(f"{status:<28} {count}")
+
+    if out:
+        with open(out, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
+    if any(result.exit_code for result in result_list):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import random
+from datetime import date, timedelta
+
+from input_parser import DATE_FORMAT
+from time_blocks_planner import AVG_WORKDAY_DURATION_HOUR, Task
+
+DEFAULT_START_DATE = date(2021, 1, 4)
+PROJECT_COUNT = 50
+NOTE_COUNT = 200
+LONG_TASK_PROBABILITY = 0.1
+LONG_TASK_WEIGHT = 10
+MIN_TASK_MINUTES = 5
+
+
+def generate_config(project_count: int = PROJECT_COUNT) -> {}:
+    return {
+        "projects": {
+            f"Project {index}/Client {index % 7}": {"id": 1000 + index, "alias": f"p{index}"}
+            for index in range(project_count)
+        }
+    }
+
+
+def generate_task_specs(
+    task_count: int, day_count: int, split_ratio: float = 0.2, seed: int = 0
+) -> list[tuple[int, str, int, int]]:
+    """Return (minutes, note, project_index, split) tuples that fill every day up to an hour below the average workday.
+
+    ``split_ratio`` of the tasks request an explicit split; about a tenth are LONG_TASK_WEIGHT times longer than others.
+    """
+    rng = random.Random(seed)  # noqa: S311 - reproducible inputs, not security
+    weight_list = []
+    for _ in range(task_count):
+        weight = rng.uniform(0.5, 1.5)
+        if rng.random() < LONG_TASK_PROBABILITY:
+            weight *= LONG_TASK_WEIGHT
+        weight_list.append(weight)
+    minutes_per_weight = day_count * (AVG_WORKDAY_DURATION_HOUR - 1) * 60 / sum(weight_list)
+    spec_list = []
+    for weight in weight_list:
+        minutes = max(MIN_TASK_MINUTES, int(weight * minutes_per_weight))
+        split = rng.randint(2, 5) if rng.random() < split_ratio else 1
+        spec_list.append((minutes, f"Note {rng.randrange(NOTE_COUNT)}", rng.randrange(PROJECT_COUNT), split))
+    return spec_list
+
+
+def generate_task_definition(
+    task_count: int, day_count: int, split_ratio: float = 0.2, seed: int = 0, start_date: date = DEFAULT_START_DATE
+) -> str:
+    end_date = start_date + timedelta(days=day_count - 1)
+    lines = [f"{start_date.strftime(DATE_FORMAT)}-{end_date.strftime(DATE_FORMAT)}"]
+    spec_list = generate_task_specs(task_count, day_count, split_ratio, seed)
+    for index, (minutes, note, project_index, split) in enumerate(spec_list):
+        project = f"$p{project_index}" if index % 2 else f"Project {project_index}/Client {project_index % 7}"
+        lines.append(f"{minutes // 60}:{minutes % 60:02d}|{note}|{project}|{split}")
+    return "\n".join(lines)
+
+
+def generate_task_list(task_count: int, day_count: int, split_ratio: float = 0.2, seed: int = 0) -> list[Task]:
+    return [
+        Task(note, 1000 + project_index, timedelta(minutes=minutes), split)
+        for minutes, note, project_index, split in generate_task_specs(task_count, day_count, split_ratio, seed)
+    ]
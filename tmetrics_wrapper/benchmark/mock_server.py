@@ -0,0 +1,311 @@
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import click
+
+LOG = logging.getLogger(__name__)
+
+TIME_ENTRIES_PATH_PATTERN = re.compile(
+    r"^/api/v3/accounts/(?P<account_id>[^/]+)/timeentries(?:(?P<projects>/projects)|/(?P<entry_id>\d+))?$"
+)
+TIME_ENTRIES_ENDPOINT = "timeentries"
+PROJECTS_ENDPOINT = "projects"
+CLIENT_COUNT = 7
+
+
+@dataclass
+class MockSettings:
+    """Behaviour of the mock server.
+
+    ``error_rate`` and ``throttle_rate`` are the fractions of requests answered with ``error_status`` and 429.
+    ``max_requests_per_sec`` additionally throttles every request above that rate, like the real API does.
+    ``entry_padding`` adds that many bytes to every returned time entry to simulate large payloads.
+    """
+
+    latency_sec: float = 0.0
+    latency_jitter_sec: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = HTTPStatus.SERVICE_UNAVAILABLE
+    throttle_rate: float = 0.0
+    max_requests_per_sec: float | None = None
+    retry_after_sec: float = 1.0
+    project_count: int = 50
+    entry_padding: int = 0
+    seed: int = 0
+
+
+@dataclass
+class RequestRecord:
+    method: str
+    endpoint: str
+    status: int
+    duration_sec: float
+
+
+@dataclass
+class MockState:
+    settings: MockSettings
+    time_entries: list[dict] = field(default_factory=list)
+    records: list[RequestRecord] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    entry_ids: itertools.count = field(default_factory=lambda: itertools.count(1))
+    recent_requests: deque = field(default_factory=deque)
+
+    def __post_init__(self):
+        self.random = random.Random(self.settings.seed)  # noqa: S311 - reproducible faults, not security
+
+
+class MockTMetricsHandler(BaseHTTPRequestHandler):
+    """Serves the subset of the TMetrics v3 API used by TMetricsAPI from the in memory MockState.
+
+    Request records name the endpoint ``timeentries`` also for single time entries, which are addressed by id.
+    Time entries are kept per account, so several clients can share one server.
+    """
+
+    server: "MockTMetricsServer"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # noqa: N802
+        self._handle("GET")
+
+    def do_POST(self):  # noqa: N802
+        self._handle("POST")
+
+    def do_PUT(self):  # noqa: N802
+        self._handle("PUT")
+
+    def do_DELETE(self):  # noqa: N802
+        self._handle("DELETE")
+
+    def log_message(self, format, *args):  # noqa: A002
+        LOG.debug(f"{self.address_string()} {format % args}")
+
+    def _handle(self, method: str):
+        start = time.perf_counter()
+        state = self.server.state
+        settings = state.settings
+        url = urlsplit(self.path)
+        match = TIME_ENTRIES_PATH_PATTERN.match(url.path)
+        endpoint = PROJECTS_ENDPOINT if match and match["projects"] else TIME_ENTRIES_ENDPOINT
+        entry_id = int(match["entry_id"]) if match and match["entry_id"] else None
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        if settings.latency_sec or settings.latency_jitter_sec:
+            time.sleep(settings.latency_sec + state.random.uniform(0, settings.latency_jitter_sec))
+
+        if (
+            not match
+            or (endpoint == PROJECTS_ENDPOINT and method != "GET")
+            or (entry_id is None) != (method in ("GET", "POST"))
+        ):
+            status, payload, headers = HTTPStatus.NOT_FOUND, {"message": "Not found"}, {}
+        elif not self.headers.get("Authorization", "").startswith("Bearer "):
+            status, payload, headers = HTTPStatus.UNAUTHORIZED, {"message": "Missing token"}, {}
+        else:
+            status, payload, headers = self._get_fault(state) or self._dispatch(
+                state, method, endpoint, match["account_id"], entry_id, url, body
+            )
+
+        self._send(status, payload, headers)
+        with state.lock:
+            state.records.append(RequestRecord(method, endpoint, status, time.perf_counter() - start))
+
+    @staticmethod
+    def _get_fault(state: MockState) -> tuple[int, dict, dict] | None:
+        settings = state.settings
+        retry_after = {"Retry-After": str(settings.retry_after_sec)}
+        with state.lock:
+            now = time.monotonic()
+            if settings.max_requests_per_sec:
+                while state.recent_requests and now - state.recent_requests[0] > 1:
+                    state.recent_requests.popleft()
+                if len(state.recent_requests) >= settings.max_requests_per_sec:
+                    return HTTPStatus.TOO_MANY_REQUESTS, {"message": "Rate limit exceeded"}, retry_after
+                state.recent_requests.append(now)
+            roll = state.random.random()
+        if roll < settings.throttle_rate:
+            return HTTPStatus.TOO_MANY_REQUESTS, {"message": "Throttled"}, retry_after
+        if roll < settings.throttle_rate + settings.error_rate:
+            return settings.error_status, {"message": "Injected failure"}, {}
+        return None
+
+    @staticmethod
+    def _dispatch(  # noqa: PLR0913
+        state: MockState, method: str, endpoint: str, account_id: str, entry_id: int | None, url, body: bytes
+    ) -> tuple[int, object, dict]:
+        settings = state.settings
+        if endpoint == PROJECTS_ENDPOINT:
+            return HTTPStatus.OK, _generate_projects(settings.project_count, settings.entry_padding), {}
+        if method == "DELETE":
+            return _delete_entry(state, account_id, entry_id)
+        if method in ("POST", "PUT"):
+            return _store_entry(state, account_id, entry_id, body)
+        return _list_entries(state, account_id, parse_qs(url.query))
+
+    def _send(self, status: int, payload, headers: dict):
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class MockTMetricsServer(ThreadingHTTPServer):
+    """Local stand-in for the TMetrics API, for end to end tests and load tests without network.
+
+    Listens on an ephemeral port by default; use ``url`` as the ``--host`` of the cli.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, settings: MockSettings | None = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), MockTMetricsHandler)
+        self.state = MockState(settings or MockSettings())
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def time_entries(self) -> list[dict]:
+        with self.state.lock:
+            return list(self.state.time_entries)
+
+    @property
+    def records(self) -> list[RequestRecord]:
+        with self.state.lock:
+            return list(self.state.records)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-tmetrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+def _delete_entry(state: MockState, account_id: str, entry_id: int) -> tuple[int, object, dict]:
+    with state.lock:
+        entry_count = len(state.time_entries)
+        state.time_entries = [
+            entry for entry in state.time_entries if (entry["id"], entry["accountId"]) != (entry_id, account_id)
+        ]
+        if len(state.time_entries) == entry_count:
+            return HTTPStatus.NOT_FOUND, {"message": f"Time entry {entry_id} not found"}, {}
+    return HTTPStatus.OK, {}, {}
+
+
+def _store_entry(state: MockState, account_id: str, entry_id: int | None, body: bytes) -> tuple[int, object, dict]:
+    """Create a time entry, or replace the one with ``entry_id``."""
+    try:
+        data = json.loads(body)
+        entry = {
+            "project": {"id": int(data["project"]["id"])},
+            "note": str(data.get("note") or ""),
+            "startTime": datetime.fromisoformat(data["startTime"]).isoformat(),
+            "endTime": datetime.fromisoformat(data["endTime"]).isoformat(),
+            "accountId": account_id,
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        return HTTPStatus.BAD_REQUEST, {"message": f"Invalid time entry: {e!r}"}, {}
+    with state.lock:
+        if entry_id is None:
+            entry["id"] = next(state.entry_ids)
+            state.time_entries.append(entry)
+            return HTTPStatus.OK, entry, {}
+        for index, stored_entry in enumerate(state.time_entries):
+            if (stored_entry["id"], stored_entry["accountId"]) == (entry_id, account_id):
+                entry["id"] = entry_id
+                state.time_entries[index] = entry
+                return HTTPStatus.OK, entry, {}
+    return HTTPStatus.NOT_FOUND, {"message": f"Time entry {entry_id} not found"}, {}
+
+
+def _list_entries(state: MockState, account_id: str, query: dict[str, list[str]]) -> tuple[int, object, dict]:
+    try:
+        start_date = datetime.fromisoformat(query["startDate"][0])
+        end_date = datetime.fromisoformat(query["endDate"][0])
+    except (KeyError, ValueError):
+        return HTTPStatus.BAD_REQUEST, {"message": "startDate and endDate are required"}, {}
+    with state.lock:
+        entry_list = [
+            entry
+            for entry in state.time_entries
+            if entry["accountId"] == account_id and start_date <= datetime.fromisoformat(entry["startTime"]) < end_date
+        ]
+    if state.settings.entry_padding:
+        entry_list = [{**entry, "description": "x" * state.settings.entry_padding} for entry in entry_list]
+    return HTTPStatus.OK, entry_list, {}
+
+
+def _generate_projects(project_count: int, padding: int) -> list[dict]:
+    project_list = []
+    for index in range(project_count):
+        project = {"id": 1000 + index, "name": f"Project {index}", "client": {"name": f"Client {index % CLIENT_COUNT}"}}
+        if padding:
+            project["description"] = "x" * padding
+        project_list.append(project)
+    return project_list
+
+
+@click.command()
+@click.option("--port", default=8080, show_default=True)
+@click.option("--latency", default=0.0, show_default=True, help="Added latency of every response in seconds.")
+@click.option("--latency-jitter", default=0.0, show_default=True, help="Random extra latency up to this many seconds.")
+@click.option("--error-rate", default=0.0, type=click.FloatRange(0, 1), show_default=True)
+@click.option("--throttle-rate", default=0.0, type=click.FloatRange(0, 1), show_default=True)
+@click.option("--max-requests-per-sec", type=click.FloatRange(min=0, min_open=True))
+@click.option("--entry-padding", default=0, type=click.IntRange(min=0), show_default=True)
+@click.option("--projects", "project_count", default=50, type=click.IntRange(min=0), show_default=True)
+def main(  # noqa: PLR0913
+    port, latency, latency_jitter, error_rate, throttle_rate, max_requests_per_sec, entry_padding, project_count
+):
+    """Serve a mock TMetrics API until interrupted."""
+    settings = MockSettings(
+        latency_sec=latency,
+        latency_jitter_sec=latency_jitter,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        max_requests_per_sec=max_requests_per_sec,
+        project_count=project_count,
+        entry_padding=entry_padding,
+    )
+    server = MockTMetricsServer(settings, port=port)
+    click.echo(f"Serving mock TMetrics API on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+import click
+from input_parser import TasksParser
+from period_planning import NUMPY_ENGINE, PYTHON_ENGINE, get_planner_class
+from time_blocks_planner import NotFullyPlannedError, TimeBlocksPlanner
+
+from tmetrics_wrapper.benchmark.generators import (
+    DEFAULT_START_DATE,
+    generate_config,
+    generate_task_definition,
+    generate_task_list,
+)
+
+RESULTS_FORMAT_VERSION = 1
+DEFAULT_REPEAT = 3
+DEFAULT_TIME_TOLERANCE = 1.5
+DEFAULT_MEMORY_TOLERANCE = 1.2
+SIZES = [(50, 5), (500, 60), (3000, 365)]
+QUICK_SIZES = SIZES[:1]
+SPLIT_RATIOS = [0.0, 0.2, 0.8]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    best_sec: float
+    mean_sec: float
+    peak_memory_bytes: int
+
+
+@dataclass
+class Scenario:
+    name: str
+    prepare: Callable[[], Callable[[], object]]
+    """Returns a fresh callable for every measurement, so state mutated by a run is not reused."""
+
+
+def build_scenarios(sizes: list[tuple[int, int]]) -> list[Scenario]:
+    config = generate_config()
+    scenario_list = []
+    for task_count, day_count in sizes:
+        suffix = f"{task_count}x{day_count}"
+        definition = generate_task_definition(task_count, day_count)
+        scenario_list.append(Scenario(f"parse/{suffix}", lambda d=definition: lambda: TasksParser(config).parse(d)))
+        for split_ratio in SPLIT_RATIOS:
+            scenario_list.append(
+                Scenario(
+                    f"split/{suffix}/ratio={split_ratio}",
+                    lambda t=task_count, d=day_count, r=split_ratio: _prepare_split(t, d, r),
+                )
+            )
+        scenario_list.append(Scenario(f"plan/{suffix}", lambda t=task_count, d=day_count: _prepare_plan(t, d)))
+        scenario_list.append(
+            Scenario(f"plan-numpy/{suffix}", lambda t=task_count, d=day_count: _prepare_plan(t, d, NUMPY_ENGINE))
+        )
+        scenario_list.append(Scenario(f"render/{suffix}", lambda t=task_count, d=day_count: _prepare_render(t, d)))
+    return scenario_list
+
+
+def measure(scenario: Scenario, repeat: int) -> BenchmarkResult:
+    durations = []
+    for _ in range(repeat):
+        func = scenario.prepare()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    func = scenario.prepare()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return BenchmarkResult(scenario.name, min(durations), sum(durations) / len(durations), peak)
+
+
+def find_regressions(
+    result_list: list[BenchmarkResult],
+    baseline: {},
+    time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+    memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE,
+) -> list[str]:
+    baseline_results = {result["name"]: result for result in baseline["results"]}
+    regression_list = []
+    for result in result_list:
+        baseline_result = baseline_results.get(result.name)
+        if not baseline_result:
+            continue
+        if result.best_sec > baseline_result["best_sec"] * time_tolerance:
+            regression_list.append(
+                f"{result.name}: {result.best_sec * 1000:.1f}ms vs {baseline_result['best_sec'] * 1000:.1f}ms"
+            )
+        if result.peak_memory_bytes > baseline_result["peak_memory_bytes"] * memory_tolerance:
+            regression_list.append(
+                f"{result.name}: peak {result.peak_memory_bytes / 1024:.0f}KiB "
+                f"vs {baseline_result['peak_memory_bytes'] / 1024:.0f}KiB"
+            )
+    return regression_list
+
+
+def _prepare_split(task_count: int, day_count: int, split_ratio: float) -> Callable[[], object]:
+    task_list = generate_task_list(task_count, day_count, split_ratio)
+    return lambda: TimeBlocksPlanner._split_tasks(task_list, day_count)
+
+
+def _prepare_plan(task_count: int, day_count: int, engine: str = PYTHON_ENGINE) -> Callable[[], object]:
+    planner = _create_planner(task_count, day_count, engine)
+    return lambda: _plan(planner)
+
+
+def _prepare_render(task_count: int, day_count: int) -> Callable[[], object]:
+    planner = _create_planner(task_count, day_count)
+    _plan(planner)
+
+    def _render():
+        with contextlib.redirect_stdout(io.StringIO()):
+            planner.display_current_plan()
+
+    return _render
+
+
+def _create_planner(task_count: int, day_count: int, engine: str = PYTHON_ENGINE) -> TimeBlocksPlanner:
+    start_date, end_date, task_list = TasksParser(generate_config()).parse(
+        generate_task_definition(task_count, day_count, start_date=DEFAULT_START_DATE)
+    )
+    return get_planner_class(engine)(start_date, end_date, task_list)
+
+
+def _plan(planner: TimeBlocksPlanner):
+    with contextlib.suppress(NotFullyPlannedError):
+        planner.plan()
+
+
+@click.command()
+@click.option("--out", type=click.Path(dir_okay=False), help="Write results as JSON to this file.")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), help="Results JSON to compare against.")
+@click.option("--time-tolerance", default=DEFAULT_TIME_TOLERANCE, show_default=True, help="Allowed slowdown factor.")
+@click.option(
+    "--memory-tolerance", default=DEFAULT_MEMORY_TOLERANCE, show_default=True, help="Allowed peak memory growth."
+)
+@click.option("--repeat", default=DEFAULT_REPEAT, type=click.IntRange(min=1), show_default=True)
+@click.option("--quick", is_flag=True, default=False, help="Only run the smallest sizes.")
+@click.option("--filter", "name_filter", default="", help="Only run scenarios whose name contains this text.")
+def main(out, baseline, time_tolerance, memory_tolerance, repeat, quick, name_filter):  # noqa: PLR0913
+    """Benchmark parser, splitter, planner and renderer on synthetic task files."""
+    result_list = []
+    for scenario in build_scenarios(QUICK_SIZES if quick else SIZES):
+        if name_filter not in scenario.name:
+            continue
+        result = measure(scenario, repeat)
+        result_list.append(result)
+        click.echo(
+            f"{result.name:<36} best {result.best_sec * 1000:9.2f}ms  mean {result.mean_sec * 1000:9.2f}ms  "
+            f"peak {result.peak_memory_bytes / 1024:9.0f}KiB"
+        )
+
+    if out:
+        with open(out, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": RESULTS_FORMAT_VERSION,
+                    "created": datetime.now().isoformat(),
+                    "python": platform.python_version(),
+                    "results": [asdict(result) for result in result_list],
+                },
+                file,
+                indent=4,
+            )
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as file:
+            regression_list = find_regressions(result_list, json.load(file), time_tolerance, memory_tolerance)
+        for regression in regression_list:
+            click.echo(f"REGRESSION {regression}", err=True)
+        if regression_list:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,281 @@
 import datetime
+import email.utils
 import logging
+import random
+import re
+import threading
+import time
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
 
-import requests
+from instrumentation import METRICS
+from rate_limiter import RateLimiter
+
+if TYPE_CHECKING:
+    import requests
 
 LOG = logging.getLogger(__name__)
 
 REQUEST_TIMEOUT_SEC = 10
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_FACTOR_SEC = 0.5
+MAX_BACKOFF_SEC = 60
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+ENTRY_ID_PATTERN = re.compile(r"/\d+(?=/|$)")
+
+
+class TMetricsAPIError(SystemExit):
+    """Raised when a request fails permanently or runs out of retries.
+
+    Subclasses SystemExit, so an unhandled failure still ends the cli the same way it always did.
+    """
+
+    @property
+    def status_code(self) -> int | None:
+        """HTTP status of the failed response, None when no response was received."""
+        response = getattr(self.__cause__, "response", None)
+        return response.status_code if response is not None else None
 
 
 class TMetricsAPI:
-    def __init__(self, account_id: int, token: str, host: str):
+    """Client of the TMetrics v3 API for one account.
+
+    Clients of several accounts can share one ``session`` and so its connection pool; close() leaves a shared session
+    open.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        account_id: int,
+        token: str,
+        host: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR_SEC,
+        timeout: float = REQUEST_TIMEOUT_SEC,
+        rate_limiter: RateLimiter | None = None,
+        session: "requests.Session | None" = None,
+    ):
         self._account_id = account_id
         self._host = host
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._timeout = timeout
+        self._rate_limiter = rate_limiter
 
         self._headers = {"Accept": "application/json", "Authorization": f"Bearer {token}"}
+        self._pool_size = pool_size
+        self._session: requests.Session | None = session
+        self._owns_session = session is None
+        self._session_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._session and self._owns_session:
+            self._session.close()
 
-    def get_time_entries(self, start_date: datetime.datetime, end_date: datetime.datetime) -> {}:
+    def get_time_entries(
+        self, start_date: datetime.datetime, end_date: datetime.datetime, timeout: float | None = None
+    ) -> {}:
         params = {"startDate": start_date.isoformat(), "endDate": end_date.isoformat()}
         LOG.debug(f"Getting time entries for params {params}")
-        return self._request_get(url=f"{self._host}/api/v3/accounts/{self._account_id}/timeentries", params=params)
+        return self._request_get(
+            url=f"{self._host}/api/v3/accounts/{self._account_id}/timeentries", params=params, timeout=timeout
+        )
 
-    def get_projects(self) -> {}:
+    def get_projects(self, timeout: float | None = None) -> {}:
         LOG.debug("Getting projects")
-        return self._request_get(url=f"{self._host}/api/v3/accounts/{self._account_id}/timeentries/projects")
+        return self._request_get(
+            url=f"{self._host}/api/v3/accounts/{self._account_id}/timeentries/projects", timeout=timeout
+        )
 
-    def add_time_entry(self, project_id: int, note: str, start_time: datetime.datetime, end_time: datetime.datetime):
-        data = {
+    def add_time_entry(  # noqa: PLR0913
+        self,
+        project_id: int,
+        note: str,
+        start_time: datetime.datetime,
+        end_time: datetime.datetime,
+        timeout: float | None = None,
+    ) -> {}:
+        """Create a time entry and return it as stored by the server, including its id."""
+        data = self._get_time_entry_data(project_id, note, start_time, end_time)
+        LOG.debug(f"Adding time entry with data: {data}")
+        return self._request_post(
+            url=f"{self._host}/api/v3/accounts/{self._account_id}/timeentries", data=data, timeout=timeout
+        )
+
+    def update_time_entry(  # noqa: PLR0913
+        self,
+        entry_id: int,
+        project_id: int,
+        note: str,
+        start_time: datetime.datetime,
+        end_time: datetime.datetime,
+        timeout: float | None = None,
+    ) -> {}:
+        data = self._get_time_entry_data(project_id, note, start_time, end_time)
+        LOG.debug(f"Updating time entry {entry_id} with data: {data}")
+        return self._request_put(
+            url=f"{self._host}/api/v3/accounts/{self._account_id}/timeentries/{entry_id}", data=data, timeout=timeout
+        )
+
+    def delete_time_entry(self, entry_id: int, timeout: float | None = None):
+        LOG.debug(f"Deleting time entry {entry_id}")
+        self._request(
+            "DELETE", url=f"{self._host}/api/v3/accounts/{self._account_id}/timeentries/{entry_id}", timeout=timeout
+        )
+
+    @staticmethod
+    def _get_time_entry_data(
+        project_id: int, note: str, start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> {}:
+        return {
             "project": {"id": project_id},
             "note": note,
             "startTime": start_time.isoformat(),
             "endTime": end_time.isoformat(),
         }
-        LOG.debug(f"Adding time entry with data: {data}")
-        self._request_post(url=f"{self._host}/api/v3/accounts/{self._account_id}/timeentries", data=data)
 
-    def _request_get(self, url: str, params: {} = None) -> {}:
+    def _request_get(self, url: str, params: {} = None, timeout: float | None = None) -> {}:
         LOG.debug(f"Sending GET request for url: {url} with params {params}")
         if not params:
             params = {}
-        try:
-            response = requests.get(url, params=params, headers=self._headers, timeout=REQUEST_TIMEOUT_SEC)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            LOG.exception(e)
-            raise SystemExit(e) from e
-
+        response = self._request("GET", url, params=params, timeout=timeout)
         LOG.debug(f"GET request returned {response}")
         return response.json()
 
-    def _request_post(self, url: str, data: {}) -> {}:
+    def _request_post(self, url: str, data: {}, timeout: float | None = None) -> {}:
         LOG.debug(f"Sending POST request for url: {url} with data {data}")
+        response = self._request("POST", url, json=data, timeout=timeout)
+        LOG.debug(f"POST request returned {response}")
+        return response.json()
+
+    def _request_put(self, url: str, data: {}, timeout: float | None = None) -> {}:
+        LOG.debug(f"Sending PUT request for url: {url} with data {data}")
+        response = self._request("PUT", url, json=data, timeout=timeout)
+        LOG.debug(f"PUT request returned {response}")
+        return response.json() if response.content else {}
+
+    def _request(self, method: str, url: str, timeout: float | None = None, **kwargs) -> "requests.Response":
+        """Send a request through the pooled session, retrying transient failures.
+
+        Connection errors and 5xx responses are only retried for idempotent methods, so a POST that may have
+        reached the server is never sent twice. 429 is always retried since the server did not process the request.
+        """
+        import requests
+
+        session = self._get_session()
+        timeout = timeout or self._timeout
+        endpoint = self._get_endpoint_name(method, url)
+        for attempt in range(self._max_retries + 1):
+            retries_left = attempt < self._max_retries
+            if attempt:
+                METRICS.increment(f"api.retries.{endpoint}")
+            if self._rate_limiter:
+                self._rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, headers=self._headers, timeout=timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                METRICS.increment(f"api.errors.{endpoint}.{e.__class__.__name__}")
+                if retries_left and self._is_retryable_exception(method, e):
+                    LOG.warning(f"{method} {url} failed with {e!r}, retrying ({attempt + 1}/{self._max_retries})")
+                    time.sleep(self._get_backoff(attempt))
+                    continue
+                LOG.exception(e)
+                raise TMetricsAPIError(e) from e
+
+            METRICS.observe(endpoint, time.perf_counter() - start)
+            METRICS.increment(f"api.responses.{endpoint}.{response.status_code}")
+            retry_after = self._get_retry_after(response)
+            if self._rate_limiter:
+                if response.status_code in RETRY_STATUS_CODES:
+                    self._rate_limiter.on_throttle(retry_after)
+                elif response.ok:
+                    self._rate_limiter.on_success()
+
+            if retries_left and self._is_retryable_response(method, response):
+                delay = retry_after
+                if delay is None:
+                    delay = self._get_backoff(attempt)
+                LOG.warning(
+                    f"{method} {url} returned {response.status_code}, "
+                    f"retrying in {delay:.2f}s ({attempt + 1}/{self._max_retries})"
+                )
+                time.sleep(delay)
+                continue
+
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                LOG.exception(e)
+                raise TMetricsAPIError(e) from e
+            return response
+
+        raise AssertionError("unreachable")
+
+    def _get_endpoint_name(self, method: str, url: str) -> str:
+        path = urlsplit(url).path.removeprefix(f"/api/v3/accounts/{self._account_id}/")
+        return f"{method} {ENTRY_ID_PATTERN.sub('/{id}', path)}"
+
+    def _get_backoff(self, attempt: int) -> float:
+        delay = min(MAX_BACKOFF_SEC, self._backoff_factor * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)  # noqa: S311
+
+    @staticmethod
+    def _is_retryable_exception(method: str, exception: "requests.exceptions.RequestException") -> bool:
+        import requests
+
+        if isinstance(exception, requests.exceptions.ConnectTimeout):
+            return True
+        return method in IDEMPOTENT_METHODS and isinstance(
+            exception, requests.exceptions.ConnectionError | requests.exceptions.Timeout
+        )
+
+    @staticmethod
+    def _is_retryable_response(method: str, response: "requests.Response") -> bool:
+        if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            return True
+        return response.status_code in RETRY_STATUS_CODES and method in IDEMPOTENT_METHODS
+
+    @staticmethod
+    def _get_retry_after(response: "requests.Response") -> float | None:
+        retry_after = response.headers.get("Retry-After")
+        if not retry_after:
+            return None
         try:
-            response = requests.post(url, json=data, headers=self._headers, timeout=REQUEST_TIMEOUT_SEC)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            LOG.exception(e)
-            raise SystemExit(e) from e
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                retry_date = email.utils.parsedate_to_datetime(retry_after)
+            except (TypeError, ValueError):
+                return None
+            delay = (retry_date - datetime.datetime.now(tz=retry_date.tzinfo)).total_seconds()
+        return min(MAX_BACKOFF_SEC, max(0.0, delay))
 
-        LOG.debug(f"POST request returned {response}")
+    def _get_session(self) -> "requests.Session":
+        """Create the pooled session on first use, so commands that never reach the API do not import requests."""
+        with self._session_lock:
+            if self._session is None:
+                self._session = create_session(self._pool_size)
+            return self._session
 
-        return response.json()
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> "requests.Session":
+    """Create a session keeping up to ``pool_size`` connections per host alive, with retries left to TMetricsAPI."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from plan_renderer import render_markdown_table
+from push_engine import CREATE_ACTION, DELETE_ACTION, UPDATE_ACTION, PushReport
+
+if TYPE_CHECKING:
+    from api import TMetricsAPI
+    from plan_cache import PlanCache
+    from push_journal import PushJournal
+    from time_blocks_planner import TimeBlocksPlanner
+
+LOG = logging.getLogger(__name__)
+
+REQUIRED_USER_FIELDS = ("account_id", "tasks_file", "config_file")
+TOKEN_ENV_FIELD = "user_token_env"  # noqa: S105 - name of the manifest field, not a token
+
+
+class BatchManifestError(ValueError):
+    """Raised when the batch manifest is unreadable or a user in it is malformed"""
+
+
+@dataclass
+class BatchUser:
+    """A user of a batch manifest. Paths are resolved against the directory of the manifest."""
+
+    name: str
+    account_id: str
+    user_token: str
+    tasks_file: str
+    config_file: str
+
+
+@dataclass
+class BatchUserResult:
+    name: str
+    period_count: int = 0
+    planned_count: int = 0
+    report: PushReport = field(default_factory=PushReport)
+    error: str | None = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None and not self.report.get_failed()
+
+    def to_dict(self) -> {}:
+        succeeded = self.report.get_succeeded()
+        return {
+            "name": self.name,
+            "status": self._get_status(),
+            "periods": self.period_count,
+            "planned": self.planned_count,
+            "pushed": len([result for result in succeeded if result.action == CREATE_ACTION and not result.skipped]),
+            "updated": len([result for result in succeeded if result.action == UPDATE_ACTION]),
+            "deleted": len([result for result in succeeded if result.action == DELETE_ACTION]),
+            "skipped": len(self.report.get_skipped()),
+            "failed": len(self.report.get_failed()),
+            "error": self.error,
+        }
+
+    def _get_status(self) -> str:
+        if self.error:
+            return "error"
+        return "failed" if self.report.get_failed() else "ok"
+
+
+@dataclass
+class BatchUserRun:
+    """Everything a batch keeps per user between parsing, planning and pushing."""
+
+    user: BatchUser
+    api: "TMetricsAPI"
+    journal: "PushJournal | None" = None
+    plan_cache: "PlanCache | None" = None
+    period_list: list = field(default_factory=list)
+    planner_list: list["TimeBlocksPlanner | None"] = field(default_factory=list)
+    result: BatchUserResult = field(init=False)
+
+    def __post_init__(self):
+        self.result = BatchUserResult(self.user.name)
+
+    def fail(self, error: str):
+        LOG.error(f"{self.user.name}: {error}")
+        self.result.error = error
+
+    def close(self):
+        if self.journal:
+            self.journal.close()
+        self.api.close()
+
+
+def load_manifest(manifest_path: str) -> list[BatchUser]:
+    """Read the ``users`` of a manifest like:
+
+    {"users": [{"name": "alice", "account_id": 1, "user_token_env": "ALICE_TOKEN", "tasks_file": "alice.txt",
+    "config_file": "config.json"}]}
+
+    The token is given either directly as ``user_token`` or as the name of an environment variable holding it. Every
+    user needs their own tasks file.
+    """
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError) as e:
+        raise BatchManifestError(f"Cannot read manifest {manifest_path}: {e}") from e
+
+    user_definitions = manifest.get("users") if isinstance(manifest, dict) else None
+    if not isinstance(user_definitions, list) or not user_definitions:
+        raise BatchManifestError(f"Manifest {manifest_path} has no users.")
+
+    base_path = os.path.dirname(os.path.abspath(manifest_path))
+    user_list: list[BatchUser] = []
+    problems: list[str] = []
+    for index, definition in enumerate(user_definitions):
+        try:
+            user_list.append(_parse_user(definition, index, base_path))
+        except BatchManifestError as e:
+            problems.append(str(e))
+
+    names = [user.name for user in user_list]
+    problems.extend(f"User {name!r} is defined multiple times." for name in sorted(set(names)) if names.count(name) > 1)
+    # The journal and plan cache of a user are kept next to their tasks file, so users cannot share one.
+    tasks_files = [user.tasks_file for user in user_list]
+    problems.extend(
+        f"Tasks file {tasks_file} is used by multiple users."
+        for tasks_file in sorted(set(tasks_files))
+        if tasks_files.count(tasks_file) > 1
+    )
+    if problems:
+        raise BatchManifestError(f"Invalid manifest {manifest_path}:\n" + "\n".join(problems))
+    LOG.debug(f"Loaded {len(user_list)} users from {manifest_path}")
+    return user_list
+
+
+def render_batch_summary(result_list: list[BatchUserResult]) -> str:
+    summary_list = [result.to_dict() for result in result_list]
+    column_names = ("name", "status", "periods", "planned", "pushed", "updated", "deleted", "skipped", "failed")
+    return render_markdown_table(
+        [(column_name, [str(summary[column_name]) for summary in summary_list]) for column_name in column_names]
+    )
+
+
+def _parse_user(definition, index: int, base_path: str) -> BatchUser:
+    if not isinstance(definition, dict):
+        raise BatchManifestError(f"User {index} is not an object.")
+    name = str(definition.get("name") or index)
+    missing = [field_name for field_name in REQUIRED_USER_FIELDS if not definition.get(field_name)]
+    if missing:
+        raise BatchManifestError(f"User {name!r} is missing {', '.join(missing)}.")
+
+    token = definition.get("user_token")
+    if not token and definition.get(TOKEN_ENV_FIELD):
+        token = os.environ.get(definition[TOKEN_ENV_FIELD])
+        if not token:
+            raise BatchManifestError(f"User {name!r}: environment variable {definition[TOKEN_ENV_FIELD]} is not set.")
+    if not token:
+        raise BatchManifestError(f"User {name!r} has neither user_token nor {TOKEN_ENV_FIELD}.")
+
+    return BatchUser(
+        name=name,
+        account_id=str(definition["account_id"]),
+        user_token=token,
+        tasks_file=os.path.join(base_path, definition["tasks_file"]),
+        config_file=os.path.join(base_path, definition["config_file"]),
+    )
@@ -1,24 +1,129 @@
 import logging
+from collections.abc import Iterable, Iterator
 from datetime import date, datetime, timedelta
 
+from project_config import ProjectIndex
 from time_blocks_planner import Task
 
 LOG = logging.getLogger(__name__)
 
 DATE_FORMAT = "%d.%m.%Y"
-ALIAS_PREFIX = "$"
+TASK_DEFINITION_SEPARATOR = "---"
+STRING_SOURCE_NAME = "<string>"
+
+
+class TaskParsingError(ValueError):
+    """Raised when a task definition is invalid, points at the offending line"""
+
+    def __init__(self, message: str, source_name: str = STRING_SOURCE_NAME, line_number: int | None = None):
+        super().__init__(message)
+        self.message = message
+        self.source_name = source_name
+        self.line_number = line_number
+
+    def __str__(self):
+        if self.line_number is None:
+            return f"{self.source_name}: {self.message}"
+        return f"{self.source_name}:{self.line_number}: {self.message}"
+
+
+class AggregatedTaskParsingError(ValueError):
+    """Raised after parsing with collected errors, holds every TaskParsingError found"""
+
+    def __init__(self, errors: list[TaskParsingError]):
+        super().__init__("\n".join(str(error) for error in errors))
+        self.errors = errors
+
+
+class _PeriodBuilder:
+    def __init__(self, line_number: int):
+        self.line_number = line_number
+        self.start_date: date | None = None
+        self.end_date: date | None = None
+        self.task_list: list[Task] = []
+        self.has_header = False
+        self.is_valid = True
 
 
 class TasksParser:
-    def __init__(self, config: {}):
+    def __init__(self, config: {} = None, project_index: ProjectIndex | None = None):
         self.config: {} = config
+        self.project_index = project_index or ProjectIndex.from_config(config)
 
     def parse(self, tasks_definition: str) -> (date, date, [Task]):
         LOG.debug(f"Parsing task definition:\n{tasks_definition}")
-        lines = [line.rstrip() for line in tasks_definition.splitlines()]
-        lines = [line for line in lines if line]
+        period_list = list(self.parse_lines(tasks_definition.splitlines()))
+        if not period_list:
+            raise TaskParsingError("Empty task definition.")
+        LOG.debug("Task file parsed.")
+        return period_list[0]
+
+    def parse_file(self, file_path: str, collect_errors: bool = False) -> Iterator[tuple[date, date, list[Task]]]:
+        """Stream periods from a tasks file, reading it line by line."""
+        with open(file_path, encoding="utf-8") as file:
+            yield from self.parse_lines(file, source_name=file_path, collect_errors=collect_errors)
 
-        date_range = lines[0].split("-")
+    def parse_lines(
+        self,
+        lines: Iterable[str],
+        source_name: str = STRING_SOURCE_NAME,
+        collect_errors: bool = False,
+        first_line_number: int = 1,
+    ) -> Iterator[tuple[date, date, list[Task]]]:
+        """Yield (start_date, end_date, task_list) for every period separated by TASK_DEFINITION_SEPARATOR.
+
+        Errors are raised as TaskParsingError at the first invalid line. With ``collect_errors`` invalid periods are
+        skipped instead and all errors are raised together as AggregatedTaskParsingError once the input is exhausted.
+        ``first_line_number`` is the line of the source the lines start at, for parsing a part of a file.
+        """
+        errors: list[TaskParsingError] = []
+        period = _PeriodBuilder(line_number=first_line_number)
+        for line_number, raw_line in enumerate(lines, start=first_line_number):
+            line = raw_line.strip()
+            if line == TASK_DEFINITION_SEPARATOR:
+                yield from self._finish_period(period, source_name, errors, collect_errors)
+                period = _PeriodBuilder(line_number=line_number + 1)
+            elif line:
+                try:
+                    self._parse_period_line(period, line)
+                except (AttributeError, IndexError, ValueError) as e:
+                    error = TaskParsingError(f"{str(e) or e.__class__.__name__} ({line!r})", source_name, line_number)
+                    period.is_valid = False
+                    if not collect_errors:
+                        raise error from e
+                    errors.append(error)
+        yield from self._finish_period(period, source_name, errors, collect_errors)
+
+        if errors:
+            raise AggregatedTaskParsingError(errors)
+
+    def _finish_period(
+        self, period: _PeriodBuilder, source_name: str, errors: list[TaskParsingError], collect_errors: bool
+    ) -> Iterator[tuple[date, date, list[Task]]]:
+        if not period.has_header:
+            LOG.warning(f"Empty task definition at {source_name}:{period.line_number}, skipping.")
+            return
+        if period.is_valid and not period.task_list:
+            error = TaskParsingError("Empty task list.", source_name, period.line_number)
+            if not collect_errors:
+                raise error
+            errors.append(error)
+            return
+        if period.is_valid:
+            LOG.debug(f"Parsed period {period.start_date} - {period.end_date} ({len(period.task_list)} tasks)")
+            yield period.start_date, period.end_date, period.task_list
+
+    def _parse_period_line(self, period: _PeriodBuilder, line: str):
+        if period.has_header:
+            period.task_list.append(self._parse_task_line(line))
+            return
+
+        period.has_header = True
+        period.start_date, period.end_date = self._parse_date_range(line)
+
+    @staticmethod
+    def _parse_date_range(line: str) -> (date, date):
+        date_range = line.split("-")
         start_date = datetime.strptime(date_range[0], DATE_FORMAT).date()
         end_date = datetime.strptime(date_range[1], DATE_FORMAT).date()
 
@@ -27,17 +132,9 @@ class TasksParser:
 
         LOG.debug(f"Parsed start date: {start_date}")
         LOG.debug(f"Parsed end date: {end_date}")
-
-        task_list: [Task] = [self._parse_task_line(line) for line in lines[1:]]
-
-        if not task_list:
-            raise ValueError("Empty task list.")
-
-        LOG.debug("Task file parsed.")
-        return start_date, end_date, task_list
+        return start_date, end_date
 
     def _parse_task_line(self, line) -> Task:
-        LOG.debug(f"Parsing line: {line}")
         split_line = line.split("|")
         hours = int(split_line[0].split(":")[0])
         try:
@@ -50,31 +147,12 @@ class TasksParser:
             requested_split = int(split_line[3])
         except IndexError:
             requested_split = 1
-        task = Task(
+        return Task(
             note,
             self._get_project_id(project),
             duration=timedelta(hours=hours, minutes=minutes),
             requested_split=requested_split,
         )
-        LOG.debug(f"Line parsed to task: {task}")
-        return task
 
     def _get_project_id(self, project) -> int:
-        LOG.debug(f"Getting project id for {project}")
-        project_id = None
-        if project.startswith(ALIAS_PREFIX):
-            for project_definition in self.config.get("projects").values():
-                if project_definition.get("alias") == project[1:]:
-                    project_id = int(project_definition.get("id"))
-                    LOG.debug(f"Returning project id {project_id} for alias {project}")
-            if not project_id:
-                LOG.error(f"Project id not found for alias {project}")
-                raise ValueError
-        else:
-            try:
-                project_id = int(self.config.get("projects").get(project).get("id"))
-                LOG.debug(f"Returning project id {project_id} project key {project}")
-            except AttributeError:
-                LOG.error(f"Project id not found for {project}.")
-                raise
-        return project_id
+        return self.project_index.get_project_id(project)
@@ -0,0 +1,178 @@
+import bisect
+import contextlib
+import cProfile
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from typing import TypeVar
+
+LOG = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+PERCENTILES = (50, 90, 99)
+
+T = TypeVar("T")
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, cheap to update and to merge across processes."""
+
+    __slots__ = ("bucket_counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def merge(self, other: "Histogram"):
+        self.bucket_counts = [
+            count + other_count for count, other_count in zip(self.bucket_counts, other.bucket_counts, strict=True)
+        ]
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def get_percentile(self, percentile: float) -> float:
+        """Return the upper bound of the bucket holding the percentile, or the maximum for the last bucket."""
+        threshold = self.count * percentile / 100
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.bucket_counts, strict=False):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> {}:
+        bucket_names = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            **{f"p{percentile}_ms": self.get_percentile(percentile) for percentile in PERCENTILES},
+            "buckets": {name: count for name, count in zip(bucket_names, self.bucket_counts, strict=True) if count},
+        }
+
+
+class Metrics:
+    """Process wide phase timers, counters and latency histograms.
+
+    Updates are thread safe. A Metrics object can be pickled, e.g. to send what a worker process recorded back to
+    the parent, which merges it into its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.phase_seconds: Counter[str] = Counter()
+        self.phase_calls: Counter[str] = Counter()
+        self.counters: Counter[str] = Counter()
+        self.histograms: dict[str, Histogram] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Time a block, or a function when used as a decorator. Repeated phases add up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def timed_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yield from the iterable, adding the time spent producing each item to the phase."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add_phase(name, time.perf_counter() - start)
+            yield item
+
+    def add_phase(self, name: str, seconds: float):
+        with self._lock:
+            self.phase_seconds[name] += seconds
+            self.phase_calls[name] += 1
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def add_counters(self, counters: Counter[str]):
+        with self._lock:
+            self.counters.update(counters)
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds * 1000)
+
+    def merge(self, other: "Metrics"):
+        with self._lock:
+            self.phase_seconds.update(other.phase_seconds)
+            self.phase_calls.update(other.phase_calls)
+            self.counters.update(other.counters)
+            for name, histogram in other.histograms.items():
+                self.histograms.setdefault(name, Histogram()).merge(histogram)
+
+    def to_dict(self) -> {}:
+        with self._lock:
+            return {
+                "phases": {
+                    name: {"seconds": seconds, "calls": self.phase_calls[name]}
+                    for name, seconds in sorted(self.phase_seconds.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "latency": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+            }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+METRICS = Metrics()
+
+
+@contextlib.contextmanager
+def profile_run(metrics_path: str | None = None, cprofile_path: str | None = None):
+    """Record METRICS of the wrapped block into ``metrics_path`` as JSON and its cProfile stats into ``cprofile_path``.
+
+    Files are written even when the block fails or exits, since that is usually when they are needed.
+    """
+    METRICS.reset()
+    profiler = cProfile.Profile() if cprofile_path else None
+    if profiler:
+        profiler.enable()
+    try:
+        with METRICS.phase("total"):
+            yield METRICS
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+            LOG.info(f"Wrote cProfile stats to {cprofile_path}, inspect them with: python -m pstats {cprofile_path}")
+        if metrics_path:
+            with open(metrics_path, "w", encoding="utf-8") as file:
+                json.dump(METRICS.to_dict(), file, indent=4)
+            LOG.info(f"Wrote profile to {metrics_path}")
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import sqlite3
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+from api import TMetricsAPI
+from time_entries import parse_datetime
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_SYNC_CONCURRENCY = 4
+SETTLED_AFTER_TIMEDELTA = timedelta(days=3)
+UNSETTLED_MAX_AGE_TIMEDELTA = timedelta(minutes=15)
+SETTLED_MAX_AGE_TIMEDELTA = timedelta(days=7)
+PROJECTS_MAX_AGE_TIMEDELTA = timedelta(days=1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS time_entries (
+    account_id TEXT NOT NULL,
+    window_start TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS time_entries_start ON time_entries (account_id, start_time);
+CREATE INDEX IF NOT EXISTS time_entries_window ON time_entries (account_id, window_start);
+CREATE TABLE IF NOT EXISTS sync_windows (
+    account_id TEXT NOT NULL,
+    window_start TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    stale INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, window_start)
+);
+CREATE TABLE IF NOT EXISTS projects (
+    account_id TEXT PRIMARY KEY,
+    fetched_at TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+
+class LocalStore:
+    """SQLite mirror of an account's time entries and projects.
+
+    Time entries are synced in fixed, calendar aligned windows of ``window_days`` days that are fetched concurrently.
+    A window is refetched only when it is missing, was invalidated by a push, or may still change: windows that ended
+    more than SETTLED_AFTER_TIMEDELTA before their last fetch are considered settled and expire after
+    SETTLED_MAX_AGE_TIMEDELTA, the others expire after UNSETTLED_MAX_AGE_TIMEDELTA, so edits made to past weeks in
+    TMetrics are eventually seen. With ``refresh`` every window fetched before the store was opened is outdated, which
+    refetches each one once. In offline mode nothing is fetched and only stored data is returned.
+
+    Exposes the same read methods as TMetricsAPI, so it can be used in its place.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        path: str,
+        api: TMetricsAPI | None,
+        account_id: str,
+        window_days: int = DEFAULT_WINDOW_DAYS,
+        concurrency: int = DEFAULT_SYNC_CONCURRENCY,
+        offline: bool = False,
+        refresh: bool = False,
+    ):
+        self._api = api
+        self._account_id = str(account_id)
+        self._window_days = window_days
+        self._concurrency = concurrency
+        self._offline = offline or api is None
+        self._refreshed_before = datetime.now() if refresh else None
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def get_time_entries(self, start_date: datetime, end_date: datetime) -> list[dict]:
+        self.sync(start_date.date(), (end_date - timedelta(microseconds=1)).date())
+        rows = self._connection.execute(
+            "SELECT payload FROM time_entries WHERE account_id = ? AND start_time >= ? AND start_time < ? "
+            "ORDER BY start_time",
+            (self._account_id, start_date.isoformat(), end_date.isoformat()),
+        )
+        return [json.loads(payload) for (payload,) in rows]
+
+    def get_projects(self) -> list[dict]:
+        row = self._connection.execute(
+            "SELECT fetched_at, payload FROM projects WHERE account_id = ?", (self._account_id,)
+        ).fetchone()
+        if self._offline or (row and datetime.now() - datetime.fromisoformat(row[0]) < PROJECTS_MAX_AGE_TIMEDELTA):
+            if not row:
+                LOG.warning("No projects stored for this account.")
+                return []
+            return json.loads(row[1])
+
+        project_list = self._api.get_projects()
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO projects (account_id, fetched_at, payload) VALUES (?, ?, ?)",
+                (self._account_id, datetime.now().isoformat(), json.dumps(project_list)),
+            )
+        return project_list
+
+    def sync(self, start_date: date, end_date: date):
+        """Refetch every window overlapping the range that is missing or may be outdated."""
+        window_list = self._get_windows(start_date, end_date)
+        outdated_window_list = self._get_outdated_windows(window_list)
+        if not outdated_window_list:
+            LOG.debug(f"Stored time entries for {start_date} - {end_date} are up to date")
+            return
+        if self._offline:
+            LOG.warning(f"Offline, using stored time entries for {len(outdated_window_list)} outdated windows.")
+            return
+
+        LOG.debug(f"Fetching {len(outdated_window_list)}/{len(window_list)} windows for {start_date} - {end_date}")
+        fetched_at = datetime.now()
+        with ThreadPoolExecutor(max_workers=self._concurrency, thread_name_prefix="sync") as executor:
+            for window_start, entry_list in zip(
+                outdated_window_list, executor.map(self._fetch_window, outdated_window_list), strict=True
+            ):
+                self._store_window(window_start, entry_list, fetched_at)
+
+    def invalidate(self, day_list: Iterable[date]):
+        """Mark windows containing the given days as outdated, e.g. after pushing time entries into them."""
+        window_start_list = {self._get_window_start(day).isoformat() for day in day_list}
+        with self._connection:
+            self._connection.executemany(
+                "UPDATE sync_windows SET stale = 1 WHERE account_id = ? AND window_start = ?",
+                [(self._account_id, window_start) for window_start in window_start_list],
+            )
+
+    def _fetch_window(self, window_start: date) -> list[dict]:
+        start_date = datetime.combine(window_start, time.min)
+        end_date = start_date + timedelta(days=self._window_days)
+        entry_list = self._api.get_time_entries(start_date, end_date)
+        return [entry for entry in entry_list if start_date <= parse_datetime(entry["startTime"]) < end_date]
+
+    def _store_window(self, window_start: date, entry_list: list[dict], fetched_at: datetime):
+        payload_list = [json.dumps(entry, sort_keys=True) for entry in entry_list]
+        checksum = hashlib.sha256("\n".join(payload_list).encode()).hexdigest()
+        with self._connection:
+            row = self._connection.execute(
+                "SELECT checksum FROM sync_windows WHERE account_id = ? AND window_start = ?",
+                (self._account_id, window_start.isoformat()),
+            ).fetchone()
+            if not row or row[0] != checksum:
+                LOG.debug(f"Window {window_start} changed, storing {len(entry_list)} time entries")
+                self._connection.execute(
+                    "DELETE FROM time_entries WHERE account_id = ? AND window_start = ?",
+                    (self._account_id, window_start.isoformat()),
+                )
+                self._connection.executemany(
+                    "INSERT INTO time_entries (account_id, window_start, start_time, payload) VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            self._account_id,
+                            window_start.isoformat(),
+                            parse_datetime(entry["startTime"]).isoformat(),
+                            payload,
+                        )
+                        for entry, payload in zip(entry_list, payload_list, strict=True)
+                    ],
+                )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sync_windows (account_id, window_start, fetched_at, checksum, stale) "
+                "VALUES (?, ?, ?, ?, 0)",
+                (self._account_id, window_start.isoformat(), fetched_at.isoformat(), checksum),
+            )
+
+    def _get_outdated_windows(self, window_list: list[date]) -> list[date]:
+        synced = {
+            window_start: (datetime.fromisoformat(fetched_at), stale)
+            for window_start, fetched_at, stale in self._connection.execute(
+                "SELECT window_start, fetched_at, stale FROM sync_windows WHERE account_id = ?", (self._account_id,)
+            )
+        }
+        now = datetime.now()
+        outdated_window_list = []
+        for window_start in window_list:
+            if window_start.isoformat() not in synced:
+                outdated_window_list.append(window_start)
+                continue
+            fetched_at, stale = synced[window_start.isoformat()]
+            window_end = datetime.combine(window_start + timedelta(days=self._window_days), time.min)
+            settled = fetched_at - window_end > SETTLED_AFTER_TIMEDELTA
+            max_age = SETTLED_MAX_AGE_TIMEDELTA if settled else UNSETTLED_MAX_AGE_TIMEDELTA
+            refreshed = self._refreshed_before is None or fetched_at >= self._refreshed_before
+            if stale or not refreshed or now - fetched_at > max_age:
+                outdated_window_list.append(window_start)
+        return outdated_window_list
+
+    def _get_windows(self, start_date: date, end_date: date) -> list[date]:
+        window_list = []
+        window_start = self._get_window_start(start_date)
+        while window_start <= end_date:
+            window_list.append(window_start)
+            window_start += timedelta(days=self._window_days)
+        return window_list
+
+    def _get_window_start(self, day: date) -> date:
+        ordinal = day.toordinal()
+        return date.fromordinal(ordinal - (ordinal - 1) % self._window_days)
@@ -0,0 +1,177 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from instrumentation import METRICS
+from planner_trace import DEFERRED_SIMILAR, DEFERRED_SLACK, PLACED, SPLIT, TRACE
+from time_blocks_planner import (
+    MAX_TASK_DURATION_TIMEDELTA,
+    OPTIMAL_WORKDAY_SLACK_TIMEDELTA,
+    PLANNING_ITERATIONS,
+    Task,
+    TimeBlocksPlanner,
+    WorkDay,
+)
+
+LOG = logging.getLogger(__name__)
+
+MICROSECOND = timedelta(microseconds=1)
+
+
+class NumpyTimeBlocksPlanner(TimeBlocksPlanner):
+    """TimeBlocksPlanner keeping durations and free time in integer microsecond NumPy arrays.
+
+    Produces exactly the plans of TimeBlocksPlanner. Splitting, sorting by duration and finding the next task that
+    fits are vectorized; only the tasks that are actually placed or deferred are visited in Python, so scanning past
+    the tasks scheduled earlier no longer costs a Python iteration each, which dominates long ranges with many tasks.
+    """
+
+    @METRICS.phase("plan")
+    def plan(self):
+        statistics: Counter[str] = Counter()
+        durations = _to_microseconds([task.duration for task in self.task_list])
+        order = np.argsort(-durations, kind="stable")
+        ordered_task_list = [self.task_list[index] for index in order]
+        durations = durations[order]
+        negated_durations = -durations
+        available = np.fromiter((not task.is_scheduled() for task in ordered_task_list), dtype=bool)
+        free_times = _to_microseconds([workday.get_free_time() for workday in self.workday_list])
+
+        remaining = np.flatnonzero(available)
+        for i in range(PLANNING_ITERATIONS):
+            LOG.debug(f"Planning ({i})")
+            remaining = np.flatnonzero(available)
+            if not len(remaining):
+                LOG.debug("Successfully planned all tasks.")
+                break
+
+            statistics["planner.iterations"] += 1
+            day_indices = range(len(self.workday_list) - 1, -1, -1) if i % 2 == 0 else range(len(self.workday_list))
+            for day_index in day_indices:
+                free_times[day_index] = self._plan_workday_arrays(
+                    i,
+                    ordered_task_list,
+                    durations,
+                    negated_durations,
+                    available,
+                    self.workday_list[day_index],
+                    int(free_times[day_index]),
+                    statistics,
+                )
+            scheduled_count = statistics[f"planner.pass_{i}.scheduled"]
+            statistics[f"planner.pass_{i}.deferred"] = len(remaining) - scheduled_count
+        METRICS.add_counters(statistics)
+        self._finish_plan([ordered_task_list[index] for index in remaining])
+
+    @staticmethod
+    def _plan_workday_arrays(  # noqa: PLR0913
+        iteration: int,
+        ordered_task_list: list[Task],
+        durations: np.ndarray,
+        negated_durations: np.ndarray,
+        available: np.ndarray,
+        workday: WorkDay,
+        free_time: int,
+        statistics: Counter[str],
+    ) -> int:
+        """Same greedy fill as TimeBlocksPlanner._plan_workday over tasks sorted by duration descending.
+
+        ``available`` marks the tasks not scheduled yet and is updated in place. Returns the remaining free time.
+        """
+        keep_slack = iteration < (PLANNING_ITERATIONS - 2)
+        slack = OPTIMAL_WORKDAY_SLACK_TIMEDELTA // MICROSECOND
+        has_gaps = bool(workday.existing_task_list)
+        task_count = len(ordered_task_list)
+        trace = TRACE.enabled
+        index = 0
+        while True:
+            longest_free_block = workday.get_longest_free_block() // MICROSECOND if has_gaps else free_time
+            if keep_slack:
+                max_duration = min(free_time - slack, longest_free_block)
+                first_fitting = np.searchsorted(negated_durations, -max_duration, side="left")
+            elif longest_free_block < free_time:
+                first_fitting = np.searchsorted(negated_durations, -longest_free_block, side="left")
+            else:
+                first_fitting = np.searchsorted(negated_durations, -free_time, side="right")
+            index = max(index, int(first_fitting))
+            if index < task_count:
+                index += int(available[index:].argmax())
+            if index >= task_count or not available[index]:
+                if trace and keep_slack:
+                    _trace_slack_deferrals(
+                        iteration, ordered_task_list, negated_durations, available, workday, free_time
+                    )
+                return free_time
+            task = ordered_task_list[index]
+            index += 1
+            if keep_slack and workday.has_similar_task(task):
+                statistics["planner.similarity_hits"] += 1
+                if trace:
+                    TRACE.record(DEFERRED_SIMILAR, iteration, workday.start_date.date(), task)
+                continue
+            workday.add_task(task)
+            if trace:
+                TRACE.record(PLACED, iteration, workday.start_date.date(), task, task.start_date.time())
+            available[index - 1] = False
+            free_time -= int(durations[index - 1])
+            statistics[f"planner.pass_{iteration}.scheduled"] += 1
+
+    @staticmethod
+    @METRICS.phase("split")
+    def _split_tasks(task_list: list[Task], default_split: int) -> list[Task]:
+        if not task_list:
+            return []
+        durations = _to_microseconds([task.duration for task in task_list])
+        requested_splits = np.fromiter((task.requested_split for task in task_list), dtype=np.int64)
+        max_duration = MAX_TASK_DURATION_TIMEDELTA // MICROSECOND
+        split_counts = np.where(
+            (requested_splits > 1) & (_divide_and_round(durations, requested_splits) <= max_duration),
+            requested_splits,
+            np.where(durations > max_duration, default_split, 1),
+        )
+        part_durations = _divide_and_round(durations, split_counts)
+
+        result: list[Task] = []
+        for task, split_count, part_duration in zip(
+            task_list, split_counts.tolist(), part_durations.tolist(), strict=True
+        ):
+            if split_count == 1:
+                result.append(task)
+                continue
+            if TRACE.enabled:
+                TRACE.record(SPLIT, None, None, task, split_count)
+            duration = timedelta(microseconds=part_duration)
+            result.extend(Task(task.note, task.project_id, duration, task.requested_split) for _ in range(split_count))
+        return result
+
+
+def _to_microseconds(duration_list: list[timedelta]) -> np.ndarray:
+    return np.fromiter(
+        (duration // MICROSECOND for duration in duration_list), dtype=np.int64, count=len(duration_list)
+    )
+
+
+def _divide_and_round(values: np.ndarray, divisors: np.ndarray) -> np.ndarray:
+    """Integer division rounding half to even, like dividing a timedelta by an int."""
+    quotients, remainders = np.divmod(values, divisors)
+    doubled_remainders = remainders * 2
+    round_up = (doubled_remainders > divisors) | ((doubled_remainders == divisors) & (quotients % 2 == 1))
+    return quotients + round_up
+
+
+def _trace_slack_deferrals(  # noqa: PLR0913
+    iteration: int,
+    ordered_task_list: list[Task],
+    negated_durations: np.ndarray,
+    available: np.ndarray,
+    workday: WorkDay,
+    free_time: int,
+):
+    """Record the tasks left out of the filled workday only because they would leave less than the optimal slack."""
+    longest_free_block = min(free_time, workday.get_longest_free_block() // MICROSECOND)
+    first_fitting = int(np.searchsorted(negated_durations, -longest_free_block, side="left"))
+    for index in np.flatnonzero(available[first_fitting:]) + first_fitting:
+        task = ordered_task_list[index]
+        if not workday.has_similar_task(task):
+            TRACE.record(DEFERRED_SLACK, iteration, workday.start_date.date(), task, OPTIMAL_WORKDAY_SLACK_TIMEDELTA)
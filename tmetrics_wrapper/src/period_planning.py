@@ -0,0 +1,125 @@
+import logging
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from instrumentation import METRICS, Metrics
+from planner_trace import TRACE
+from portfolio_planner import PortfolioTimeBlocksPlanner
+from solver_planner import DEFAULT_PLAN_TIME_BUDGET_SEC, SolverTimeBlocksPlanner
+from time_blocks_planner import NotFullyPlannedError, Task, TimeBlocksPlanner
+from time_entries import TimeEntryIndex
+
+LOG = logging.getLogger(__name__)
+
+PYTHON_ENGINE = "python"
+NUMPY_ENGINE = "numpy"
+SOLVER_ENGINE = "solver"
+PORTFOLIO_ENGINE = "portfolio"
+PLANNER_ENGINES = (PYTHON_ENGINE, NUMPY_ENGINE, SOLVER_ENGINE, PORTFOLIO_ENGINE)
+SEARCH_ENGINES = (SOLVER_ENGINE, PORTFOLIO_ENGINE)
+
+
+def get_planner_class(engine: str = PYTHON_ENGINE) -> type[TimeBlocksPlanner]:
+    """Return the planner implementing the engine.
+
+    The python and numpy engines produce identical greedy plans and differ only in speed. The solver engine starts
+    from the greedy plan and searches for a better one, the portfolio engine makes many greedy plans and keeps the
+    best scored one.
+    """
+    if engine == SOLVER_ENGINE:
+        return SolverTimeBlocksPlanner
+    if engine == PORTFOLIO_ENGINE:
+        return PortfolioTimeBlocksPlanner
+    if engine == NUMPY_ENGINE:
+        from numpy_planner import NumpyTimeBlocksPlanner
+
+        return NumpyTimeBlocksPlanner
+    if engine != PYTHON_ENGINE:
+        raise ValueError(f"Unknown planner engine {engine!r}, expected one of {', '.join(PLANNER_ENGINES)}")
+    return TimeBlocksPlanner
+
+
+def get_plan_variant(engine: str = PYTHON_ENGINE, time_budget_sec: float = DEFAULT_PLAN_TIME_BUDGET_SEC) -> str:
+    """Identify the planner settings that change the plan. Engines making the greedy plan share the empty variant."""
+    return f"{engine}:{time_budget_sec}" if engine in SEARCH_ENGINES else ""
+
+
+def plan_period(  # noqa: PLR0913
+    start_date: date,
+    end_date: date,
+    task_list: list[Task],
+    existing_entry_index: TimeEntryIndex | None = None,
+    engine: str = PYTHON_ENGINE,
+    time_budget_sec: float = DEFAULT_PLAN_TIME_BUDGET_SEC,
+    jobs: int | None = None,
+) -> TimeBlocksPlanner:
+    """Plan the period.
+
+    ``time_budget_sec`` limits the search of the solver and portfolio engines, ``jobs`` the processes the portfolio
+    engine plans its variants in. The other engines ignore both.
+    """
+    if engine == SOLVER_ENGINE:
+        planner = SolverTimeBlocksPlanner(start_date, end_date, task_list, existing_entry_index, time_budget_sec)
+    elif engine == PORTFOLIO_ENGINE:
+        planner = PortfolioTimeBlocksPlanner(
+            start_date, end_date, task_list, existing_entry_index, time_budget_sec, jobs
+        )
+    else:
+        planner = get_planner_class(engine)(start_date, end_date, task_list, existing_entry_index)
+    planner.plan()
+    return planner
+
+
+def plan_periods(
+    period_list: Iterable[tuple[date, date, list[Task]] | tuple[date, date, list[Task], TimeEntryIndex | None]],
+    jobs: int | None = None,
+    engine: str = PYTHON_ENGINE,
+    time_budget_sec: float = DEFAULT_PLAN_TIME_BUDGET_SEC,
+    return_exceptions: bool = False,
+) -> list[TimeBlocksPlanner | NotFullyPlannedError]:
+    """Plan independent periods in a process pool, keeping their order.
+
+    Periods are submitted as they are parsed, so planning overlaps with reading the rest of the tasks file.
+    METRICS recorded by the workers are merged into the ones of this process. The periods already keep the pool busy,
+    so every worker plans the variants of the portfolio engine in its own process. When TRACE is enabled here, the
+    workers trace too and every planner comes back with its ``trace_events``.
+    With ``return_exceptions`` a period that cannot be planned gets its NotFullyPlannedError in place of a planner
+    instead of failing all the others.
+    """
+    trace_capacity = TRACE.capacity if TRACE.enabled else None
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        future_list = [
+            executor.submit(
+                _plan_period_in_worker,
+                *period,
+                engine=engine,
+                time_budget_sec=time_budget_sec,
+                trace_capacity=trace_capacity,
+            )
+            for period in period_list
+        ]
+        LOG.debug(f"Planning {len(future_list)} periods in parallel")
+        planner_list = []
+        for future in future_list:
+            try:
+                planner, worker_metrics = future.result()
+            except NotFullyPlannedError as e:
+                if not return_exceptions:
+                    raise
+                planner_list.append(e)
+                continue
+            METRICS.merge(worker_metrics)
+            planner_list.append(planner)
+        return planner_list
+
+
+def _plan_period_in_worker(
+    *period, engine: str, time_budget_sec: float, trace_capacity: int | None
+) -> tuple[TimeBlocksPlanner, Metrics]:
+    METRICS.reset()
+    if trace_capacity:
+        TRACE.enable(trace_capacity)
+    else:
+        TRACE.disable()
+    return plan_period(*period, engine=engine, time_budget_sec=time_budget_sec, jobs=1), METRICS
@@ -0,0 +1,260 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+
+from api import TMetricsAPI, TMetricsAPIError
+from push_engine import DELETE_ACTION, UPDATE_ACTION, PushReport, PushResult, push_tasks, run_operations
+from push_journal import PushJournal, get_task_key
+from time_blocks_planner import PLANNER_VERSION, Task, TimeBlocksPlanner
+from time_entries import TimeEntryIndex
+from utils import atomic_write
+
+LOG = logging.getLogger(__name__)
+
+PLAN_CACHE_SUFFIX = ".plans"
+_CACHED_PLAN_SUFFIX = ".plan.json"
+APPLIED_FILE_PREFIX = "applied-"
+
+
+def get_plan_key(
+    start_date: date,
+    end_date: date,
+    task_list: list[Task],
+    existing_entry_index: TimeEntryIndex | None = None,
+    variant: str = "",
+) -> str:
+    """Hash of everything a plan depends on: the period, its tasks with resolved project ids, the time entries it is
+    planned around, the planner version and the planner settings ``variant`` changing the plan, if any."""
+    key_parts = [variant] if variant else []
+    payload = json.dumps(
+        [
+            *key_parts,
+            PLANNER_VERSION,
+            start_date.isoformat(),
+            end_date.isoformat(),
+            [
+                [task.note, task.project_id, task.duration // timedelta(microseconds=1), task.requested_split]
+                for task in task_list
+            ],
+            [
+                [task.note, task.project_id, task.start_date.isoformat(), task.end_date.isoformat()]
+                for task in existing_entry_index or ()
+            ],
+        ]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class AppliedEntry:
+    """A time entry pushed from a plan, with the id the server assigned to it when known."""
+
+    entry_id: int | None
+    task: Task
+
+
+@dataclass
+class PlanDiff:
+    unchanged: list[AppliedEntry] = field(default_factory=list)
+    created: list[Task] = field(default_factory=list)
+    updated: list[tuple[AppliedEntry, Task]] = field(default_factory=list)
+    deleted: list[AppliedEntry] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.created or self.updated or self.deleted)
+
+    def __str__(self):
+        return (
+            f"{len(self.created)} to create, {len(self.updated)} to update, {len(self.deleted)} to delete, "
+            f"{len(self.unchanged)} unchanged"
+        )
+
+
+def compute_plan_diff(applied_entry_list: list[AppliedEntry], task_list: list[Task]) -> PlanDiff:
+    """Match a new plan against the entries applied from the previous one.
+
+    Identical entries are kept. Entries that changed are updated in place, preferring an old entry with the same
+    project and note, so only surplus old entries are deleted and only surplus new tasks are created.
+    Old entries with an unknown id cannot be updated nor deleted and are left alone.
+    """
+    diff = PlanDiff()
+    applied_by_key: dict[str, list[AppliedEntry]] = defaultdict(list)
+    for entry in applied_entry_list:
+        applied_by_key[get_task_key(entry.task)].append(entry)
+
+    new_task_list = []
+    for task in task_list:
+        same_entry_list = applied_by_key.get(get_task_key(task))
+        if same_entry_list:
+            diff.unchanged.append(same_entry_list.pop())
+        else:
+            new_task_list.append(task)
+
+    stale_by_similarity: dict[tuple[int, str], list[AppliedEntry]] = defaultdict(list)
+    for entry_list in applied_by_key.values():
+        for entry in entry_list:
+            if entry.entry_id is None:
+                LOG.warning(f"Cannot update nor delete {entry.task}, its time entry id is unknown")
+                continue
+            stale_by_similarity[(entry.task.project_id, entry.task.note)].append(entry)
+
+    unmatched_task_list = []
+    for task in new_task_list:
+        similar_entry_list = stale_by_similarity.get((task.project_id, task.note))
+        if similar_entry_list:
+            diff.updated.append((similar_entry_list.pop(), task))
+        else:
+            unmatched_task_list.append(task)
+
+    stale_entry_list = [entry for entry_list in stale_by_similarity.values() for entry in entry_list]
+    diff.updated.extend(zip(stale_entry_list, unmatched_task_list, strict=False))
+    diff.deleted = stale_entry_list[len(unmatched_task_list) :]
+    diff.created = unmatched_task_list[len(stale_entry_list) :]
+    return diff
+
+
+def apply_plan_diff(
+    api: TMetricsAPI, diff: PlanDiff, concurrency: int = 1, journal: PushJournal | None = None
+) -> tuple[PushReport, list[AppliedEntry]]:
+    """Create, update and delete time entries as the diff says.
+
+    Created entries are recorded in the journal like any push. Moved and deleted ones are recorded as removed from
+    their old slot, so the journal never skips a task because an entry used to be there.
+
+    Returns the report and the entries that are applied afterwards: unchanged and successfully changed entries, plus
+    old entries whose update or deletion failed, since those are still in TMetrics.
+    """
+    report = push_tasks(api, diff.created, concurrency=concurrency, journal=journal)
+    run_operations(
+        [functools.partial(_update_entry, api, entry, task, journal) for entry, task in diff.updated]
+        + [functools.partial(_delete_entry, api, entry, journal) for entry in diff.deleted],
+        report,
+        concurrency,
+    )
+
+    old_entries = {entry.entry_id: entry for entry, _ in diff.updated}
+    old_entries.update((entry.entry_id, entry) for entry in diff.deleted)
+    applied_entry_list = list(diff.unchanged)
+    for day_results in report.results.values():
+        for result in day_results:
+            if result.action == DELETE_ACTION:
+                if not result.succeeded:
+                    applied_entry_list.append(old_entries[result.entry_id])
+            elif result.succeeded:
+                applied_entry_list.append(AppliedEntry(result.entry_id, result.task))
+            elif result.action == UPDATE_ACTION:
+                applied_entry_list.append(old_entries[result.entry_id])
+    return report, applied_entry_list
+
+
+def task_to_record(task: Task) -> dict:
+    return {
+        "note": task.note,
+        "project_id": task.project_id,
+        "start": task.start_date.isoformat(),
+        "end": task.end_date.isoformat(),
+        "requested_split": task.requested_split,
+    }
+
+
+def task_from_record(record: dict) -> Task:
+    start_date = datetime.fromisoformat(record["start"])
+    end_date = datetime.fromisoformat(record["end"])
+    task = Task(record["note"], record["project_id"], end_date - start_date, record.get("requested_split", 1))
+    task.start_date = start_date
+    task.end_date = end_date
+    return task
+
+
+class PlanCache:
+    """Directory of computed plans, content addressed by get_plan_key, and of the entries last applied per period."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def load_plan(
+        self, key: str, start_date: date, end_date: date, existing_entry_index: TimeEntryIndex | None = None
+    ) -> TimeBlocksPlanner | None:
+        record = self._read(f"{key}{_CACHED_PLAN_SUFFIX}")
+        if record is None:
+            return None
+        task_list = [task_from_record(task_record) for task_record in record["tasks"]]
+        return TimeBlocksPlanner.from_schedule(start_date, end_date, task_list, existing_entry_index)
+
+    def store_plan(self, key: str, planner: TimeBlocksPlanner):
+        self._write(
+            f"{key}{_CACHED_PLAN_SUFFIX}",
+            {"version": PLANNER_VERSION, "tasks": [task_to_record(task) for task in planner.get_scheduled_tasks()]},
+        )
+
+    def get_applied_entries(self, start_date: date, end_date: date) -> list[AppliedEntry]:
+        record = self._read(self._get_applied_file_name(start_date, end_date))
+        if record is None:
+            return []
+        return [AppliedEntry(entry.get("id"), task_from_record(entry)) for entry in record["entries"]]
+
+    def get_applied_entry_ids(self, start_date: date, end_date: date) -> set[int]:
+        return {
+            entry.entry_id for entry in self.get_applied_entries(start_date, end_date) if entry.entry_id is not None
+        }
+
+    def store_applied_entries(self, start_date: date, end_date: date, applied_entry_list: list[AppliedEntry]):
+        self._write(
+            self._get_applied_file_name(start_date, end_date),
+            {"entries": [{"id": entry.entry_id, **task_to_record(entry.task)} for entry in applied_entry_list]},
+        )
+
+    @staticmethod
+    def _get_applied_file_name(start_date: date, end_date: date) -> str:
+        return f"{APPLIED_FILE_PREFIX}{start_date.isoformat()}-{end_date.isoformat()}.json"
+
+    def _read(self, file_name: str) -> dict | None:
+        path = os.path.join(self.directory, file_name)
+        try:
+            with open(path, encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            LOG.warning(f"Ignoring unreadable plan cache file {path}: {e}")
+            return None
+
+    def _write(self, file_name: str, record: dict):
+        path = os.path.join(self.directory, file_name)
+        try:
+            with atomic_write(path) as file:
+                json.dump(record, file)
+        except OSError as e:
+            LOG.warning(f"Could not write plan cache file {path}: {e}")
+
+
+def _update_entry(api: TMetricsAPI, entry: AppliedEntry, task: Task, journal: PushJournal | None) -> PushResult:
+    LOG.debug(f"Updating time entry {entry.entry_id} from {entry.task} to {task}")
+    try:
+        api.update_time_entry(entry.entry_id, task.project_id, task.note, task.start_date, task.end_date)
+    except TMetricsAPIError as e:
+        return PushResult(task, error=str(e), action=UPDATE_ACTION, entry_id=entry.entry_id)
+    if journal:
+        journal.record_removed(entry.task, entry.entry_id)
+        journal.record_acked(task, entry.entry_id)
+    return PushResult(task, action=UPDATE_ACTION, entry_id=entry.entry_id)
+
+
+def _delete_entry(api: TMetricsAPI, entry: AppliedEntry, journal: PushJournal | None) -> PushResult:
+    LOG.debug(f"Deleting time entry {entry.entry_id} {entry.task}")
+    try:
+        api.delete_time_entry(entry.entry_id)
+    except TMetricsAPIError as e:
+        if e.status_code != HTTPStatus.NOT_FOUND:
+            return PushResult(entry.task, error=str(e), action=DELETE_ACTION, entry_id=entry.entry_id)
+        LOG.debug(f"Time entry {entry.entry_id} was already deleted")
+    if journal:
+        journal.record_removed(entry.task, entry.entry_id)
+    return PushResult(entry.task, action=DELETE_ACTION, entry_id=entry.entry_id)
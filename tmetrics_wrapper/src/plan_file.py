@@ -0,0 +1,147 @@
+import json
+import logging
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import asdict, dataclass, fields
+from datetime import date, datetime
+from typing import TypeVar
+
+from plan_cache import task_from_record, task_to_record
+from time_blocks_planner import PLANNER_VERSION, Task, TimeBlocksPlanner
+from utils import atomic_write
+
+LOG = logging.getLogger(__name__)
+
+PLAN_FILE_FORMAT = "tmetrics-wrapper-plan"
+PLAN_FILE_VERSION = 1
+PLAN_FILE_SUFFIX = ".plan.jsonl"
+
+T = TypeVar("T")
+
+
+class PlanFileError(ValueError):
+    """Raised when a plan file is unreadable, of an unsupported version, truncated or otherwise malformed"""
+
+
+@dataclass
+class PlanFileHeader:
+    version: int
+    planner_version: int
+    created_at: str
+    period_count: int
+    task_count: int
+
+
+def write_plan_file(path: str, planner_list: Iterable[TimeBlocksPlanner]) -> PlanFileHeader:
+    """Write the scheduled tasks of the planners as JSON lines: a header with totals, then every period followed by
+    its tasks.
+
+    The file is written under a temporary name and renamed at the end, so it either holds complete plans or does not
+    change.
+    """
+    planner_list = list(planner_list)
+    header = PlanFileHeader(
+        version=PLAN_FILE_VERSION,
+        planner_version=PLANNER_VERSION,
+        created_at=datetime.now().isoformat(timespec="seconds"),
+        period_count=len(planner_list),
+        task_count=sum(len(planner.get_scheduled_tasks()) for planner in planner_list),
+    )
+    with atomic_write(path) as file:
+        _write_record(file, {"format": PLAN_FILE_FORMAT, **asdict(header)})
+        for planner in planner_list:
+            task_list = planner.get_scheduled_tasks()
+            _write_record(
+                file,
+                {"period": [planner.start_date.isoformat(), planner.end_date.isoformat()], "tasks": len(task_list)},
+            )
+            for task in task_list:
+                _write_record(file, task_to_record(task))
+    LOG.debug(f"Wrote {header.task_count} time entries of {header.period_count} periods to {path}")
+    return header
+
+
+def read_plan_header(path: str) -> PlanFileHeader:
+    with _open_plan_file(path) as file:
+        return _parse_header(path, file.readline())
+
+
+def iter_planned_periods(path: str) -> Iterator[tuple[date, date, list[Task]]]:
+    """Yield the periods of a plan file one at a time, so memory is bounded by the longest period, not the file.
+
+    Raises PlanFileError at the first malformed line or when the file ends before the totals of its header.
+    """
+    with _open_plan_file(path) as file:
+        header = _parse_header(path, file.readline())
+        period_count = 0
+        task_count = 0
+        numbered_lines = enumerate(file, start=2)
+        for line_number, line in numbered_lines:
+            start_date, end_date, expected_count = _parse_line(path, line_number, line, _parse_period)
+            task_list = []
+            for _ in range(expected_count):
+                task_line_number, task_line = next(numbered_lines, (None, None))
+                if task_line is None:
+                    raise PlanFileError(f"{path}: truncated in the period starting at line {line_number}")
+                task_list.append(_parse_line(path, task_line_number, task_line, task_from_record))
+            period_count += 1
+            task_count += len(task_list)
+            yield start_date, end_date, task_list
+        if (period_count, task_count) != (header.period_count, header.task_count):
+            raise PlanFileError(
+                f"{path}: truncated, holds {period_count} periods with {task_count} time entries, the header promises "
+                f"{header.period_count} with {header.task_count}"
+            )
+
+
+def validate_plan_file(path: str) -> PlanFileHeader:
+    """Read the whole file, raising PlanFileError if any of it is malformed, and return its header."""
+    for _ in iter_planned_periods(path):
+        pass
+    return read_plan_header(path)
+
+
+def iter_planned_tasks(path: str) -> Iterator[Task]:
+    for _, _, task_list in iter_planned_periods(path):
+        yield from task_list
+
+
+def _open_plan_file(path: str):
+    try:
+        return open(path, encoding="utf-8")  # noqa: SIM115
+    except OSError as e:
+        raise PlanFileError(f"Cannot read plan file {path}: {e}") from e
+
+
+def _parse_header(path: str, line: str) -> PlanFileHeader:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        record = None
+    if not isinstance(record, dict) or record.get("format") != PLAN_FILE_FORMAT:
+        raise PlanFileError(f"{path} is not a plan file.")
+    if record.get("version") != PLAN_FILE_VERSION:
+        raise PlanFileError(
+            f"{path} has plan file version {record.get('version')}, this version reads only {PLAN_FILE_VERSION}."
+        )
+    try:
+        return PlanFileHeader(
+            **{header_field.name: record[header_field.name] for header_field in fields(PlanFileHeader)}
+        )
+    except KeyError as e:
+        raise PlanFileError(f"{path}: header is missing {e}") from None
+
+
+def _parse_period(record: dict) -> tuple[date, date, int]:
+    start_date, end_date = (date.fromisoformat(value) for value in record["period"])
+    return start_date, end_date, int(record["tasks"])
+
+
+def _parse_line(path: str, line_number: int, line: str, parse: Callable[[dict], T]) -> T:
+    try:
+        return parse(json.loads(line))
+    except (KeyError, TypeError, ValueError) as e:
+        raise PlanFileError(f"{path}:{line_number}: malformed record: {e!r}") from e
+
+
+def _write_record(file, record: dict):
+    file.write(json.dumps(record, separators=(",", ":")) + "\n")
@@ -0,0 +1,43 @@
+EMPTY_CELL = "nan"
+MIN_HEADER_PADDING = 2
+
+
+def render_markdown_table(column_list: list[tuple[str, list[str]]]) -> str:
+    """Render columns of different lengths side by side, with a row index, in linear time.
+
+    The output matches the pipe table pandas ``to_markdown`` produces for the same columns: shorter columns are
+    filled with EMPTY_CELL and columns without any value are right aligned, like numeric ones.
+    """
+    row_count = max((len(cells) for _, cells in column_list), default=0)
+    if not row_count:
+        header_list = [header.strip() for header, _ in column_list]
+        width_list = [len(header) + MIN_HEADER_PADDING for header in header_list]
+        header_row = _render_row([header.ljust(width) for header, width in zip(header_list, width_list, strict=True)])
+        return header_row + "\n" + _render_separator_row(["-" * (width + 2) for width in width_list])
+
+    rendered_column_list = [_render_column("", [str(index) for index in range(row_count)], right_aligned=True)]
+    for header, cells in column_list:
+        padded_cells = [cell.strip() for cell in cells]
+        padded_cells.extend([EMPTY_CELL] * (row_count - len(cells)))
+        rendered_column_list.append(_render_column(header.strip(), padded_cells, right_aligned=not cells))
+
+    rendered_row_list = list(zip(*rendered_column_list, strict=True))
+    lines = [_render_row(rendered_row_list[0]), _render_separator_row(rendered_row_list[1])]
+    lines.extend(_render_row(row) for row in rendered_row_list[2:])
+    return "\n".join(lines)
+
+
+def _render_column(header: str, cells: list[str], right_aligned: bool) -> list[str]:
+    """Return the header, the alignment marker and the cells of a column, all padded to the column width."""
+    width = max(len(header) + MIN_HEADER_PADDING, *(len(cell) for cell in cells))
+    if right_aligned:
+        return [header.rjust(width), "-" * (width + 1) + ":", *(cell.rjust(width) for cell in cells)]
+    return [header.ljust(width), ":" + "-" * (width + 1), *(cell.ljust(width) for cell in cells)]
+
+
+def _render_row(cells) -> str:
+    return "| " + " | ".join(cells) + " |"
+
+
+def _render_separator_row(cells) -> str:
+    return "|" + "|".join(cells) + "|"
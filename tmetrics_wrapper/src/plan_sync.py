@@ -0,0 +1,119 @@
+import itertools
+import logging
+from collections.abc import Callable
+
+from api import TMetricsAPI
+from instrumentation import METRICS
+from local_store import LocalStore
+from period_planning import get_plan_variant, plan_period, plan_periods
+from plan_cache import PlanCache, apply_plan_diff, compute_plan_diff, get_plan_key
+from push_engine import PushReport, push_tasks
+from push_journal import PushJournal
+from time_blocks_planner import TimeBlocksPlanner
+from time_entries import fetch_time_entry_index
+
+LOG = logging.getLogger(__name__)
+
+
+def attach_existing_entries(
+    api: TMetricsAPI | LocalStore, period_list, journal: PushJournal | None, plan_cache: PlanCache | None
+):
+    """Fetch already tracked time entries of every period, so they are planned around.
+
+    Entries acknowledged in the journal or applied from the cached plan were pushed from this tasks file and are left
+    out, which keeps the plan of a resumed or repeated run identical to the previous one.
+    """
+    for start_date, end_date, task_list in period_list:
+        with METRICS.phase("fetch_existing"):
+            existing_entry_index = fetch_time_entry_index(
+                api,
+                start_date,
+                end_date,
+                exclude=journal.is_acked if journal else None,
+                exclude_ids=plan_cache.get_applied_entry_ids(start_date, end_date) if plan_cache else (),
+            )
+        yield start_date, end_date, task_list, existing_entry_index
+
+
+def load_cached_plan(period, plan_cache: PlanCache, variant: str) -> tuple[str, TimeBlocksPlanner | None]:
+    start_date, end_date, task_list, *rest = period
+    existing_entry_index = rest[0] if rest else None
+    key = get_plan_key(start_date, end_date, task_list, existing_entry_index, variant)
+    planner = plan_cache.load_plan(key, start_date, end_date, existing_entry_index)
+    if planner:
+        LOG.info(f"Period {start_date} - {end_date} is unchanged, using its cached plan")
+    return key, planner
+
+
+def plan_period_cached(
+    period, plan_cache: PlanCache | None, planner_options: dict, jobs: int | None = None
+) -> TimeBlocksPlanner:
+    if not plan_cache:
+        return plan_period(*period, jobs=jobs, **planner_options)
+    key, planner = load_cached_plan(period, plan_cache, get_plan_variant(**planner_options))
+    if not planner:
+        planner = plan_period(*period, jobs=jobs, **planner_options)
+        plan_cache.store_plan(key, planner)
+    return planner
+
+
+def plan_periods_cached(
+    period_list, plan_cache: PlanCache | None, jobs: int | None, planner_options: dict
+) -> list[TimeBlocksPlanner]:
+    """Plan in a process pool only the periods without a cached plan."""
+    if not plan_cache:
+        return plan_periods(period_list, jobs=jobs, **planner_options)
+    planner_list = []
+    missing_list = []
+    variant = get_plan_variant(**planner_options)
+    for period in period_list:
+        key, planner = load_cached_plan(period, plan_cache, variant)
+        planner_list.append(planner)
+        if not planner:
+            missing_list.append((len(planner_list) - 1, key, period))
+    for (index, key, _), planner in zip(
+        missing_list,
+        plan_periods((period for _, _, period in missing_list), jobs=jobs, **planner_options),
+        strict=True,
+    ):
+        plan_cache.store_plan(key, planner)
+        planner_list[index] = planner
+    return planner_list
+
+
+def push_plans(  # noqa: PLR0913
+    api: TMetricsAPI,
+    planner_list: list[TimeBlocksPlanner],
+    journal: PushJournal | None,
+    plan_cache: PlanCache | None,
+    concurrency: int,
+    confirm: Callable[[], bool] | None = None,
+) -> PushReport:
+    """Push the planned time entries, or with a plan cache only the changes against the last applied plans.
+
+    ``confirm`` is called once there is something to push, and nothing is pushed unless it returns true.
+    """
+    diff_list = []
+    if plan_cache:
+        for planner in planner_list:
+            applied_entry_list = plan_cache.get_applied_entries(planner.start_date, planner.end_date)
+            diff = compute_plan_diff(applied_entry_list, planner.get_scheduled_tasks())
+            LOG.info(f"{planner.start_date} - {planner.end_date}: {diff}")
+            diff_list.append(diff)
+        if all(diff.is_empty() for diff in diff_list):
+            LOG.info("Already applied, nothing to push.")
+            return PushReport()
+    if confirm and not confirm():
+        return PushReport()
+
+    if not plan_cache:
+        task_list = itertools.chain.from_iterable(planner.get_scheduled_tasks() for planner in planner_list)
+        report = push_tasks(api, task_list, concurrency=concurrency, journal=journal)
+    else:
+        report = PushReport()
+        for planner, diff in zip(planner_list, diff_list, strict=True):
+            period_report, applied_entry_list = apply_plan_diff(api, diff, concurrency=concurrency, journal=journal)
+            plan_cache.store_applied_entries(planner.start_date, planner.end_date, applied_entry_list)
+            report.merge(period_report)
+    report.log_summary()
+    return report
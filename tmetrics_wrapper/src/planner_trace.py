@@ -0,0 +1,82 @@
+import itertools
+from collections import deque
+from datetime import date
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from time_blocks_planner import Task
+
+DEFAULT_TRACE_CAPACITY = 10000
+
+SPLIT = "split"
+PLACED = "placed"
+DEFERRED_SIMILAR = "deferred_similar"
+DEFERRED_SLACK = "deferred_slack"
+NO_ROOM = "no_room"
+
+# (kind, planning pass or None, workday date or None, task, detail)
+TraceEvent = tuple[str, "int | None", "date | None", "Task", object]
+
+
+class PlannerTrace:
+    """Bounded ring buffer of planner decisions.
+
+    Call sites check ``enabled`` before recording, so a disabled trace costs a single attribute lookup. Events are
+    tuples of the objects at hand and are formatted only by render_trace, when somebody reads them.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.capacity = DEFAULT_TRACE_CAPACITY
+        self.recorded = 0
+        self._events: deque[TraceEvent] = deque(maxlen=self.capacity)
+
+    def enable(self, capacity: int = DEFAULT_TRACE_CAPACITY):
+        if capacity != self.capacity:
+            self.capacity = capacity
+            self._events = deque(self._events, maxlen=capacity)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self._events.clear()
+        self.recorded = 0
+
+    def record(self, kind: str, iteration: int | None, workday_date: date | None, task: "Task", detail=None):
+        self._events.append((kind, iteration, workday_date, task, detail))
+        self.recorded += 1
+
+    def mark(self) -> int:
+        """Return a position to get the events recorded after it from."""
+        return self.recorded
+
+    def get_events(self, since: int = 0) -> list[TraceEvent]:
+        """Return the events recorded since the mark that are still in the buffer, oldest first."""
+        count = min(self.recorded - since, len(self._events))
+        return list(itertools.islice(self._events, len(self._events) - count, None))
+
+
+TRACE = PlannerTrace()
+
+
+def render_trace(events: list[TraceEvent]) -> str:
+    return "\n".join(_render_event(*event) for event in events)
+
+
+def _render_event(kind: str, iteration: int | None, workday_date: date | None, task: "Task", detail) -> str:
+    task_name = f"{task.note} ({task.duration}) [{task.project_id}]"
+    if kind == SPLIT:
+        return f"split {task_name} into {detail} parts"
+    if kind == NO_ROOM:
+        return f"no room for {task_name}, the longest free block left is {detail}"
+
+    prefix = f"{'solver' if iteration is None else f'pass {iteration}'} {workday_date}:"
+    if kind == PLACED:
+        return f"{prefix} placed {task_name} at {detail}"
+    if kind == DEFERRED_SIMILAR:
+        return f"{prefix} deferred {task_name}, a similar task is already on the day"
+    if kind == DEFERRED_SLACK:
+        return f"{prefix} deferred {task_name}, it would leave less than {detail} free"
+    return f"{prefix} {kind} {task_name} {detail}"
@@ -0,0 +1,232 @@
+import logging
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from instrumentation import METRICS, Metrics
+from planner_trace import TRACE
+from solver_planner import DEFAULT_PLAN_TIME_BUDGET_SEC
+from time_blocks_planner import (
+    AVG_WORKDAY_DURATION_HOUR,
+    OPTIMAL_WORKDAY_SLACK_TIMEDELTA,
+    Task,
+    TimeBlocksPlanner,
+)
+
+LOG = logging.getLogger(__name__)
+
+INPUT_ORDER = "input"
+PROJECT_ORDER = "project"
+NOTE_ORDER = "note"
+SHUFFLED_ORDER = "shuffled"
+PORTFOLIO_SIZE = 64
+PORTFOLIO_SLACKS = (OPTIMAL_WORKDAY_SLACK_TIMEDELTA, timedelta(minutes=20), timedelta(hours=1), timedelta())
+# Below this estimated sequential time, starting worker processes costs more than it saves.
+MIN_POOL_WORK_SEC = 0.05
+AVG_WORKDAY_DURATION = timedelta(hours=AVG_WORKDAY_DURATION_HOUR)
+
+
+class PlannerVariant(NamedTuple):
+    """Settings of one greedy plan: how tasks of equal duration are ordered, which end of the period the first pass
+    starts from and how much free time the early passes keep on a day."""
+
+    tie_break: str = INPUT_ORDER
+    forward_first: bool = False
+    slack: timedelta = OPTIMAL_WORKDAY_SLACK_TIMEDELTA
+    seed: int = 0
+
+
+DEFAULT_VARIANT = PlannerVariant()
+
+
+class PlanScore(NamedTuple):
+    """Quality of a complete plan, lower is better, compared field by field.
+
+    ``similar_count`` counts similar tasks sharing a day, ``workday_distance`` sums how far every day is from
+    AVG_WORKDAY_DURATION_HOUR in minutes and ``imbalance`` is the variance of the day durations in minutes squared.
+    """
+
+    similar_count: int
+    workday_distance: int
+    imbalance: float
+
+
+class VariantTimeBlocksPlanner(TimeBlocksPlanner):
+    """TimeBlocksPlanner making the greedy plan with the settings of a PlannerVariant."""
+
+    def __init__(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        task_list: list[Task],
+        existing_entry_index=None,
+        variant: PlannerVariant = DEFAULT_VARIANT,
+    ):
+        super().__init__(start_date, end_date, task_list, existing_entry_index)
+        self.variant = variant
+
+    @property
+    def workday_slack(self) -> timedelta:
+        return self.variant.slack
+
+    def _order_tasks(self, task_list: list[Task]) -> list[Task]:
+        tie_break = self.variant.tie_break
+        if tie_break == PROJECT_ORDER:
+            task_list = sorted(task_list, key=lambda task: (task.project_id, task.note))
+        elif tie_break == NOTE_ORDER:
+            task_list = sorted(task_list, key=lambda task: (task.note, task.project_id))
+        elif tie_break == SHUFFLED_ORDER:
+            task_list = list(task_list)
+            random.Random(self.variant.seed).shuffle(task_list)  # noqa: S311
+        return super()._order_tasks(task_list)
+
+    def _get_pass_workdays(self, iteration: int):
+        return super()._get_pass_workdays(iteration + self.variant.forward_first)
+
+    def score(self) -> PlanScore | None:
+        """Make the greedy plan without recording planner METRICS; return its score, or None if a task is left."""
+        if self._plan_passes(Counter()):
+            return None
+        return score_plan(self)
+
+
+class PortfolioTimeBlocksPlanner(VariantTimeBlocksPlanner):
+    """Planner making many greedy plans with different variants and keeping the best scored one.
+
+    The variants are spread over a process pool of ``jobs`` processes, all CPUs by default, and only those finished
+    within ``time_budget_sec`` are compared. The greedy plan of the default variant is always made, so the portfolio
+    fails only when no variant plans every task.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        task_list: list[Task],
+        existing_entry_index=None,
+        time_budget_sec: float = DEFAULT_PLAN_TIME_BUDGET_SEC,
+        jobs: int | None = None,
+    ):
+        super().__init__(start_date, end_date, task_list, existing_entry_index)
+        self.existing_entry_index = existing_entry_index
+        self.time_budget_sec = time_budget_sec
+        self.jobs = jobs
+
+    def plan(self):
+        """Score the variants of the portfolio, then make the plan of the best one again in this planner."""
+        variant_list = get_portfolio_variants()
+        deadline = time.time() + self.time_budget_sec
+        with METRICS.phase("portfolio"):
+            score_list = self._score_portfolio(variant_list, deadline)
+        METRICS.add_counters(Counter({"portfolio.variants": len(variant_list), "portfolio.planned": len(score_list)}))
+        if score_list:
+            score, index = min(score_list)
+            self.variant = variant_list[index]
+            METRICS.increment("portfolio.improved", int(index != 0))
+            LOG.debug(
+                f"{self.start_date} - {self.end_date}: best of {len(score_list)} plans is {self.variant}, {score}"
+            )
+        super().plan()
+
+    def _score_portfolio(self, variant_list: list[PlannerVariant], deadline: float) -> list[tuple[PlanScore, int]]:
+        """Score the default variant here, then the others here too when they are quick, or else in a process pool."""
+        period = (self.start_date, self.end_date, self.task_list, self.existing_entry_index)
+        indexed_variant_list = list(enumerate(variant_list))
+        trace_enabled = TRACE.enabled
+        TRACE.disable()
+        try:
+            started_at = time.perf_counter()
+            score_list = _score_variants(*period, indexed_variant_list[:1], deadline)
+            elapsed_sec = time.perf_counter() - started_at
+            remaining_list = indexed_variant_list[1:]
+            process_count = min(self.jobs or os.cpu_count() or 1, len(remaining_list))
+            if process_count <= 1 or elapsed_sec * len(remaining_list) < MIN_POOL_WORK_SEC:
+                return score_list + _score_variants(*period, remaining_list, deadline)
+        finally:
+            if trace_enabled:
+                TRACE.enable(TRACE.capacity)
+
+        with ProcessPoolExecutor(max_workers=process_count) as executor:
+            future_list = [
+                executor.submit(_score_variants_in_worker, *period, remaining_list[offset::process_count], deadline)
+                for offset in range(process_count)
+            ]
+            for future in future_list:
+                worker_score_list, worker_metrics = future.result()
+                METRICS.merge(worker_metrics)
+                score_list.extend(worker_score_list)
+        return score_list
+
+
+def get_portfolio_variants(size: int = PORTFOLIO_SIZE) -> list[PlannerVariant]:
+    """Return ``size`` variants, DEFAULT_VARIANT first, then every combination of tie-break, direction and slack, then
+    seeded shuffles of tasks of equal duration."""
+    variant_list = [
+        PlannerVariant(tie_break, forward_first, slack)
+        for slack in PORTFOLIO_SLACKS
+        for forward_first in (False, True)
+        for tie_break in (INPUT_ORDER, PROJECT_ORDER, NOTE_ORDER)
+    ]
+    seed = 0
+    while len(variant_list) < size:
+        variant_list.append(
+            PlannerVariant(SHUFFLED_ORDER, bool(seed % 2), PORTFOLIO_SLACKS[seed // 2 % len(PORTFOLIO_SLACKS)], seed)
+        )
+        seed += 1
+    return variant_list[:size]
+
+
+def score_plan(planner: TimeBlocksPlanner) -> PlanScore:
+    """Score a complete plan, counting the already tracked entries of its workdays."""
+    similar_count = 0
+    workday_distance = timedelta()
+    for workday in planner.workday_list:
+        keys = Counter(task.get_similarity_key() for task in workday.task_list + workday.existing_task_list)
+        similar_count += sum(count - 1 for count in keys.values())
+        workday_distance += abs(workday.get_occupied_time() - AVG_WORKDAY_DURATION)
+    day_minutes = [workday.get_occupied_time().total_seconds() / 60 for workday in planner.workday_list]
+    return PlanScore(
+        similar_count,
+        int(workday_distance.total_seconds() // 60),
+        statistics.pvariance(day_minutes) if day_minutes else 0.0,
+    )
+
+
+def _score_variants(  # noqa: PLR0913
+    start_date: datetime.date,
+    end_date: datetime.date,
+    task_list: list[Task],
+    existing_entry_index,
+    indexed_variant_list: list[tuple[int, PlannerVariant]],
+    deadline: float,
+) -> list[tuple[PlanScore, int]]:
+    """Plan a copy of the tasks with every variant until the deadline; return the scores of complete plans.
+
+    Only ``portfolio.*`` counters are recorded, the plans of the variants are not added to the planner metrics.
+    """
+    score_list = []
+    for index, variant in indexed_variant_list:
+        planner = VariantTimeBlocksPlanner(start_date, end_date, [], existing_entry_index, variant)
+        planner.task_list = [
+            Task(task.note, task.project_id, task.duration, task.requested_split) for task in task_list
+        ]
+        score = planner.score()
+        if score is None:
+            METRICS.increment("portfolio.not_fully_planned")
+        else:
+            score_list.append((score, index))
+        if time.time() >= deadline:
+            METRICS.increment("portfolio.budget_exhausted")
+            break
+    return score_list
+
+
+def _score_variants_in_worker(*args) -> tuple[list[tuple[PlanScore, int]], Metrics]:
+    METRICS.reset()
+    TRACE.disable()
+    return _score_variants(*args), METRICS
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+
+from utils import atomic_write
+
+LOG = logging.getLogger(__name__)
+
+ALIAS_PREFIX = "$"
+CACHE_SUFFIX = ".cache"
+CACHE_FORMAT_VERSION = 2
+
+
+class ProjectConfigError(ValueError):
+    """Raised when projects in the configuration are ambiguous or malformed"""
+
+
+class ProjectIndex:
+    """Project key -> id and alias -> id lookups compiled from the ``projects`` section of the configuration."""
+
+    def __init__(self, key_index: dict[str, int], alias_index: dict[str, int]):
+        self.key_index = key_index
+        self.alias_index = alias_index
+
+    @classmethod
+    def from_config(cls, config: {}) -> "ProjectIndex":
+        key_index: dict[str, int] = {}
+        alias_keys: dict[str, list[str]] = defaultdict(list)
+        problems: list[str] = []
+        projects = config.get("projects") if isinstance(config, dict) else None
+        if not isinstance(projects, dict):
+            raise ProjectConfigError("Invalid projects configuration: no 'projects' object.")
+        for key, project_definition in projects.items():
+            try:
+                key_index[key] = int(project_definition.get("id"))
+            except (AttributeError, TypeError, ValueError):
+                problems.append(f"Project {key!r} has no valid id.")
+                continue
+            alias = project_definition.get("alias")
+            if not alias:
+                continue
+            if not isinstance(alias, str):
+                problems.append(f"Project {key!r} has alias {alias!r}, which is not a string.")
+                continue
+            if not alias.strip() or alias != alias.strip():
+                problems.append(f"Project {key!r} has blank or padded alias {alias!r}.")
+            alias_keys[alias].append(key)
+
+        alias_index: dict[str, int] = {}
+        for alias, keys in alias_keys.items():
+            if len(keys) > 1:
+                problems.append(f"Alias {alias!r} is used by multiple projects: {', '.join(sorted(keys))}.")
+            alias_index[alias] = key_index[keys[0]]
+
+        if problems:
+            raise ProjectConfigError("Invalid projects configuration:\n" + "\n".join(problems))
+        LOG.debug(f"Indexed {len(key_index)} projects with {len(alias_index)} aliases")
+        return cls(key_index, alias_index)
+
+    def get_project_id(self, project: str) -> int:
+        if project.startswith(ALIAS_PREFIX):
+            try:
+                return self.alias_index[project[len(ALIAS_PREFIX) :]]
+            except KeyError:
+                raise ValueError(f"Project id not found for alias {project}") from None
+        try:
+            return self.key_index[project]
+        except KeyError:
+            raise ValueError(f"Project id not found for {project}") from None
+
+
+def load_project_index(config_path: str, use_cache: bool = True) -> ProjectIndex:
+    """Load the project index of a configuration file, reusing the compiled cache stored next to it as JSON.
+
+    The cache is trusted while the config's mtime and size are unchanged; otherwise it is still reused if the config
+    content hash matches, and rebuilt when it does not.
+    """
+    cache_path = f"{config_path}{CACHE_SUFFIX}"
+    config_stat = os.stat(config_path)
+    cached = _read_cache(cache_path) if use_cache else None
+    if cached and (cached["mtime_ns"], cached["size"]) == (config_stat.st_mtime_ns, config_stat.st_size):
+        LOG.debug(f"Using compiled config {cache_path}")
+        return _index_from_cache(cached)
+
+    with open(config_path, "rb") as config_file:
+        content = config_file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if cached and cached["sha256"] == digest:
+        LOG.debug(f"Config {config_path} touched but unchanged, using compiled config {cache_path}")
+        project_index = _index_from_cache(cached)
+    else:
+        LOG.debug(f"Compiling config {config_path}")
+        try:
+            config = json.loads(content)
+        except ValueError as e:
+            raise ProjectConfigError(f"Config {config_path} is not valid JSON: {e}") from e
+        project_index = ProjectIndex.from_config(config)
+
+    if use_cache:
+        _write_cache(
+            cache_path,
+            {
+                "version": CACHE_FORMAT_VERSION,
+                "mtime_ns": config_stat.st_mtime_ns,
+                "size": config_stat.st_size,
+                "sha256": digest,
+                "key_index": project_index.key_index,
+                "alias_index": project_index.alias_index,
+            },
+        )
+    return project_index
+
+
+def _read_cache(cache_path: str) -> dict | None:
+    try:
+        with open(cache_path, encoding="utf-8") as cache_file:
+            cached = json.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        LOG.warning(f"Ignoring unreadable compiled config {cache_path}: {e}")
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_FORMAT_VERSION:
+        return None
+    if not all(_is_project_id_index(cached.get(name)) for name in ("key_index", "alias_index")):
+        LOG.warning(f"Ignoring malformed compiled config {cache_path}")
+        return None
+    return cached
+
+
+def _is_project_id_index(index) -> bool:
+    return isinstance(index, dict) and all(type(project_id) is int for project_id in index.values())
+
+
+def _index_from_cache(cached: dict) -> ProjectIndex:
+    return ProjectIndex(cached["key_index"], cached["alias_index"])
+
+
+def _write_cache(cache_path: str, cached: dict):
+    try:
+        with atomic_write(cache_path) as cache_file:
+            json.dump(cached, cache_file, separators=(",", ":"))
+    except OSError as e:
+        LOG.warning(f"Could not write compiled config {cache_path}: {e}")
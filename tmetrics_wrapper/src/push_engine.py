@@ -0,0 +1,142 @@
+import functools
+import logging
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from typing import TYPE_CHECKING
+
+from api import TMetricsAPI, TMetricsAPIError
+from instrumentation import METRICS
+from push_journal import PushJournal
+
+if TYPE_CHECKING:
+    from time_blocks_planner import Task
+
+LOG = logging.getLogger(__name__)
+
+IN_FLIGHT_PER_WORKER = 2
+CREATE_ACTION = "create"
+UPDATE_ACTION = "update"
+DELETE_ACTION = "delete"
+
+
+@dataclass
+class PushResult:
+    task: "Task"
+    error: str | None = None
+    skipped: bool = False
+    action: str = CREATE_ACTION
+    entry_id: int | None = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class PushReport:
+    results: dict[date, list[PushResult]] = field(default_factory=dict)
+
+    def add(self, result: PushResult):
+        self.results.setdefault(result.task.start_date.date(), []).append(result)
+
+    def merge(self, other: "PushReport"):
+        for day_results in other.results.values():
+            for result in day_results:
+                self.add(result)
+
+    def get_succeeded(self) -> list[PushResult]:
+        return [result for day_results in self.results.values() for result in day_results if result.succeeded]
+
+    def get_skipped(self) -> list[PushResult]:
+        return [result for day_results in self.results.values() for result in day_results if result.skipped]
+
+    def get_failed(self) -> list[PushResult]:
+        return [result for day_results in self.results.values() for result in day_results if not result.succeeded]
+
+    def log_summary(self):
+        for day in sorted(self.results):
+            day_results = self.results[day]
+            failed = [result for result in day_results if not result.succeeded]
+            skipped_count = len([result for result in day_results if result.skipped])
+            summary = f"{day}: pushed {len(day_results) - len(failed)}/{len(day_results)} time entries"
+            if skipped_count:
+                summary += f" ({skipped_count} already pushed before)"
+            for action in (UPDATE_ACTION, DELETE_ACTION):
+                action_count = len([result for result in day_results if result.action == action])
+                if action_count:
+                    summary += f", {action_count} of them {action}d"
+            if failed:
+                LOG.error(summary)
+                for result in failed:
+                    LOG.error(f"  failed {result.task}: {result.error}")
+            else:
+                LOG.info(summary)
+
+
+@METRICS.phase("push")
+def push_tasks(
+    api: TMetricsAPI, task_list: Iterable["Task"], concurrency: int = 1, journal: PushJournal | None = None
+) -> PushReport:
+    """Push scheduled tasks as time entries, collecting a result for every task instead of stopping on errors.
+
+    Tasks acknowledged in the journal are skipped, new pushes are recorded in it.
+    """
+    report = PushReport()
+    if journal:
+        task_list = _skip_acked(task_list, journal, report)
+    run_operations((functools.partial(_push_task, api, task, journal) for task in task_list), report, concurrency)
+    return report
+
+
+def run_operations(operation_list: Iterable[Callable[[], PushResult]], report: PushReport, concurrency: int = 1):
+    """Run API operations and add their results to the report.
+
+    Operations are consumed lazily and at most a few per worker are in flight, so memory stays bounded for long
+    inputs.
+    """
+    if concurrency <= 1:
+        for operation in operation_list:
+            report.add(operation())
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="push") as executor:
+        in_flight: set[Future] = set()
+        try:
+            for operation in operation_list:
+                if len(in_flight) >= concurrency * IN_FLIGHT_PER_WORKER:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report.add(future.result())
+                in_flight.add(executor.submit(operation))
+            for future in wait(in_flight).done:
+                report.add(future.result())
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def _skip_acked(task_list: Iterable["Task"], journal: PushJournal, report: PushReport) -> Iterable["Task"]:
+    for task in task_list:
+        if journal.is_acked(task):
+            LOG.debug(f"Skipping already pushed {task}")
+            report.add(PushResult(task, skipped=True, entry_id=journal.get_entry_id(task)))
+        else:
+            yield task
+
+
+def _push_task(api: TMetricsAPI, task: "Task", journal: PushJournal | None = None) -> PushResult:
+    LOG.debug(f"Adding task time entry {task}")
+    if journal:
+        journal.record_pending(task)
+    try:
+        entry = api.add_time_entry(
+            project_id=task.project_id, note=task.note, start_time=task.start_date, end_time=task.end_date
+        )
+    except TMetricsAPIError as e:
+        return PushResult(task, error=str(e))
+    entry_id = entry.get("id") if isinstance(entry, dict) else None
+    if journal:
+        journal.record_acked(task, entry_id)
+    return PushResult(task, entry_id=entry_id)
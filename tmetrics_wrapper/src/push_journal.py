@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from time_blocks_planner import Task
+
+LOG = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal"
+PENDING_EVENT = "pending"
+ACKED_EVENT = "acked"
+REMOVED_EVENT = "removed"
+
+
+def get_task_key(task: "Task") -> str:
+    """Stable identity of a scheduled task, independent of the process that planned it."""
+    payload = json.dumps([task.project_id, task.note, task.start_date.isoformat(), task.end_date.isoformat()])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PushJournal:
+    """Append-only write-ahead log of pushed time entries.
+
+    Every push is recorded as pending before the request and as acked, with the id the server assigned, once the
+    server accepted it, so a rerun after a crash can skip everything that is already in TMetrics. Entries later moved
+    by an update or deleted are recorded as removed, so an identical task planned into their old slot is pushed again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._acked: dict[str, int | None] = {}
+        self._lock = threading.Lock()
+        unconfirmed = self._load()
+        if unconfirmed:
+            LOG.warning(
+                f"{len(unconfirmed)} time entries from {path} were sent but never confirmed. "
+                "They will be pushed again, check for duplicates afterwards."
+            )
+        self._file = open(path, "a", encoding="utf-8")  # noqa: SIM115
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def is_acked(self, task: "Task") -> bool:
+        return get_task_key(task) in self._acked
+
+    def get_entry_id(self, task: "Task") -> int | None:
+        return self._acked.get(get_task_key(task))
+
+    def record_pending(self, task: "Task"):
+        self._write(PENDING_EVENT, task)
+
+    def record_acked(self, task: "Task", entry_id: int | None = None):
+        key = self._write(ACKED_EVENT, task, entry_id)
+        with self._lock:
+            self._acked[key] = entry_id
+
+    def record_removed(self, task: "Task", entry_id: int | None):
+        """Forget the entry pushed for the task, unless another entry was acked in its slot meanwhile."""
+        key = self._write(REMOVED_EVENT, task, entry_id)
+        with self._lock:
+            self._forget(key, entry_id)
+
+    def _write(self, event: str, task: "Task", entry_id: int | None = None) -> str:
+        key = get_task_key(task)
+        record = {"event": event, "key": key, "task": str(task)}
+        if entry_id is not None:
+            record["id"] = entry_id
+        line = json.dumps(record)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return key
+
+    def _forget(self, key: str, entry_id: int | None):
+        if key in self._acked and self._acked[key] == entry_id:
+            del self._acked[key]
+
+    def _load(self) -> set[str]:
+        pending: set[str] = set()
+        if not os.path.exists(self.path):
+            return pending
+        with open(self.path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    LOG.warning(f"Ignoring corrupted journal record {self.path}:{line_number}")
+                    continue
+                if record["event"] == ACKED_EVENT:
+                    self._acked[record["key"]] = record.get("id")
+                elif record["event"] == REMOVED_EVENT:
+                    self._forget(record["key"], record.get("id"))
+                else:
+                    pending.add(record["key"])
+        LOG.debug(f"Loaded {len(self._acked)} acknowledged time entries from {self.path}")
+        return pending - self._acked.keys()
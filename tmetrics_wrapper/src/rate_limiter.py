@@ -0,0 +1,63 @@
+import logging
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.05
+MIN_RATE_DIVISOR = 16
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every request of a client.
+
+    The rate adapts to the server: it is halved whenever the server throttles or fails (down to a floor)
+    and grows back additively with every successful request.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self._max_rate = rate
+        self._min_rate = rate / MIN_RATE_DIVISOR
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+    def on_throttle(self, delay: float | None = None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._rate = max(self._min_rate, self._rate * DECREASE_FACTOR)
+            if delay:
+                self._paused_until = max(self._paused_until, now + delay)
+            LOG.debug(f"Throttled, request rate lowered to {self._rate:.2f}/s")
+
+    def on_success(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._rate = min(self._max_rate, self._rate + self._max_rate * INCREASE_STEP)
+
+    def _refill(self, now: float):
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
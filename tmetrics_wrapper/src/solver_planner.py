@@ -0,0 +1,270 @@
+import bisect
+import itertools
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+
+from instrumentation import METRICS
+from planner_trace import PLACED, TRACE
+from time_blocks_planner import (
+    OPTIMAL_WORKDAY_SLACK_TIMEDELTA,
+    WORKDAY_END_TIME,
+    WORKDAY_START_TIME,
+    NotFullyPlannedError,
+    Task,
+    TimeBlocksPlanner,
+    WorkDay,
+)
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PLAN_TIME_BUDGET_SEC = 1.0
+MICROSECOND = timedelta(microseconds=1)
+
+
+class SolverTimeBlocksPlanner(TimeBlocksPlanner):
+    """TimeBlocksPlanner that searches for a better plan than the greedy one within a time budget.
+
+    The greedy plan is made first. A depth first branch and bound search then assigns tasks, longest first, to the
+    free blocks of the workdays, trying the least loaded days first. Plans are compared by, in this order, the number
+    of similar tasks sharing a day, the number of days left with less than the optimal slack and the sum of squared
+    day durations, so among plans respecting the preferences equally the most balanced one wins.
+    The similarity and slack rules of the greedy planner are preferences here, so a plan is found whenever the tasks
+    fit into the free blocks, even if the greedy passes give up. When the budget runs out the best plan found so far
+    is kept.
+    """
+
+    def __init__(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        task_list: list[Task],
+        existing_entry_index=None,
+        time_budget_sec: float = DEFAULT_PLAN_TIME_BUDGET_SEC,
+    ):
+        super().__init__(start_date, end_date, task_list, existing_entry_index)
+        self.time_budget_sec = time_budget_sec
+
+    def plan(self):
+        """Make the greedy plan, then search for a better one for up to ``time_budget_sec``."""
+        search = _PlanSearch(self.workday_list, self.task_list)
+        greedy_error = None
+        try:
+            super().plan()
+        except NotFullyPlannedError as e:
+            greedy_error = e
+        incumbent_cost = None if greedy_error else _get_plan_cost(self.workday_list)
+
+        assignment = search.run(time.perf_counter() + self.time_budget_sec, incumbent_cost)
+        if assignment is not None:
+            self._apply_assignment(search, assignment)
+        elif greedy_error:
+            raise greedy_error
+
+    def _apply_assignment(self, search: "_PlanSearch", assignment: list[int]):
+        """Replace the greedy plan with the one found by the search."""
+        self.workday_list = [
+            WorkDay(workday.start_date.date(), workday.existing_task_list) for workday in self.workday_list
+        ]
+        for task in self.task_list:
+            task.start_date = None
+            task.end_date = None
+
+        block_ends = [block_start for _, block_start, _ in search.blocks]
+        for task_index, block_index in zip(search.order, assignment, strict=True):
+            task = self.task_list[task_index]
+            day_index, _, _ = search.blocks[block_index]
+            task.start_date = block_ends[block_index]
+            task.end_date = task.start_date + task.duration
+            block_ends[block_index] = task.end_date
+            self.workday_list[day_index].add_scheduled_task(task)
+            if TRACE.enabled:
+                TRACE.record(PLACED, None, task.start_date.date(), task, task.start_date.time())
+        if TRACE.enabled:
+            self.trace_events = TRACE.get_events(since=self._trace_mark)
+
+
+class _PlanSearch:
+    """Branch and bound over assignments of tasks to the free blocks of workdays, in integer microseconds."""
+
+    def __init__(self, workday_list: list[WorkDay], task_list: list[Task]):
+        self.blocks = [
+            (day_index, block_start, block_end)
+            for day_index, workday in enumerate(workday_list)
+            for block_start, block_end in workday.get_free_blocks()
+            if block_end > block_start
+        ]
+        self.block_free = [(block_end - block_start) // MICROSECOND for _, block_start, block_end in self.blocks]
+        self.day_length = (WORKDAY_END_TIME.hour - WORKDAY_START_TIME.hour) * 3600 * 10**6
+        self.day_occupied = [workday.get_occupied_time() // MICROSECOND for workday in workday_list]
+        self.day_keys = [
+            Counter(task.get_similarity_key() for task in workday.existing_task_list) for workday in workday_list
+        ]
+        self.block_days = [day_index for day_index, _, _ in self.blocks]
+        self.day_blocks: list[list[int]] = [[] for _ in workday_list]
+        for block_index, day_index in enumerate(self.block_days):
+            self.day_blocks[day_index].append(block_index)
+        self.load_order = sorted(
+            (self.day_occupied[day_index], index) for index, day_index in enumerate(self.block_days)
+        )
+        self.slack = OPTIMAL_WORKDAY_SLACK_TIMEDELTA // MICROSECOND
+
+        self.order = sorted(
+            range(len(task_list)),
+            key=lambda index: (-task_list[index].duration, task_list[index].project_id, task_list[index].note),
+        )
+        self.durations = [task_list[index].duration // MICROSECOND for index in self.order]
+        self.keys = [task_list[index].get_similarity_key() for index in self.order]
+        self.remaining_durations = list(itertools.accumulate(reversed(self.durations)))[::-1]
+
+        self.similar_count = sum(count - 1 for keys in self.day_keys for count in keys.values())
+        self.tight_day_count = sum(self.day_length - occupied < self.slack for occupied in self.day_occupied)
+        self.squared_total = sum(occupied * occupied for occupied in self.day_occupied)
+
+    def run(self, deadline: float, incumbent_cost: tuple[int, int, int] | None) -> list[int] | None:
+        """Return the block of every task, in ``order``, of the best plan cheaper than the incumbent, if any."""
+        statistics: Counter[str] = Counter()
+        best_assignment = None
+        best_cost = incumbent_cost
+        task_count = len(self.order)
+        assignment = [-1] * task_count
+        total_free = sum(self.block_free)
+        if not task_count or self.remaining_durations[0] > total_free:
+            return None
+
+        with METRICS.phase("solve"):
+            choice_stack = [self._iter_choices(0, assignment)]
+            while choice_stack:
+                depth = len(choice_stack) - 1
+                if assignment[depth] != -1:
+                    total_free += self._unassign(depth, assignment)
+                if time.perf_counter() >= deadline:
+                    statistics["solver.budget_exhausted"] += 1
+                    LOG.debug(f"Plan time budget exhausted after {statistics['solver.nodes']} nodes")
+                    break
+                block_index = next(choice_stack[-1], None)
+                if block_index is None:
+                    choice_stack.pop()
+                    continue
+
+                total_free -= self._assign(depth, block_index, assignment)
+                statistics["solver.nodes"] += 1
+                cost = (self.similar_count, self.tight_day_count, self.squared_total)
+                if best_cost is not None and cost >= best_cost:
+                    continue
+                if depth + 1 == task_count:
+                    statistics["solver.solutions"] += 1
+                    best_cost = cost
+                    best_assignment = list(assignment)
+                    continue
+                if self.remaining_durations[depth + 1] <= total_free:
+                    choice_stack.append(self._iter_choices(depth + 1, assignment))
+        statistics["solver.improved"] += best_assignment is not None
+        METRICS.add_counters(statistics)
+        return best_assignment
+
+    def _iter_choices(self, depth: int, assignment: list[int]) -> Iterator[int]:
+        """Yield the blocks the task fits into, the ones adding the least cost first.
+
+        Identical tasks take blocks in non decreasing order and of empty days with the same free time only the first
+        is tried, since the other choices only permute an already explored plan.
+        """
+        duration = self.durations[depth]
+        key = self.keys[depth]
+        block_free = self.block_free
+        block_days = self.block_days
+        day_occupied = self.day_occupied
+        day_keys = self.day_keys
+        first_block = assignment[depth - 1] if depth and self.keys[depth - 1] == key else 0
+
+        best_block = self._find_best_block(duration, key, first_block)
+        if best_block is None:
+            return
+        yield best_block
+
+        max_occupied = self.day_length - self.slack - duration
+        seen_empty_days = {block_free[best_block]} if not day_occupied[block_days[best_block]] else set()
+        candidate_list = []
+        for block_index in range(first_block, len(block_free)):
+            free = block_free[block_index]
+            if free < duration or block_index == best_block:
+                continue
+            day_index = block_days[block_index]
+            occupied = day_occupied[day_index]
+            if not occupied and free == self.day_length:
+                if free in seen_empty_days:
+                    continue
+                seen_empty_days.add(free)
+            candidate_list.append((day_keys[day_index][key] > 0, occupied > max_occupied, occupied, block_index))
+        candidate_list.sort()
+        for *_, block_index in candidate_list:
+            yield block_index
+
+    def _find_best_block(self, duration: int, key: tuple, first_block: int) -> int | None:
+        """Return the first choice of _iter_choices without scoring every block.
+
+        Tightness only grows with the load of the day, so the least loaded block the task fits into without a similar
+        task is the best one, and only when there is none a day with a similar task is taken.
+        """
+        best_similar_block = None
+        for _, block_index in self.load_order:
+            if block_index < first_block or self.block_free[block_index] < duration:
+                continue
+            if not self.day_keys[self.block_days[block_index]][key]:
+                return block_index
+            if best_similar_block is None:
+                best_similar_block = block_index
+        return best_similar_block
+
+    def _assign(self, depth: int, block_index: int, assignment: list[int]) -> int:
+        duration = self.durations[depth]
+        day_index = self.blocks[block_index][0]
+        occupied = self.day_occupied[day_index]
+        keys = self.day_keys[day_index]
+        self.similar_count += keys[self.keys[depth]] > 0
+        keys[self.keys[depth]] += 1
+        free = self.day_length - occupied
+        self.tight_day_count += free >= self.slack > free - duration
+        self.squared_total += (occupied + duration) ** 2 - occupied * occupied
+        self._set_day_occupied(day_index, occupied + duration)
+        self.block_free[block_index] -= duration
+        assignment[depth] = block_index
+        return duration
+
+    def _unassign(self, depth: int, assignment: list[int]) -> int:
+        duration = self.durations[depth]
+        block_index = assignment[depth]
+        day_index = self.blocks[block_index][0]
+        occupied = self.day_occupied[day_index] - duration
+        keys = self.day_keys[day_index]
+        keys[self.keys[depth]] -= 1
+        self.similar_count -= keys[self.keys[depth]] > 0
+        free = self.day_length - occupied
+        self.tight_day_count -= free >= self.slack > free - duration
+        self.squared_total -= (occupied + duration) ** 2 - occupied * occupied
+        self._set_day_occupied(day_index, occupied)
+        self.block_free[block_index] += duration
+        assignment[depth] = -1
+        return duration
+
+    def _set_day_occupied(self, day_index: int, occupied: int):
+        previous = self.day_occupied[day_index]
+        for block_index in self.day_blocks[day_index]:
+            del self.load_order[bisect.bisect_left(self.load_order, (previous, block_index))]
+            bisect.insort(self.load_order, (occupied, block_index))
+        self.day_occupied[day_index] = occupied
+
+
+def _get_plan_cost(workday_list: list[WorkDay]) -> tuple[int, int, int]:
+    """Cost of a complete plan, comparable with the costs minimized by _PlanSearch."""
+    similar_count = 0
+    tight_day_count = 0
+    squared_total = 0
+    for workday in workday_list:
+        keys = Counter(task.get_similarity_key() for task in workday.task_list + workday.existing_task_list)
+        similar_count += sum(count - 1 for count in keys.values())
+        tight_day_count += workday.get_free_time() < OPTIMAL_WORKDAY_SLACK_TIMEDELTA
+        squared_total += (workday.get_occupied_time() // MICROSECOND) ** 2
+    return similar_count, tight_day_count, squared_total
@@ -0,0 +1,143 @@
+import logging
+import os
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date
+
+from api import TMetricsAPIError
+from input_parser import TASK_DEFINITION_SEPARATOR, AggregatedTaskParsingError, TaskParsingError, TasksParser
+from planner_trace import render_trace
+from project_config import ProjectConfigError, load_project_index
+from time_blocks_planner import NotFullyPlannedError, Task, TimeBlocksPlanner
+
+LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class WatchedPeriod:
+    """A period of the tasks file with its plan, or the error that prevented parsing or planning it."""
+
+    text: str
+    line_number: int
+    planner: TimeBlocksPlanner | None = None
+    error: str | None = None
+
+
+def split_period_chunks(text: str) -> list[tuple[int, str]]:
+    """Split a tasks file into the text of every period, each with the line number it starts at."""
+    chunk_list = []
+    chunk_lines: list[str] = []
+    first_line_number = 1
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if line.strip() == TASK_DEFINITION_SEPARATOR:
+            chunk_list.append((first_line_number, "\n".join(chunk_lines)))
+            chunk_lines = []
+            first_line_number = line_number + 1
+        else:
+            chunk_lines.append(line)
+    chunk_list.append((first_line_number, "\n".join(chunk_lines)))
+    return [(line_number, chunk) for line_number, chunk in chunk_list if chunk.strip()]
+
+
+class TasksWatcher:
+    """Keep the periods of a tasks file parsed and planned, redoing only what changed on disk.
+
+    Periods are matched by their text, so editing one period re-parses and replans only that one. A change of the
+    config reloads the project index and replans everything.
+    """
+
+    def __init__(
+        self,
+        tasks_file: str,
+        config_file: str,
+        plan_function: Callable[[tuple[date, date, list[Task]]], TimeBlocksPlanner],
+    ):
+        self.tasks_file = tasks_file
+        self.config_file = config_file
+        self.plan_function = plan_function
+        self.periods: list[WatchedPeriod] = []
+        self.config_error: str | None = None
+        self._parser: TasksParser | None = None
+        self._file_stamps: dict[str, tuple[int, int] | None] = {}
+
+    def refresh(self, force: bool = False) -> list[WatchedPeriod] | None:
+        """Reload the files if they changed, or unconditionally with ``force``.
+
+        Returns the periods parsed and planned again, or None when neither file changed.
+        """
+        file_stamps = {path: _get_file_stamp(path) for path in (self.tasks_file, self.config_file)}
+        if file_stamps == self._file_stamps and not force:
+            return None
+        config_changed = force or file_stamps[self.config_file] != self._file_stamps.get(self.config_file)
+        self._file_stamps = file_stamps
+
+        if config_changed:
+            self.periods = []
+            try:
+                self._parser = TasksParser(project_index=load_project_index(self.config_file))
+                self.config_error = None
+            except (OSError, ValueError, ProjectConfigError) as e:
+                self._parser = None
+                self.config_error = f"{self.config_file}: {e}"
+        if self._parser is None:
+            return []
+
+        try:
+            with open(self.tasks_file, encoding="utf-8") as file:
+                text = file.read()
+        except OSError as e:
+            self.periods = [WatchedPeriod("", 1, error=f"{self.tasks_file}: {e}")]
+            return self.periods
+
+        known_periods: dict[tuple[str, int], WatchedPeriod] = {}
+        occurrences: Counter[str] = Counter()
+        for period in self.periods:
+            known_periods[(period.text, occurrences[period.text])] = period
+            occurrences[period.text] += 1
+
+        occurrences.clear()
+        period_list = []
+        changed_list = []
+        for line_number, chunk in split_period_chunks(text):
+            period = known_periods.get((chunk, occurrences[chunk]))
+            occurrences[chunk] += 1
+            if period is None or (period.error and period.line_number != line_number):
+                period = self._load_period(chunk, line_number)
+                changed_list.append(period)
+            period.line_number = line_number
+            period_list.append(period)
+        self.periods = period_list
+        return changed_list
+
+    def get_errors(self) -> list[str]:
+        errors = [self.config_error] if self.config_error else []
+        return errors + [period.error for period in self.periods if period.error]
+
+    def _load_period(self, chunk: str, line_number: int) -> WatchedPeriod:
+        period = WatchedPeriod(chunk, line_number)
+        try:
+            parsed_list = list(
+                self._parser.parse_lines(
+                    chunk.splitlines(), source_name=self.tasks_file, collect_errors=True, first_line_number=line_number
+                )
+            )
+            if parsed_list:
+                period.planner = self.plan_function(parsed_list[0])
+        except (TaskParsingError, AggregatedTaskParsingError) as e:
+            period.error = str(e)
+        except NotFullyPlannedError as e:
+            period.error = f"{self.tasks_file}:{line_number}: {e}"
+            if e.trace_events:
+                period.error += f"\n{render_trace(e.trace_events)}"
+        except TMetricsAPIError as e:
+            period.error = f"{self.tasks_file}:{line_number}: fetching tracked time entries failed: {e}"
+        return period
+
+
+def _get_file_stamp(path: str) -> tuple[int, int] | None:
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size
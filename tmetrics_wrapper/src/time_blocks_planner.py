@@ -1,10 +1,16 @@
-import copy
+import bisect
 import logging
+import sys
+from collections import Counter
 from datetime import datetime, time, timedelta
+from typing import TYPE_CHECKING
 
-import pandas
-from api import TMetricsAPI
-from termcolor import colored
+from instrumentation import METRICS
+from plan_renderer import render_markdown_table
+from planner_trace import DEFERRED_SIMILAR, DEFERRED_SLACK, NO_ROOM, PLACED, SPLIT, TRACE, TraceEvent
+
+if TYPE_CHECKING:
+    from time_entries import TimeEntryIndex
 
 LOG = logging.getLogger(__name__)
 
@@ -13,15 +19,24 @@ WORKDAY_END_TIME = time(hour=17)
 AVG_WORKDAY_DURATION_HOUR = 8
 MAX_TASK_DURATION_TIMEDELTA = timedelta(hours=8)
 PLANNING_ITERATIONS = 4
+PLANNER_VERSION = 1
+EXISTING_TASK_MARKER = " [tracked]"
+OPTIMAL_WORKDAY_SLACK_TIMEDELTA = timedelta(minutes=40)
 
 
 class NotFullyPlannedError(Exception):
     """Raised when some tasks couldn't be planned"""
 
+    def __init__(self, message: str, trace_events: list[TraceEvent] = ()):
+        super().__init__(message)
+        self.trace_events = list(trace_events)
+
 
 class Task:
+    __slots__ = ("note", "project_id", "duration", "start_date", "end_date", "requested_split")
+
     def __init__(self, note: str, project_id: int, duration: timedelta, requested_split: int = 1):
-        self.note = note
+        self.note = sys.intern(note)
         self.project_id = project_id
         self.duration = duration
         self.start_date = None
@@ -30,12 +45,19 @@ class Task:
 
     def is_similar_task(self, other) -> bool:
         if isinstance(other, self.__class__):
-            return self.note == other.note and self.project_id == other.project_id and self.duration == other.duration
+            return self.get_similarity_key() == other.get_similarity_key()
         return False
 
+    def get_similarity_key(self) -> tuple[str, int, timedelta]:
+        return self.note, self.project_id, self.duration
+
     def is_scheduled(self) -> bool:
         return bool(self.start_date)
 
+    def split(self, count: int) -> list["Task"]:
+        duration = self.duration / count
+        return [Task(self.note, self.project_id, duration, self.requested_split) for _ in range(count)]
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
@@ -59,26 +81,65 @@ class Task:
 
 
 class WorkDay:
-    def __init__(self, workday_date: datetime.date):
+    def __init__(self, workday_date: datetime.date, existing_task_list: list[Task] = ()):
         self.start_date = datetime.combine(date=workday_date, time=WORKDAY_START_TIME)
         self.end_date = datetime.combine(date=workday_date, time=WORKDAY_END_TIME)
         self.task_list: list[Task] = []
-        self._last_task_end_date = self.start_date
+        self.existing_task_list: list[Task] = sorted(existing_task_list, key=lambda task: task.start_date)
+        self._occupied_time = timedelta()
+        self._similar_task_counter: Counter[tuple] = Counter()
+        self._free_block_list: list[list[datetime]] = [[self.start_date, self.end_date]]
+        for task in self.existing_task_list:
+            self._reserve(task.start_date, task.end_date)
+            self._occupied_time += task.duration
+            self._similar_task_counter[task.get_similarity_key()] += 1
 
     def add_task(self, task: Task):
-        task.start_date = self._last_task_end_date
+        """Schedule the task at the start of the first free block long enough to hold it."""
+        free_block = next(
+            (block for block in self._free_block_list if block[1] - block[0] >= task.duration),
+            self._free_block_list[-1],
+        )
+        task.start_date = free_block[0]
         task.end_date = task.start_date + task.duration
-        self.task_list.append(task)
-        self._last_task_end_date = task.end_date
+        free_block[0] = task.end_date
+        bisect.insort(self.task_list, task, key=lambda scheduled_task: scheduled_task.start_date)
+        self._occupied_time += task.duration
+        self._similar_task_counter[task.get_similarity_key()] += 1
+
+    def add_scheduled_task(self, task: Task):
+        """Add a task that already has its start and end, e.g. restored from a cached plan."""
+        self._reserve(task.start_date, task.end_date)
+        bisect.insort(self.task_list, task, key=lambda scheduled_task: scheduled_task.start_date)
+        self._occupied_time += task.duration
+        self._similar_task_counter[task.get_similarity_key()] += 1
 
     def get_occupied_time(self) -> timedelta:
-        return sum([task.duration for task in self.task_list], timedelta())
+        return self._occupied_time
 
     def get_free_time(self) -> timedelta:
-        return self.end_date - self.start_date - self.get_occupied_time()
+        return self.end_date - self.start_date - self._occupied_time
+
+    def get_longest_free_block(self) -> timedelta:
+        return max(block[1] - block[0] for block in self._free_block_list)
+
+    def get_free_blocks(self) -> list[tuple[datetime, datetime]]:
+        return [(block_start, block_end) for block_start, block_end in self._free_block_list]
 
     def has_similar_task(self, other_task: Task) -> bool:
-        return bool([task for task in self.task_list if task.is_similar_task(other_task)])
+        return other_task.get_similarity_key() in self._similar_task_counter
+
+    def _reserve(self, start_date: datetime, end_date: datetime):
+        free_block_list = []
+        for block_start, block_end in self._free_block_list:
+            if end_date <= block_start or start_date >= block_end:
+                free_block_list.append([block_start, block_end])
+                continue
+            if block_start < start_date:
+                free_block_list.append([block_start, start_date])
+            if end_date < block_end:
+                free_block_list.append([end_date, block_end])
+        self._free_block_list = free_block_list or [[self.end_date, self.end_date]]
 
     def __str__(self):
         return (
@@ -87,41 +148,70 @@ class WorkDay:
 
 
 class TimeBlocksPlanner:
-    def __init__(self, start_date: datetime.date, end_date: datetime.date, task_list: list[Task]):
+    workday_slack = OPTIMAL_WORKDAY_SLACK_TIMEDELTA
+
+    def __init__(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        task_list: list[Task],
+        existing_entry_index: "TimeEntryIndex | None" = None,
+    ):
         self.start_date = start_date
         self.end_date = end_date
-        self.workday_list = self._generate_workdays(start_date, end_date)
+        self.workday_list = self._generate_workdays(start_date, end_date, existing_entry_index)
+        self.trace_events: list[TraceEvent] = []
+        self._trace_mark = TRACE.mark()
         self.task_list = self._split_tasks(task_list, len(self.workday_list))
 
-    def apply_plan(self, api: TMetricsAPI):
-        for workday in self.workday_list:
-            for task in workday.task_list:
-                self._add_task_time_entry(api=api, task=task)
-            LOG.info(f"Pushed time entries for {workday}")
+    @classmethod
+    def from_schedule(
+        cls,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        scheduled_task_list: list[Task],
+        existing_entry_index: "TimeEntryIndex | None" = None,
+    ) -> "TimeBlocksPlanner":
+        """Restore an already computed plan without planning again."""
+        planner = cls(start_date, end_date, [], existing_entry_index)
+        workdays = {workday.start_date.date(): workday for workday in planner.workday_list}
+        for task in scheduled_task_list:
+            workdays[task.start_date.date()].add_scheduled_task(task)
+        planner.task_list = list(scheduled_task_list)
+        return planner
+
+    def get_scheduled_tasks(self) -> list[Task]:
+        return [task for workday in self.workday_list for task in workday.task_list]
 
     def get_total_planned_time(self) -> timedelta:
         return sum([workday.get_occupied_time() for workday in self.workday_list], timedelta())
 
+    @METRICS.phase("render")
     def display_current_plan(self):
         LOG.debug("Displaying plan.")
 
-        data_frames = []
+        column_list = []
         for workday in self.workday_list:
             date = workday.start_date.date()
-            frame = pandas.DataFrame(
-                {
-                    f"{date} ({workday.get_occupied_time()})": [
-                        f"{task.note} ({task.duration})" for task in workday.task_list
-                    ]
-                }
+            existing_task_set = {id(task) for task in workday.existing_task_list}
+            column_list.append(
+                (
+                    f"{date} ({workday.get_occupied_time()})",
+                    [
+                        f"{task.note} ({task.duration}){EXISTING_TASK_MARKER if id(task) in existing_task_set else ''}"
+                        for task in sorted(
+                            workday.task_list + workday.existing_task_list, key=lambda task: task.start_date
+                        )
+                    ],
+                )
             )
-            data_frames.append(frame)
 
-        frames = pandas.concat(data_frames, axis=1)
         print()
-        print(frames.to_markdown())
+        print(render_markdown_table(column_list))
 
         total_planned_time_hour = self.get_total_planned_time().total_seconds() // 3600
+        from termcolor import colored
+
         summary_printing_color = "green"
         if total_planned_time_hour / len(self.workday_list) != AVG_WORKDAY_DURATION_HOUR:
             summary_printing_color = "yellow"
@@ -133,8 +223,22 @@ class TimeBlocksPlanner:
             )
         )
 
+    @METRICS.phase("plan")
     def plan(self):
-        remaining_task_list = sorted(self.task_list, key=lambda task: task.duration, reverse=True)
+        """Schedule all tasks in up to PLANNING_ITERATIONS passes over the workdays, alternating their direction.
+
+        Scheduled and deferred tasks of every pass and similarity hits are added to METRICS counters. When TRACE is
+        enabled, the decisions are kept in ``trace_events``.
+        """
+        statistics: Counter[str] = Counter()
+        remaining_task_list = self._plan_passes(statistics)
+        METRICS.add_counters(statistics)
+        self._finish_plan(remaining_task_list)
+
+    def _plan_passes(self, statistics: Counter[str]) -> list[Task]:
+        """Run the passes of ``plan`` without recording METRICS, counting into ``statistics``; return the remaining
+        tasks."""
+        remaining_task_list = self._order_tasks(self.task_list)
         for i in range(PLANNING_ITERATIONS):
             LOG.debug(f"Planning ({i})")
             remaining_task_list = [task for task in remaining_task_list if not task.is_scheduled()]
@@ -142,65 +246,126 @@ class TimeBlocksPlanner:
                 LOG.debug("Successfully planned all tasks.")
                 break
 
-            for workday in reversed(self.workday_list) if i % 2 == 0 else self.workday_list:
-                self._plan_workday(i, remaining_task_list, workday)
-
+            statistics["planner.iterations"] += 1
+            negated_durations = [-task.duration for task in remaining_task_list]
+            for workday in self._get_pass_workdays(i):
+                self._plan_workday(i, remaining_task_list, negated_durations, workday, statistics, self.workday_slack)
+            scheduled_count = statistics[f"planner.pass_{i}.scheduled"]
+            statistics[f"planner.pass_{i}.deferred"] = len(remaining_task_list) - scheduled_count
+        return remaining_task_list
+
+    def _order_tasks(self, task_list: list[Task]) -> list[Task]:
+        """Return the tasks in the order they are offered to the workdays, which must be by duration descending."""
+        return sorted(task_list, key=lambda task: task.duration, reverse=True)
+
+    def _get_pass_workdays(self, iteration: int) -> list[WorkDay]:
+        return self.workday_list[::-1] if iteration % 2 == 0 else self.workday_list
+
+    def _finish_plan(self, remaining_task_list: list[Task]):
+        """Keep the trace of the plan and raise NotFullyPlannedError, carrying it, if any task is left."""
+        if TRACE.enabled:
+            longest_free_block = max(
+                (workday.get_longest_free_block() for workday in self.workday_list), default=timedelta()
+            )
+            for task in remaining_task_list:
+                TRACE.record(NO_ROOM, None, None, task, longest_free_block)
+            self.trace_events = TRACE.get_events(since=self._trace_mark)
         if remaining_task_list:
             raise NotFullyPlannedError(
-                f"Couldn't schedule following tasks: {[str(task) for task in remaining_task_list]}"
+                f"Couldn't schedule following tasks: {[str(task) for task in remaining_task_list]}", self.trace_events
             )
 
     @staticmethod
-    def _add_task_time_entry(api, task: Task):
-        LOG.debug(f"Adding task time entry {task}")
-        api.add_time_entry(
-            project_id=task.project_id, note=task.note, start_time=task.start_date, end_time=task.end_date
-        )
-
-    @staticmethod
-    def _plan_workday(iteration: int, remaining_task_list, workday):
-        for task in remaining_task_list:
-            LOG.debug(f"Free time: {workday.get_free_time()}, task duration {task.duration}")
-            if not task.is_scheduled() and (task.duration < workday.get_free_time()):
-                LOG.debug(f"Trying to schedule {task} into {workday}")
-                if iteration < (PLANNING_ITERATIONS - 2) and (
-                    workday.has_similar_task(task) or task.duration > workday.get_free_time() - timedelta(minutes=40)
-                ):
-                    LOG.debug(
-                        "Similar task is already scheduled in the same workday or extending optimal daily workhours. "
-                        "Waiting for better opportunity."
-                    )
-                else:
-                    LOG.debug(f"Adding task {task} to workday {workday}")
-                    workday.add_task(task)
+    def _plan_workday(  # noqa: PLR0913
+        iteration: int,
+        remaining_task_list: list[Task],
+        negated_durations: list[timedelta],
+        workday: WorkDay,
+        statistics: Counter[str],
+        slack: timedelta = OPTIMAL_WORKDAY_SLACK_TIMEDELTA,
+    ):
+        """Greedily fill the workday with the longest remaining tasks that fit.
+
+        ``remaining_task_list`` is sorted by duration descending and ``negated_durations`` mirrors it in ascending
+        order, so tasks too long for the current free time, or for the longest gap between already tracked entries,
+        are skipped with a binary search instead of a scan.
+        In the early iterations tasks that would leave less than ``slack`` free are skipped the same way.
+        """
+        keep_slack = iteration < (PLANNING_ITERATIONS - 2)
+        trace = TRACE.enabled
+        index = 0
+        while True:
+            free_time = workday.get_free_time()
+            longest_free_block = workday.get_longest_free_block()
+            if keep_slack:
+                max_duration = min(free_time - slack, longest_free_block)
+                first_fitting = bisect.bisect_left(negated_durations, -max_duration)
+            elif longest_free_block < free_time:
+                first_fitting = bisect.bisect_left(negated_durations, -longest_free_block)
+            else:
+                first_fitting = bisect.bisect_right(negated_durations, -free_time)
+            index = max(index, first_fitting)
+            if index >= len(remaining_task_list):
+                if trace and keep_slack:
+                    _trace_slack_deferrals(iteration, remaining_task_list, negated_durations, workday, slack)
+                return
+
+            task = remaining_task_list[index]
+            index += 1
+            if task.is_scheduled():
+                continue
+            if keep_slack and workday.has_similar_task(task):
+                statistics["planner.similarity_hits"] += 1
+                if trace:
+                    TRACE.record(DEFERRED_SIMILAR, iteration, workday.start_date.date(), task)
+                continue
+            workday.add_task(task)
+            if trace:
+                TRACE.record(PLACED, iteration, workday.start_date.date(), task, task.start_date.time())
+            statistics[f"planner.pass_{iteration}.scheduled"] += 1
 
     @staticmethod
+    @METRICS.phase("split")
     def _split_tasks(task_list: list[Task], default_split: int) -> list[Task]:
         result: list[Task] = []
         for task in task_list:
             if task.requested_split > 1 and task.duration / task.requested_split <= MAX_TASK_DURATION_TIMEDELTA:
-                LOG.debug(f"Splitting task {task} into requested split ({task.requested_split})")
-                for _ in range(task.requested_split):
-                    new_task = copy.deepcopy(task)
-                    new_task.duration /= task.requested_split
-                    result.append(new_task)
+                split_count = task.requested_split
             elif task.duration > MAX_TASK_DURATION_TIMEDELTA:
-                LOG.debug(f"Splitting task {task} into daily split ({default_split})")
-                for _ in range(default_split):
-                    new_task = copy.deepcopy(task)
-                    new_task.duration /= default_split
-                    result.append(new_task)
+                split_count = default_split
             else:
-                LOG.debug(f"Appending without split: {task}")
                 result.append(task)
+                continue
+            if TRACE.enabled:
+                TRACE.record(SPLIT, None, None, task, split_count)
+            result.extend(task.split(split_count))
 
         return result
 
     @staticmethod
-    def _generate_workdays(start_date: datetime.date, end_date: datetime.date) -> list[WorkDay]:
+    def _generate_workdays(
+        start_date: datetime.date, end_date: datetime.date, existing_entry_index: "TimeEntryIndex | None" = None
+    ) -> list[WorkDay]:
         result = []
         delta = timedelta(days=1)
         while start_date <= end_date:
-            result.append(WorkDay(start_date))
+            existing_task_list = existing_entry_index.get_day(start_date) if existing_entry_index else ()
+            result.append(WorkDay(start_date, existing_task_list))
             start_date += delta
         return result
+
+
+def _trace_slack_deferrals(
+    iteration: int,
+    remaining_task_list: list[Task],
+    negated_durations: list[timedelta],
+    workday: WorkDay,
+    slack: timedelta,
+):
+    """Record the tasks left out of the filled workday only because they would leave less than ``slack`` free."""
+    first_fitting = bisect.bisect_left(
+        negated_durations, -min(workday.get_free_time(), workday.get_longest_free_block())
+    )
+    for task in remaining_task_list[first_fitting:]:
+        if not task.is_scheduled() and not workday.has_similar_task(task):
+            TRACE.record(DEFERRED_SLACK, iteration, workday.start_date.date(), task, slack)
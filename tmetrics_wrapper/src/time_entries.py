@@ -0,0 +1,85 @@
+import logging
+from collections import defaultdict
+from collections.abc import Callable, Collection, Iterable, Iterator
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING
+
+from api import TMetricsAPI
+from time_blocks_planner import Task
+
+if TYPE_CHECKING:
+    from local_store import LocalStore
+
+LOG = logging.getLogger(__name__)
+
+
+def parse_time_entry(entry: {}) -> Task:
+    """Convert a time entry returned by the API into a scheduled Task. A running timer ends now."""
+    start_date = parse_datetime(entry["startTime"])
+    end_date = parse_datetime(entry["endTime"]) if entry.get("endTime") else datetime.now()
+    project_id = (entry.get("project") or {}).get("id")
+    task = Task(entry.get("note") or "", project_id, end_date - start_date)
+    task.start_date = start_date
+    task.end_date = end_date
+    return task
+
+
+class TimeEntryIndex:
+    """Existing time entries grouped per day and sorted by start time."""
+
+    def __init__(self, day_task_lists: dict[date, list[Task]] | None = None):
+        self._day_task_lists = day_task_lists or {}
+
+    @classmethod
+    def from_entries(
+        cls,
+        entry_list: Iterable[dict],
+        exclude: Callable[[Task], bool] | None = None,
+        exclude_ids: Collection[int] = (),
+    ) -> "TimeEntryIndex":
+        day_task_lists: dict[date, list[Task]] = defaultdict(list)
+        for entry in entry_list:
+            if entry.get("id") in exclude_ids:
+                LOG.debug(f"Not planning around time entry {entry['id']}, it was applied from this plan")
+                continue
+            task = parse_time_entry(entry)
+            if exclude and exclude(task):
+                LOG.debug(f"Not planning around {task}, it comes from this plan")
+                continue
+            day_task_lists[task.start_date.date()].append(task)
+        for task_list in day_task_lists.values():
+            task_list.sort(key=lambda task: task.start_date)
+        return cls(dict(day_task_lists))
+
+    def get_day(self, day: date) -> list[Task]:
+        return self._day_task_lists.get(day, [])
+
+    def __iter__(self) -> Iterator[Task]:
+        for day in sorted(self._day_task_lists):
+            yield from self._day_task_lists[day]
+
+    def __len__(self):
+        return sum(len(task_list) for task_list in self._day_task_lists.values())
+
+
+def fetch_time_entry_index(
+    api: "TMetricsAPI | LocalStore",
+    start_date: date,
+    end_date: date,
+    exclude: Callable[[Task], bool] | None = None,
+    exclude_ids: Collection[int] = (),
+) -> TimeEntryIndex:
+    """Fetch every time entry of the period with a single request."""
+    entry_list = api.get_time_entries(
+        datetime.combine(start_date, time.min), datetime.combine(end_date + timedelta(days=1), time.min)
+    )
+    index = TimeEntryIndex.from_entries(entry_list, exclude=exclude, exclude_ids=exclude_ids)
+    LOG.debug(f"Fetched {len(index)} existing time entries for {start_date} - {end_date}")
+    return index
+
+
+def parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
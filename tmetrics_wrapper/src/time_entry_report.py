@@ -0,0 +1,136 @@
+import csv
+import json
+import logging
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import TextIO
+
+from api import TMetricsAPI
+from local_store import LocalStore
+from time_entries import parse_datetime, parse_time_entry
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_REPORT_WINDOW_DAYS = 28
+CSV_FORMAT = "csv"
+JSONL_FORMAT = "jsonl"
+REPORT_FORMATS = (CSV_FORMAT, JSONL_FORMAT)
+GROUP_FIELDS = ("day", "project_id", "note")
+ENTRY_FIELDS = ("id", "day", "start", "end", "project_id", "note", "seconds", "hours")
+AGGREGATE_FIELDS = ("entries", "seconds", "hours")
+
+
+def iter_time_entries(
+    api: TMetricsAPI | LocalStore, start_date: date, end_date: date, window_days: int = DEFAULT_REPORT_WINDOW_DAYS
+) -> Iterator[dict]:
+    """Yield the time entries starting within the range, ordered by start time, fetched in windows of days.
+
+    From the API, the next window is fetched while the current one is consumed, so at most two windows are held in
+    memory however long the range is. A LocalStore is read in the calling thread, as its SQLite connection cannot be
+    shared with another one.
+    """
+    window_list = []
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=window_days), end_date + timedelta(days=1))
+        window_list.append((datetime.combine(window_start, time.min), datetime.combine(window_end, time.min)))
+        window_start = window_end
+    if not window_list:
+        return
+    if isinstance(api, LocalStore):
+        for window in window_list:
+            yield from _fetch_window(api, *window)
+        return
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="report") as executor:
+        future = executor.submit(_fetch_window, api, *window_list[0])
+        for next_window in [*window_list[1:], None]:
+            entry_list = future.result()
+            if next_window:
+                future = executor.submit(_fetch_window, api, *next_window)
+            yield from entry_list
+
+
+def to_entry_row(entry: dict) -> dict:
+    task = parse_time_entry(entry)
+    return {
+        "id": entry.get("id"),
+        "day": task.start_date.date().isoformat(),
+        "start": task.start_date.isoformat(),
+        "end": task.end_date.isoformat(),
+        "project_id": task.project_id,
+        "note": task.note,
+        **_get_duration_fields(task.duration),
+    }
+
+
+def aggregate_time_entries(entries: Iterable[dict], group_by: tuple[str, ...]) -> Iterator[dict]:
+    """Sum the time entries per distinct values of the ``group_by`` fields, a subset of GROUP_FIELDS.
+
+    Entries must be ordered by start time. When grouping by day, the rows of a day are yielded as soon as the first
+    entry of a later day arrives, so only one day is kept in memory. Otherwise rows are yielded at the end and memory
+    grows with the number of projects or notes, not entries.
+    """
+    group_by = tuple(field for field in GROUP_FIELDS if field in group_by)
+    groups: dict[tuple, list] = {}
+    current_day = None
+    for entry in entries:
+        task = parse_time_entry(entry)
+        day = task.start_date.date()
+        if "day" in group_by and day != current_day:
+            yield from _get_aggregate_rows(group_by, groups)
+            groups = {}
+            current_day = day
+        values = {"day": day.isoformat(), "project_id": task.project_id, "note": task.note}
+        key = tuple(values[field] for field in group_by)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [0, timedelta()]
+        group[0] += 1
+        group[1] += task.duration
+    yield from _get_aggregate_rows(group_by, groups)
+
+
+def get_report_fields(group_by: tuple[str, ...]) -> tuple[str, ...]:
+    if not group_by:
+        return ENTRY_FIELDS
+    return tuple(field for field in GROUP_FIELDS if field in group_by) + AGGREGATE_FIELDS
+
+
+def write_report_rows(rows: Iterable[dict], fields: tuple[str, ...], output: TextIO, report_format: str) -> int:
+    """Write the rows one by one as they come and return how many were written."""
+    row_count = 0
+    if report_format == CSV_FORMAT:
+        writer = csv.DictWriter(output, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            row_count += 1
+    elif report_format == JSONL_FORMAT:
+        for row in rows:
+            output.write(json.dumps(row) + "\n")
+            row_count += 1
+    else:
+        raise ValueError(f"Unknown report format {report_format!r}, expected one of {', '.join(REPORT_FORMATS)}")
+    return row_count
+
+
+def _fetch_window(api: TMetricsAPI | LocalStore, start_date: datetime, end_date: datetime) -> list[dict]:
+    entry_list = [
+        entry
+        for entry in api.get_time_entries(start_date, end_date)
+        if start_date <= parse_datetime(entry["startTime"]) < end_date
+    ]
+    entry_list.sort(key=lambda entry: parse_datetime(entry["startTime"]))
+    LOG.debug(f"Fetched {len(entry_list)} time entries for {start_date.date()} - {end_date.date()}")
+    return entry_list
+
+
+def _get_aggregate_rows(group_by: tuple[str, ...], groups: dict[tuple, list]) -> Iterator[dict]:
+    for key, (entry_count, duration) in groups.items():
+        yield {**dict(zip(group_by, key, strict=True)), "entries": entry_count, **_get_duration_fields(duration)}
+
+
+def _get_duration_fields(duration: timedelta) -> dict:
+    return {"seconds": int(duration.total_seconds()), "hours": round(duration.total_seconds() / 3600, 2)}
@@ -1,6 +1,10 @@
+import contextlib
 import logging
 import logging.config
+import os
 import sys
+from collections.abc import Iterator
+from typing import TextIO
 
 LOG = logging.getLogger(__name__)
 
@@ -17,6 +21,20 @@ def config_logger(verbose: bool = False):
     logging.config.dictConfig(config=config)
 
 
+@contextlib.contextmanager
+def atomic_write(path: str) -> Iterator[TextIO]:
+    """Open a temporary file next to ``path`` for writing and rename it to ``path`` once the block succeeds, so the
+    file either keeps its content or gets the complete new one. The temporary file is removed if the block fails."""
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            yield file
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
 def add_click_options(options):
     def _add_options(func):
         for option in reversed(options):
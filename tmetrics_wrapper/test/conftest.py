@@ -1,5 +1,28 @@
-# DEFAULT_CONFIG = {"projects": {
-#     "Test/Abc": {"id": 123, "alias": "test"},
-#     "Test/Xyz": {"id": 456, "alias": "xyz"},
-#     "Alpha/Beta": {"id": 98765, "alias": "gamma"}}
-# }
+import json
+import os
+
+import pytest
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CLI_PATH = os.path.join(REPOSITORY_ROOT, "tmetrics_wrapper", "tmetrics_wrapper.py")
+SOURCE_PATH = os.path.join(REPOSITORY_ROOT, "tmetrics_wrapper", "src")
+DEFAULT_CONFIG = {"projects": {"Foo/Abc": {"id": 123, "alias": "foo"}, "Bar/Xyz": {"id": 456, "alias": "bar"}}}
+DEFAULT_TASKS = "26.07.2021-27.07.2021\n10|Some feature|$foo\n4|Code review|Bar/Xyz|2\n"
+
+
+def write_file(path, content: str) -> str:
+    """Write the file with an mtime a second later than before, so a watcher polling mtimes sees every write."""
+    path.write_text(content)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    return str(path)
+
+
+@pytest.fixture
+def config_file(tmp_path) -> str:
+    return write_file(tmp_path / "config.json", json.dumps(DEFAULT_CONFIG))
+
+
+@pytest.fixture
+def tasks_file(tmp_path) -> str:
+    return write_file(tmp_path / "tasks.txt", DEFAULT_TASKS)
@@ -0,0 +1,97 @@
+import datetime
+import json
+
+import api as api_module
+import pytest
+import requests
+from api import TMetricsAPI, TMetricsAPIError
+from instrumentation import METRICS
+
+
+def _response(status_code: int, body=None, headers: {} = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body if body is not None else {}).encode()
+    response.headers.update(headers or {})
+    response.url = "http://tmetrics.test"
+    return response
+
+
+class FakeSession:
+    def __init__(self, outcomes: list):
+        self.outcomes = outcomes
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def close(self):
+        pass
+
+
+class TestTMetricsAPI:
+    def setup_method(self):
+        self.api = TMetricsAPI(account_id=1, token="token", host="http://tmetrics.test", max_retries=3)  # noqa: S106
+
+    @pytest.fixture(autouse=True)
+    def _no_sleep(self, monkeypatch):
+        self.sleeps = []
+        monkeypatch.setattr(api_module.time, "sleep", self.sleeps.append)
+
+    def _set_outcomes(self, *outcomes) -> FakeSession:
+        session = FakeSession(list(outcomes))
+        self.api._session = session
+        return session
+
+    def test_get_retries_transient_errors(self):
+        session = self._set_outcomes(requests.exceptions.ConnectionError(), _response(503), _response(200, [{"id": 1}]))
+
+        assert self.api.get_projects() == [{"id": 1}]
+        assert len(session.calls) == 3
+        assert len(self.sleeps) == 2
+
+    def test_post_is_not_retried_on_server_error(self):
+        session = self._set_outcomes(_response(500), _response(200))
+
+        with pytest.raises(TMetricsAPIError):
+            self.api._request_post("http://tmetrics.test/timeentries", data={})
+        assert len(session.calls) == 1
+
+    def test_post_is_retried_on_throttling_with_retry_after(self):
+        session = self._set_outcomes(_response(429, headers={"Retry-After": "7"}), _response(200))
+
+        self.api._request_post("http://tmetrics.test/timeentries", data={})
+        assert len(session.calls) == 2
+        assert self.sleeps == [7.0]
+
+    def test_gives_up_after_max_retries(self):
+        session = self._set_outcomes(*[_response(502)] * 4)
+
+        with pytest.raises(TMetricsAPIError):
+            self.api.get_projects()
+        assert len(session.calls) == 4
+
+    def test_per_call_timeout(self):
+        session = self._set_outcomes(_response(200), _response(200))
+
+        self.api.get_projects()
+        self.api.get_projects(timeout=1.5)
+        assert session.calls[0][2]["timeout"] == api_module.REQUEST_TIMEOUT_SEC
+        assert session.calls[1][2]["timeout"] == 1.5
+
+    def test_records_request_metrics(self):
+        METRICS.reset()
+        self._set_outcomes(_response(503), _response(200, []))
+
+        self.api.get_time_entries(datetime.datetime(2021, 7, 12), datetime.datetime(2021, 7, 13))
+        assert METRICS.counters == {
+            "api.responses.GET timeentries.503": 1,
+            "api.responses.GET timeentries.200": 1,
+            "api.retries.GET timeentries": 1,
+        }
+        assert METRICS.histograms["GET timeentries"].count == 2
+        METRICS.reset()
@@ -0,0 +1,134 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from batch import BatchManifestError, BatchUserResult, load_manifest
+from click.testing import CliRunner
+from conftest import DEFAULT_TASKS, write_file
+from push_engine import DELETE_ACTION, UPDATE_ACTION, PushReport, PushResult
+from time_blocks_planner import Task
+
+from tmetrics_wrapper.benchmark.mock_server import MockTMetricsServer
+from tmetrics_wrapper.tmetrics_wrapper import cli
+
+pytestmark = pytest.mark.usefixtures("config_file")
+
+
+def _write_manifest(tmp_path, user_list: list[dict]) -> str:
+    return write_file(tmp_path / "manifest.json", json.dumps({"users": user_list}))
+
+
+def _user(name: str, account_id: int, tasks: str, tmp_path) -> dict:
+    write_file(tmp_path / f"{name}.txt", tasks)
+    return {
+        "name": name,
+        "account_id": account_id,
+        "user_token": "token",
+        "tasks_file": f"{name}.txt",
+        "config_file": "config.json",
+    }
+
+
+def test_load_manifest_resolves_paths_and_tokens(tmp_path, monkeypatch):
+    monkeypatch.setenv("BOB_TOKEN", "secret")
+    bob = {**_user("bob", 2, DEFAULT_TASKS, tmp_path), "user_token": None, "user_token_env": "BOB_TOKEN"}
+    manifest_path = _write_manifest(tmp_path, [_user("alice", 1, DEFAULT_TASKS, tmp_path), bob])
+
+    alice_user, bob_user = load_manifest(manifest_path)
+
+    assert alice_user.tasks_file == str(tmp_path / "alice.txt")
+    assert alice_user.account_id == "1"
+    assert bob_user.user_token == "secret"  # noqa: S105
+
+
+def test_load_manifest_reports_every_problem(tmp_path):
+    user = _user("alice", 1, DEFAULT_TASKS, tmp_path)
+    manifest_path = _write_manifest(
+        tmp_path,
+        [
+            user,
+            user,
+            {"name": "carol", "tasks_file": "c.txt"},
+            {**user, "name": "dan", "user_token": ""},
+            {**user, "name": "erin", "account_id": 5},
+        ],
+    )
+
+    with pytest.raises(BatchManifestError) as error:
+        load_manifest(manifest_path)
+
+    message = str(error.value)
+    assert "'alice' is defined multiple times" in message
+    assert "'carol' is missing account_id, config_file" in message
+    assert "'dan' has neither user_token nor user_token_env" in message
+    assert f"Tasks file {tmp_path / 'alice.txt'} is used by multiple users" in message
+
+
+def test_result_counts_every_action_once():
+    task = Task("Feature", 1, timedelta(hours=1))
+    task.start_date = datetime(2021, 7, 26, 8)
+    report = PushReport()
+    for result in (
+        PushResult(task),
+        PushResult(task, skipped=True),
+        PushResult(task, action=UPDATE_ACTION),
+        PushResult(task, action=DELETE_ACTION),
+        PushResult(task, action=DELETE_ACTION, error="Forbidden"),
+    ):
+        report.add(result)
+
+    summary = BatchUserResult("alice", report=report).to_dict()
+
+    assert (summary["pushed"], summary["updated"], summary["deleted"]) == (1, 1, 1)
+    assert (summary["skipped"], summary["failed"]) == (1, 1)
+
+
+def test_run_batch_pushes_every_user_and_reports_failures(tmp_path):
+    user_list = [
+        _user("alice", 1, DEFAULT_TASKS, tmp_path),
+        _user("bob", 2, DEFAULT_TASKS, tmp_path),
+        _user("carol", 3, "26.07.2021-26.07.2021\n1|Unknown|$missing\n", tmp_path),
+    ]
+    manifest_path = _write_manifest(tmp_path, user_list)
+    report_path = tmp_path / "report.json"
+
+    with MockTMetricsServer() as server:
+        args = ["run-batch", "--manifest", manifest_path, "--host", server.url, "--concurrency", "2", "-y"]
+        result = CliRunner().invoke(cli, [*args, "--report", str(report_path)])
+        rerun_result = CliRunner().invoke(cli, args)
+        entries_by_account = {
+            account_id: [entry for entry in server.time_entries if entry["accountId"] == account_id]
+            for account_id in ("1", "2", "3")
+        }
+
+    assert result.exit_code == 1, result.output
+    summary = {user["name"]: user for user in json.loads(report_path.read_text())["users"]}
+    assert summary["alice"]["status"] == summary["bob"]["status"] == "ok"
+    assert summary["alice"]["pushed"] == summary["bob"]["pushed"] == 4
+    assert summary["carol"]["status"] == "error"
+    assert "$missing" in summary["carol"]["error"]
+    assert [len(entry_list) for entry_list in entries_by_account.values()] == [4, 4, 0]
+    assert rerun_result.exit_code == 1
+    assert len(server.time_entries) == 8
+
+
+def test_run_batch_isolates_users_with_malformed_config(tmp_path):
+    write_file(tmp_path / "broken.json", '{"projects": ')
+    write_file(tmp_path / "empty.json", "{}")
+    user_list = [
+        _user("alice", 1, DEFAULT_TASKS, tmp_path),
+        {**_user("bob", 2, DEFAULT_TASKS, tmp_path), "config_file": "broken.json"},
+        {**_user("carol", 3, DEFAULT_TASKS, tmp_path), "config_file": "empty.json"},
+    ]
+    report_path = tmp_path / "report.json"
+
+    with MockTMetricsServer() as server:
+        args = ["run-batch", "--manifest", _write_manifest(tmp_path, user_list), "--host", server.url, "-y"]
+        result = CliRunner().invoke(cli, [*args, "--report", str(report_path)])
+
+    assert result.exit_code == 1, result.output
+    summary = {user["name"]: user for user in json.loads(report_path.read_text())["users"]}
+    assert summary["alice"]["status"] == "ok"
+    assert "not valid JSON" in summary["bob"]["error"]
+    assert "no 'projects' object" in summary["carol"]["error"]
+    assert len(server.time_entries) == 4
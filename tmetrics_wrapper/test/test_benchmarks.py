@@ -0,0 +1,34 @@
+import json
+
+from click.testing import CliRunner
+
+from tmetrics_wrapper.benchmark.run_benchmarks import BenchmarkResult, find_regressions, main
+
+
+def _baseline(best_sec, peak_memory_bytes):
+    return {"results": [{"name": "plan/1x1", "best_sec": best_sec, "peak_memory_bytes": peak_memory_bytes}]}
+
+
+def test_find_regressions():
+    result_list = [BenchmarkResult("plan/1x1", 0.2, 0.3, 1000), BenchmarkResult("new/1x1", 5.0, 5.0, 10**9)]
+
+    assert find_regressions(result_list, _baseline(0.15, 1000)) == []
+    assert find_regressions(result_list, _baseline(0.1, 1000)) == ["plan/1x1: 200.0ms vs 100.0ms"]
+    assert len(find_regressions(result_list, _baseline(0.2, 500))) == 1
+
+
+def test_quick_run_writes_results_and_fails_on_regression(tmp_path):
+    out_path = tmp_path / "results.json"
+    baseline_path = tmp_path / "baseline.json"
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["--quick", "--repeat", "1", "--filter", "parse", "--out", str(out_path)])
+    assert result.exit_code == 0, result.output
+    results = json.loads(out_path.read_text())["results"]
+    assert [result["name"] for result in results] == ["parse/50x5"]
+
+    results[0]["best_sec"] /= 1000
+    baseline_path.write_text(json.dumps({"results": results}))
+    result = runner.invoke(main, ["--quick", "--repeat", "1", "--filter", "parse", "--baseline", str(baseline_path)])
+    assert result.exit_code == 1
+    assert "REGRESSION parse/50x5" in result.output
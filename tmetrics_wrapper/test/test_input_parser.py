@@ -1,7 +1,7 @@
 from datetime import date, timedelta
 
 import pytest
-from input_parser import TasksParser
+from input_parser import AggregatedTaskParsingError, TaskParsingError, TasksParser
 from time_blocks_planner import Task
 
 DEFAULT_CONFIG = {
@@ -65,3 +65,53 @@ class TestTasksParser:
         assert [task for task in task_list if task == task_without_split]
         assert [task for task in task_list if task == task_with_alias]
         assert [task for task in task_list if task == task_with_alias2]
+
+    def test_parse_lines_streams_periods(self):
+        lines = iter(
+            [
+                "26.07.2021-30.07.2021\n",
+                "1|Task A|Test/Abc|2\n",
+                "---\n",
+                "\n",
+                "---\n",
+                "02.08.2021-03.08.2021\n",
+                "2|Task B|$xyz\n",
+            ]
+        )
+
+        period_list = list(self.parser.parse_lines(lines))
+
+        assert [(start_date, end_date) for start_date, end_date, _ in period_list] == [
+            (date(2021, 7, 26), date(2021, 7, 30)),
+            (date(2021, 8, 2), date(2021, 8, 3)),
+        ]
+        assert period_list[1][2] == [Task("Task B", 456, timedelta(hours=2))]
+
+    def test_parse_lines_error_context(self):
+        lines = ["26.07.2021-30.07.2021", "1|Task A|Test/Abc", "---", "02.08.2021-03.08.2021", "2|Task B|$nope"]
+
+        with pytest.raises(TaskParsingError) as error_info:
+            list(self.parser.parse_lines(lines, source_name="tasks.txt"))
+
+        assert error_info.value.line_number == 5
+        assert str(error_info.value).startswith("tasks.txt:5: ")
+
+    def test_parse_lines_collects_errors(self):
+        lines = [
+            "26.07.2021-30.07.2021",
+            "x|Task A|Test/Abc",
+            "---",
+            "02.08.2021-03.08.2021",
+            "2|Task B|$xyz",
+            "---",
+            "09.08.2021-06.08.2021",
+            "2|Task C|$xyz",
+            "3|Task D|No/Project",
+        ]
+        period_list = []
+
+        with pytest.raises(AggregatedTaskParsingError) as error_info:
+            period_list.extend(self.parser.parse_lines(lines, collect_errors=True))
+
+        assert [error.line_number for error in error_info.value.errors] == [2, 7, 9]
+        assert [start_date for start_date, _, _ in period_list] == [date(2021, 8, 2)]
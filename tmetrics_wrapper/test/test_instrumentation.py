@@ -0,0 +1,75 @@
+import json
+import pickle
+import pstats
+from datetime import date, timedelta
+
+import pytest
+from instrumentation import METRICS, Histogram, Metrics, profile_run
+from time_blocks_planner import Task, TimeBlocksPlanner
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def test_histogram_percentiles_and_merge():
+    histogram = Histogram()
+    for value_ms in [0.5] * 90 + [15] * 9 + [30000]:
+        histogram.observe(value_ms)
+    other = Histogram()
+    other.observe(3)
+
+    assert histogram.get_percentile(50) == 1
+    assert histogram.get_percentile(99) == 20
+    assert histogram.get_percentile(100) == 30000
+    histogram.merge(other)
+    assert histogram.to_dict()["buckets"] == {"<=1ms": 90, "<=5ms": 1, "<=20ms": 9, ">10000ms": 1}
+
+
+def test_phases_counters_and_pickled_merge():
+    metrics = Metrics()
+    with metrics.phase("plan"):
+        pass
+    assert list(metrics.timed_iter("parse", [1, 2])) == [1, 2]
+    metrics.increment("api.retries")
+    metrics.observe("GET projects", 0.004)
+
+    METRICS.merge(pickle.loads(pickle.dumps(metrics)))  # noqa: S301
+    METRICS.merge(metrics)
+    result = METRICS.to_dict()
+    assert result["phases"]["plan"]["calls"] == 2
+    assert result["phases"]["parse"]["calls"] == 6
+    assert result["counters"] == {"api.retries": 2}
+    assert result["latency"]["GET projects"]["count"] == 2
+
+
+def test_planner_counters():
+    task_list = [Task("Meeting", 1, timedelta(hours=1)), Task("Review", 2, timedelta(hours=1), 3)]
+    TimeBlocksPlanner(date(2021, 7, 26), date(2021, 7, 27), task_list).plan()
+
+    counters = METRICS.to_dict()["counters"]
+    assert counters == {
+        "planner.iterations": 3,
+        "planner.pass_0.scheduled": 3,
+        "planner.pass_0.deferred": 1,
+        "planner.pass_1.deferred": 1,
+        "planner.pass_2.scheduled": 1,
+        "planner.pass_2.deferred": 0,
+        "planner.similarity_hits": 5,
+    }
+    assert set(METRICS.to_dict()["phases"]) == {"split", "plan"}
+
+
+def test_profile_run_writes_files_on_exit(tmp_path):
+    metrics_path, cprofile_path = tmp_path / "profile.json", tmp_path / "profile.prof"
+
+    with pytest.raises(SystemExit), profile_run(str(metrics_path), str(cprofile_path)):
+        METRICS.increment("api.retries")
+        raise SystemExit(1)
+
+    assert json.loads(metrics_path.read_text())["counters"] == {"api.retries": 1}
+    assert "total" in json.loads(metrics_path.read_text())["phases"]
+    assert pstats.Stats(str(cprofile_path)).total_calls > 0
@@ -0,0 +1,81 @@
+import threading
+from datetime import date, datetime, timedelta
+
+import local_store
+from local_store import LocalStore
+
+
+class FakeAPI:
+    def __init__(self):
+        self.time_entry_calls = []
+        self.project_calls = 0
+        self._lock = threading.Lock()
+
+    def get_time_entries(self, start_date: datetime, end_date: datetime) -> list[dict]:
+        with self._lock:
+            self.time_entry_calls.append((start_date, end_date))
+        entry_list = []
+        day = start_date
+        while day < end_date:
+            entry_list.append(
+                {
+                    "startTime": day.replace(hour=9).isoformat(),
+                    "endTime": day.replace(hour=10).isoformat(),
+                    "note": f"Standup {day.date()}",
+                }
+            )
+            day += timedelta(days=1)
+        return entry_list
+
+    def get_projects(self) -> list[dict]:
+        self.project_calls += 1
+        return [{"id": 1, "name": "Foo"}]
+
+
+class TestLocalStore:
+    def setup_method(self):
+        self.api = FakeAPI()
+
+    def test_windows_are_fetched_once(self, tmp_path):
+        with LocalStore(str(tmp_path / "cache.db"), self.api, account_id=1, window_days=7) as store:
+            entry_list = store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 8, 2))
+            assert len(entry_list) == 28
+            assert len(self.api.time_entry_calls) == 4
+
+            assert store.get_time_entries(datetime(2021, 7, 12), datetime(2021, 7, 14)) == entry_list[7:9]
+            assert len(self.api.time_entry_calls) == 4
+
+            store.invalidate([date(2021, 7, 13)])
+            store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 8, 2))
+            assert len(self.api.time_entry_calls) == 5
+
+    def test_offline_reads_stored_data(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        with LocalStore(path, self.api, account_id=1) as store:
+            store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 7, 12))
+            store.get_projects()
+
+        with LocalStore(path, None, account_id=1, offline=True) as store:
+            assert len(store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 7, 26))) == 7
+            assert store.get_projects() == [{"id": 1, "name": "Foo"}]
+        with LocalStore(path, None, account_id=2, offline=True) as store:
+            assert store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 7, 12)) == []
+        assert self.api.project_calls == 1
+
+    def test_settled_windows_expire_and_refresh(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "cache.db")
+        with LocalStore(path, self.api, account_id=1) as store:
+            store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 7, 19))
+        with LocalStore(path, self.api, account_id=1) as store:
+            store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 7, 19))
+        assert len(self.api.time_entry_calls) == 2
+
+        with LocalStore(path, self.api, account_id=1, refresh=True) as store:
+            store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 7, 19))
+            store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 7, 19))
+        assert len(self.api.time_entry_calls) == 4
+
+        monkeypatch.setattr(local_store, "SETTLED_MAX_AGE_TIMEDELTA", timedelta())
+        with LocalStore(path, self.api, account_id=1) as store:
+            store.get_time_entries(datetime(2021, 7, 5), datetime(2021, 7, 12))
+        assert len(self.api.time_entry_calls) == 5
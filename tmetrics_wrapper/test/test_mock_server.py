@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+from api import TMetricsAPI, TMetricsAPIError
+
+from tmetrics_wrapper.benchmark.e2e_benchmark import run_end_to_end, summarize_latency
+from tmetrics_wrapper.benchmark.mock_server import MockSettings, MockTMetricsServer
+
+
+def _api(server: MockTMetricsServer, max_retries: int = 0) -> TMetricsAPI:
+    return TMetricsAPI(account_id=1, token="token", host=server.url, max_retries=max_retries)  # noqa: S106
+
+
+def test_time_entries_round_trip():
+    with MockTMetricsServer(MockSettings(project_count=3, entry_padding=10)) as server, _api(server) as api:
+        api.add_time_entry(1001, "Note", datetime(2021, 7, 12, 8), datetime(2021, 7, 12, 9))
+        api.add_time_entry(1002, "Other", datetime(2021, 7, 13, 8), datetime(2021, 7, 13, 9))
+
+        entry_list = api.get_time_entries(datetime(2021, 7, 12), datetime(2021, 7, 13))
+        assert [entry["note"] for entry in entry_list] == ["Note"]
+        assert entry_list[0]["project"] == {"id": 1001}
+        assert len(entry_list[0]["description"]) == 10
+        assert [project["id"] for project in api.get_projects()] == [1000, 1001, 1002]
+
+
+def test_throttling_and_errors():
+    settings = MockSettings(throttle_rate=1.0, retry_after_sec=0.01)
+    with MockTMetricsServer(settings) as server, _api(server, max_retries=2) as api:
+        with pytest.raises(TMetricsAPIError):
+            api.get_projects()
+        assert [record.status for record in server.records] == [429, 429, 429]
+
+    with MockTMetricsServer(MockSettings(error_rate=1.0)) as server, _api(server) as api:
+        with pytest.raises(TMetricsAPIError):
+            api.add_time_entry(1001, "Note", datetime(2021, 7, 12, 8), datetime(2021, 7, 12, 9))
+        assert server.time_entries == []
+
+
+def test_end_to_end_run(tmp_path):
+    result_list, server = run_end_to_end(
+        MockSettings(), task_count=20, day_count=5, concurrency=4, rate_limit=1000, max_retries=0, work_dir=tmp_path
+    )
+
+    assert [result.exit_code for result in result_list] == [0, 0], result_list[-1].output
+    assert len(server.time_entries) >= 20
+    assert summarize_latency(server.records)["POST timeentries"]["count"] == len(server.time_entries)
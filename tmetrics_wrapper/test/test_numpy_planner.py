@@ -0,0 +1,65 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from period_planning import NUMPY_ENGINE, plan_period
+from time_blocks_planner import NotFullyPlannedError, Task, TimeBlocksPlanner
+from time_entries import TimeEntryIndex
+
+from tmetrics_wrapper.benchmark.generators import generate_task_list
+
+numpy_planner = pytest.importorskip("numpy_planner")
+
+
+def _plan(planner_class, start_date, end_date, task_specs, existing_entry_index=None):
+    planner = planner_class(start_date, end_date, [Task(*spec) for spec in task_specs], existing_entry_index)
+    try:
+        planner.plan()
+        error = None
+    except NotFullyPlannedError as e:
+        error = str(e)
+    return [(task.note, task.start_date, task.end_date) for task in planner.get_scheduled_tasks()], error
+
+
+def test_split_matches_timedelta_division():
+    task_list = [
+        Task("Odd", 1, timedelta(microseconds=5), 2),
+        Task("Even", 1, timedelta(microseconds=7), 2),
+        Task("Long", 1, timedelta(hours=30)),
+        Task("Requested too long", 1, timedelta(hours=20), 2),
+        Task("Kept", 1, timedelta(hours=2)),
+    ]
+
+    expected = TimeBlocksPlanner._split_tasks(task_list, 3)
+    actual = numpy_planner.NumpyTimeBlocksPlanner._split_tasks(task_list, 3)
+    assert [(task.note, task.duration) for task in actual] == [(task.note, task.duration) for task in expected]
+    assert actual[-1] is task_list[-1]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_plans_match_python_engine(seed):
+    rng = random.Random(seed)  # noqa: S311 - reproducible inputs, not security
+    day_count = rng.randint(1, 20)
+    task_specs = [
+        (f"Note {rng.randint(0, 5)}", rng.randint(1, 3), timedelta(minutes=rng.randint(5, 1500)), rng.choice([1, 2, 3]))
+        for _ in range(rng.randint(1, 40))
+    ]
+    start_date = date(2021, 7, 1)
+    end_date = start_date + timedelta(days=day_count - 1)
+    existing_start = datetime(2021, 7, 1, rng.randint(7, 16))
+    existing_entry_index = TimeEntryIndex.from_entries(
+        [{"startTime": existing_start.isoformat(), "endTime": (existing_start + timedelta(hours=1)).isoformat()}]
+    )
+
+    for index in (None, existing_entry_index):
+        assert _plan(numpy_planner.NumpyTimeBlocksPlanner, start_date, end_date, task_specs, index) == _plan(
+            TimeBlocksPlanner, start_date, end_date, task_specs, index
+        )
+
+
+def test_plan_period_with_numpy_engine():
+    task_list = generate_task_list(200, 20)
+    planner = plan_period(date(2021, 1, 4), date(2021, 1, 23), task_list, engine=NUMPY_ENGINE)
+
+    assert isinstance(planner, numpy_planner.NumpyTimeBlocksPlanner)
+    assert len(planner.get_scheduled_tasks()) == len(planner.task_list)
@@ -0,0 +1,32 @@
+from datetime import date
+
+from input_parser import TasksParser
+from period_planning import plan_period, plan_periods
+
+DEFAULT_CONFIG = {
+    "projects": {
+        "Test/Abc": {"id": 123, "alias": "test"},
+        "Test/Xyz": {"id": 456, "alias": "xyz"},
+        "Alpha/Beta": {"id": 98765, "alias": "gamma"},
+    }
+}
+
+TASK_DEFINITION_LIST = [
+    """26.07.2021-30.07.2021
+    26|Some feature|Test/Xyz
+    3|Code review|$test|3""",
+    """02.08.2021-03.08.2021
+    8|Feature|$gamma|2
+    7|Feature B|Test/Abc""",
+]
+
+
+def test_plan_periods_matches_sequential_planning():
+    parser = TasksParser(DEFAULT_CONFIG)
+    sequential_planner_list = [plan_period(*parser.parse(task_definition)) for task_definition in TASK_DEFINITION_LIST]
+
+    planner_list = plan_periods((parser.parse(task_definition) for task_definition in TASK_DEFINITION_LIST), jobs=2)
+
+    assert [planner.start_date for planner in planner_list] == [date(2021, 7, 26), date(2021, 8, 2)]
+    for planner, sequential_planner in zip(planner_list, sequential_planner_list, strict=True):
+        assert planner.get_scheduled_tasks() == sequential_planner.get_scheduled_tasks()
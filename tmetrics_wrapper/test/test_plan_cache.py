@@ -0,0 +1,120 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from api import TMetricsAPI, TMetricsAPIError
+from click.testing import CliRunner
+from conftest import write_file
+from plan_cache import AppliedEntry, PlanCache, apply_plan_diff, compute_plan_diff, get_plan_key
+from time_blocks_planner import Task, TimeBlocksPlanner
+from time_entries import TimeEntryIndex
+
+from tmetrics_wrapper.benchmark.mock_server import MockTMetricsServer
+from tmetrics_wrapper.tmetrics_wrapper import cli
+
+
+def _scheduled_task(note: str, hour: int, project_id: int = 123) -> Task:
+    task = Task(note, project_id, timedelta(hours=1))
+    task.start_date = datetime(2021, 7, 26, hour)
+    task.end_date = task.start_date + task.duration
+    return task
+
+
+def test_plan_key_depends_on_tasks_and_existing_entries():
+    task_list = [Task("Meeting", 123, timedelta(hours=1)), Task("Review", 456, timedelta(hours=2), 2)]
+    key = get_plan_key(date(2021, 7, 26), date(2021, 7, 30), task_list)
+
+    assert key == get_plan_key(date(2021, 7, 26), date(2021, 7, 30), list(task_list), TimeEntryIndex())
+    assert key != get_plan_key(date(2021, 7, 26), date(2021, 7, 30), task_list[:1])
+    assert key != get_plan_key(
+        date(2021, 7, 26), date(2021, 7, 30), [*task_list[:1], Task("Review", 456, timedelta(hours=2))]
+    )
+    existing_entry_index = TimeEntryIndex({date(2021, 7, 26): [_scheduled_task("Standup", 9)]})
+    assert key != get_plan_key(date(2021, 7, 26), date(2021, 7, 30), task_list, existing_entry_index)
+
+
+def test_diff_keeps_updates_and_deletes_minimal():
+    applied_entry_list = [
+        AppliedEntry(1, _scheduled_task("Meeting", 8)),
+        AppliedEntry(2, _scheduled_task("Review", 9)),
+        AppliedEntry(3, _scheduled_task("Docs", 10)),
+        AppliedEntry(4, _scheduled_task("Support", 11)),
+    ]
+    task_list = [_scheduled_task("Meeting", 8), _scheduled_task("Review", 12), _scheduled_task("Design", 13)]
+
+    diff = compute_plan_diff(applied_entry_list, task_list)
+
+    assert [entry.entry_id for entry in diff.unchanged] == [1]
+    assert [(entry.entry_id, task.note, task.start_date.hour) for entry, task in diff.updated] == [
+        (2, "Review", 12),
+        (3, "Design", 13),
+    ]
+    assert [entry.entry_id for entry in diff.deleted] == [4]
+    assert diff.created == []
+    longer_diff = compute_plan_diff(
+        applied_entry_list, [*task_list, _scheduled_task("Call", 14), _scheduled_task("Lunch", 15)]
+    )
+    assert (len(longer_diff.updated), longer_diff.deleted) == (3, [])
+    assert [task.note for task in longer_diff.created] == ["Lunch"]
+    assert compute_plan_diff(diff.unchanged, task_list[:1]).is_empty()
+
+
+def test_cache_restores_plan_and_applied_entries(tmp_path):
+    plan_cache = PlanCache(str(tmp_path / "tasks.txt.plans"))
+    task_list = [Task("Meeting", 123, timedelta(hours=3)), Task("Review", 456, timedelta(hours=4), 2)]
+    planner = TimeBlocksPlanner(date(2021, 7, 26), date(2021, 7, 27), task_list)
+    planner.plan()
+    key = get_plan_key(date(2021, 7, 26), date(2021, 7, 27), task_list)
+
+    assert plan_cache.load_plan(key, date(2021, 7, 26), date(2021, 7, 27)) is None
+    plan_cache.store_plan(key, planner)
+    restored = plan_cache.load_plan(key, date(2021, 7, 26), date(2021, 7, 27))
+    assert restored.get_scheduled_tasks() == planner.get_scheduled_tasks()
+    assert restored.get_total_planned_time() == planner.get_total_planned_time()
+
+    plan_cache.store_applied_entries(date(2021, 7, 26), date(2021, 7, 27), [AppliedEntry(7, _scheduled_task("A", 8))])
+    assert plan_cache.get_applied_entries(date(2021, 7, 26), date(2021, 7, 27)) == [
+        AppliedEntry(7, _scheduled_task("A", 8))
+    ]
+    assert plan_cache.get_applied_entry_ids(date(2021, 7, 26), date(2021, 7, 27)) == {7}
+    assert plan_cache.get_applied_entries(date(2021, 8, 2), date(2021, 8, 6)) == []
+
+
+def test_apply_diff_against_server():
+    with MockTMetricsServer() as server:
+        api = TMetricsAPI(account_id=1, token="token", host=server.url, max_retries=0)  # noqa: S106
+        first_diff = compute_plan_diff([], [_scheduled_task("Meeting", 8), _scheduled_task("Review", 9)])
+        report, applied_entry_list = apply_plan_diff(api, first_diff, concurrency=2)
+        assert len(report.get_succeeded()) == 2
+
+        api.delete_time_entry(applied_entry_list[1].entry_id)
+        with pytest.raises(TMetricsAPIError) as error:
+            api.delete_time_entry(applied_entry_list[1].entry_id)
+        assert error.value.status_code == 404
+        second_diff = compute_plan_diff(applied_entry_list, [_scheduled_task("Meeting", 10, project_id=456)])
+        report, applied_entry_list = apply_plan_diff(api, second_diff)
+
+        assert not report.get_failed()
+        assert [(entry["note"], entry["startTime"]) for entry in server.time_entries] == [
+            ("Meeting", "2021-07-26T10:00:00")
+        ]
+        assert [entry.task.note for entry in applied_entry_list] == ["Meeting"]
+
+
+def test_run_restores_a_removed_task(tmp_path, config_file):
+    full_tasks = "26.07.2021-26.07.2021\n3|Feature|$foo\n1|Meeting|$bar\n2|Review|$foo\n"
+    tasks_file = write_file(tmp_path / "tasks.txt", full_tasks)
+    note_lists = []
+    with MockTMetricsServer() as server:
+        args = ["run", "--tasks-file", tasks_file, "--config-file", config_file, "-y"]
+        args += ["--account-id", "1", "--user-token", "token", "--host", server.url]
+        for tasks in (full_tasks, full_tasks.replace("1|Meeting|$bar\n", ""), full_tasks):
+            write_file(tmp_path / "tasks.txt", tasks)
+            result = CliRunner().invoke(cli, args)
+            assert result.exit_code == 0, result.output
+            note_lists.append(sorted(entry["note"] for entry in server.time_entries))
+
+    assert note_lists == [["Feature", "Meeting", "Review"], ["Feature", "Review"], ["Feature", "Meeting", "Review"]]
+    applied_entry_list = PlanCache(f"{tasks_file}.plans").get_applied_entries(date(2021, 7, 26), date(2021, 7, 26))
+    assert sorted(entry.entry_id for entry in applied_entry_list) == sorted(
+        entry["id"] for entry in server.time_entries
+    )
@@ -0,0 +1,109 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+from click.testing import CliRunner
+from conftest import DEFAULT_TASKS, write_file
+from period_planning import plan_period
+from plan_file import PLAN_FILE_SUFFIX, PlanFileError, iter_planned_periods, validate_plan_file, write_plan_file
+from time_blocks_planner import Task
+
+from tmetrics_wrapper.benchmark.mock_server import MockTMetricsServer
+from tmetrics_wrapper.tmetrics_wrapper import cli
+
+TASKS = f"{DEFAULT_TASKS}---\n28.07.2021-28.07.2021\n2|Docs|$foo\n"
+
+
+@pytest.fixture
+def plan_path(tmp_path) -> str:
+    planner_list = [
+        plan_period(date(2021, 7, 26), date(2021, 7, 27), [Task("Feature", 1, timedelta(hours=10))]),
+        plan_period(date(2021, 7, 28), date(2021, 7, 28), [Task("Review", 2, timedelta(hours=2))]),
+    ]
+    path = str(tmp_path / f"tasks{PLAN_FILE_SUFFIX}")
+    write_plan_file(path, planner_list)
+    return path
+
+
+def test_round_trips_planned_periods(plan_path):
+    header = validate_plan_file(plan_path)
+    period_list = list(iter_planned_periods(plan_path))
+
+    assert (header.period_count, header.task_count) == (2, 3)
+    assert [(start_date, end_date, len(task_list)) for start_date, end_date, task_list in period_list] == [
+        (date(2021, 7, 26), date(2021, 7, 27), 2),
+        (date(2021, 7, 28), date(2021, 7, 28), 1),
+    ]
+    review = period_list[1][2][0]
+    assert (review.note, review.project_id, review.duration) == ("Review", 2, timedelta(hours=2))
+    assert review.start_date.date() == date(2021, 7, 28)
+
+
+def test_rejects_truncated_files(plan_path):
+    with open(plan_path) as file:
+        line_list = file.readlines()
+    for kept_lines in (len(line_list) - 1, len(line_list) - 2):
+        with open(plan_path, "w") as file:
+            file.writelines(line_list[:kept_lines])
+
+        with pytest.raises(PlanFileError, match="truncated"):
+            validate_plan_file(plan_path)
+
+
+def test_rejects_other_versions_and_malformed_records(plan_path):
+    with open(plan_path) as file:
+        header, *line_list = file.readlines()
+    with open(plan_path, "w") as file:
+        file.writelines([json.dumps({**json.loads(header), "version": 99}) + "\n", *line_list])
+    with pytest.raises(PlanFileError, match="version 99"):
+        validate_plan_file(plan_path)
+
+    with open(plan_path, "w") as file:
+        file.writelines([header, line_list[0], '{"note": "Feature"}\n', *line_list[2:]])
+    with pytest.raises(PlanFileError, match=":3: malformed record"):
+        validate_plan_file(plan_path)
+
+
+def test_plan_then_push_resumes_from_the_journal(tmp_path, config_file):
+    tasks_file = write_file(tmp_path / "tasks.txt", TASKS)
+    plan_path = f"{tasks_file}{PLAN_FILE_SUFFIX}"
+    runner = CliRunner()
+
+    plan_result = runner.invoke(
+        cli, ["plan", "--tasks-file", tasks_file, "--config-file", config_file, "--ignore-existing"]
+    )
+    with MockTMetricsServer() as server:
+        args = ["push", "--account-id", "1", "--user-token", "token", "--host", server.url, "--plan-file", plan_path]
+        push_result = runner.invoke(cli, [*args, "--concurrency", "2", "-y"])
+        pushed_count = len(server.time_entries)
+        rerun_result = runner.invoke(cli, [*args, "-y"])
+
+    assert plan_result.exit_code == 0, plan_result.output
+    assert validate_plan_file(plan_path).task_count == 5
+    assert push_result.exit_code == 0, push_result.output
+    assert pushed_count == 5
+    assert rerun_result.exit_code == 0, rerun_result.output
+    assert len(server.time_entries) == 5
+
+
+def test_plan_after_run_plans_around_the_entries_run_pushed(tmp_path, config_file):
+    tasks_file = write_file(tmp_path / "tasks.txt", "26.07.2021-26.07.2021\n2|Docs|$foo\n")
+    plan_path = f"{tasks_file}{PLAN_FILE_SUFFIX}"
+    runner = CliRunner()
+
+    with MockTMetricsServer() as server:
+        account_args = ["--account-id", "1", "--user-token", "token", "--host", server.url]
+        run_result = runner.invoke(
+            cli, ["run", "--tasks-file", tasks_file, "--config-file", config_file, *account_args, "-y"]
+        )
+        plan_result = runner.invoke(
+            cli, ["plan", "--tasks-file", tasks_file, "--config-file", config_file, *account_args]
+        )
+        push_result = runner.invoke(cli, ["push", "--plan-file", plan_path, *account_args, "-y"])
+        time_ranges = sorted((entry["startTime"], entry["endTime"]) for entry in server.time_entries)
+
+    assert run_result.exit_code == 0, run_result.output
+    assert plan_result.exit_code == 0, plan_result.output
+    assert push_result.exit_code == 0, push_result.output
+    assert len(time_ranges) == 2
+    assert time_ranges[0][1] <= time_ranges[1][0]
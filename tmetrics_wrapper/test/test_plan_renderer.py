@@ -0,0 +1,22 @@
+import pytest
+from plan_renderer import render_markdown_table
+
+COLUMN_LIST_CASES = [
+    [("2021-07-12 (6:41:00)", ["Some feature (5:12:00)", "Code review (1:00:00)"])],
+    [
+        ("h1 (1:00:00)", ["x (1:00:00)", "  y  (2:00:00)"]),
+        ("h2 (0:00:00)", []),
+        ("h3 (3:00:00)", ["A much longer note than the header (3:00:00)"]),
+    ],
+    [("day (0:00:00)", []), ("other day (0:00:00)", [])],
+    [("day", [f"Task {index} (0:30:00)" for index in range(12)])],
+]
+
+
+@pytest.mark.parametrize("column_list", COLUMN_LIST_CASES)
+def test_render_matches_pandas(column_list):
+    pandas = pytest.importorskip("pandas")
+    pytest.importorskip("tabulate")
+    frames = pandas.concat([pandas.DataFrame({header: cells}) for header, cells in column_list], axis=1)
+
+    assert render_markdown_table(column_list) == frames.to_markdown()
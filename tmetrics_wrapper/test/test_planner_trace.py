@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+
+import pytest
+from period_planning import NUMPY_ENGINE, PYTHON_ENGINE, plan_period, plan_periods
+from planner_trace import DEFERRED_SIMILAR, NO_ROOM, PLACED, TRACE, render_trace
+from time_blocks_planner import NotFullyPlannedError, Task
+
+START_DATE = date(2021, 7, 26)
+END_DATE = date(2021, 7, 27)
+
+
+def _create_task_list() -> list[Task]:
+    return [
+        Task("Feature", 1, timedelta(hours=12)),
+        Task("Design", 1, timedelta(hours=2, minutes=30)),
+        Task("Meeting", 2, timedelta(minutes=30)),
+    ]
+
+
+@pytest.fixture(autouse=True)
+def trace():
+    TRACE.enable()
+    TRACE.clear()
+    yield TRACE
+    TRACE.disable()
+    TRACE.clear()
+
+
+def test_disabled_trace_records_nothing(trace):
+    trace.disable()
+    planner = plan_period(START_DATE, END_DATE, _create_task_list())
+
+    assert planner.trace_events == []
+    assert trace.get_events() == []
+
+
+@pytest.mark.parametrize("engine", [PYTHON_ENGINE, NUMPY_ENGINE])
+def test_records_decisions_of_the_plan(engine):
+    if engine == NUMPY_ENGINE:
+        pytest.importorskip("numpy")
+    planner = plan_period(START_DATE, END_DATE, _create_task_list(), engine=engine)
+
+    assert render_trace(planner.trace_events).splitlines() == [
+        "split Feature (12:00:00) [1] into 2 parts",
+        "pass 0 2021-07-27: placed Feature (6:00:00) [1] at 08:00:00",
+        "pass 0 2021-07-27: placed Meeting (0:30:00) [2] at 14:00:00",
+        "pass 0 2021-07-27: deferred Design (2:30:00) [1], it would leave less than 0:40:00 free",
+        "pass 0 2021-07-26: placed Feature (6:00:00) [1] at 08:00:00",
+        "pass 0 2021-07-26: deferred Design (2:30:00) [1], it would leave less than 0:40:00 free",
+        "pass 1 2021-07-26: deferred Design (2:30:00) [1], it would leave less than 0:40:00 free",
+        "pass 1 2021-07-27: deferred Design (2:30:00) [1], it would leave less than 0:40:00 free",
+        "pass 2 2021-07-26: placed Design (2:30:00) [1] at 14:00:00",
+    ]
+
+
+def test_records_similar_tasks_deferred():
+    task_list = [Task("Meeting", 2, timedelta(hours=1)) for _ in range(2)]
+    planner = plan_period(START_DATE, START_DATE, task_list)
+
+    assert [(kind, iteration) for kind, iteration, *_ in planner.trace_events] == [
+        (PLACED, 0),
+        (DEFERRED_SIMILAR, 0),
+        (DEFERRED_SIMILAR, 1),
+        (PLACED, 2),
+    ]
+
+
+def test_not_fully_planned_error_carries_the_trace():
+    with pytest.raises(NotFullyPlannedError) as error:
+        plan_period(START_DATE, START_DATE, [Task("Long", 1, timedelta(hours=8)), Task("Short", 1, timedelta(hours=2))])
+
+    kind, _, _, task, longest_free_block = error.value.trace_events[-1]
+    assert (kind, task.note, longest_free_block) == (NO_ROOM, "Short", timedelta(hours=1))
+    assert "no room for Short (2:00:00) [1], the longest free block left is 1:00:00" in render_trace(
+        error.value.trace_events
+    )
+
+
+def test_workers_send_their_trace_back():
+    period_list = [(START_DATE, END_DATE, _create_task_list()), (START_DATE, START_DATE, [])]
+    planner_list = plan_periods(period_list, jobs=2)
+
+    sequential_planner = plan_period(START_DATE, END_DATE, _create_task_list())
+
+    assert render_trace(planner_list[0].trace_events) == render_trace(sequential_planner.trace_events)
+    assert planner_list[1].trace_events == []
+
+
+def test_keeps_only_the_latest_events(trace):
+    trace.enable(capacity=3)
+    task = Task("Task", 1, timedelta(hours=1))
+    mark = trace.mark()
+    for iteration in range(5):
+        trace.record(PLACED, iteration, START_DATE, task)
+
+    assert [iteration for _, iteration, *_ in trace.get_events(since=mark)] == [2, 3, 4]
+    assert [iteration for _, iteration, *_ in trace.get_events(since=mark + 4)] == [4]
+    trace.enable()
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+
+import portfolio_planner
+import pytest
+from instrumentation import METRICS
+from period_planning import PORTFOLIO_ENGINE, get_plan_variant, plan_period
+from planner_trace import TRACE, render_trace
+from portfolio_planner import (
+    DEFAULT_VARIANT,
+    PORTFOLIO_SIZE,
+    VariantTimeBlocksPlanner,
+    get_portfolio_variants,
+    score_plan,
+)
+from time_blocks_planner import NotFullyPlannedError, Task
+
+from tmetrics_wrapper.benchmark.generators import generate_task_list
+
+START_DATE = date(2021, 7, 26)
+
+
+def _create_full_day_task_list() -> list[Task]:
+    """Fills exactly one workday, so the greedy passes keeping slack never place the last hour."""
+    return [
+        Task("Design", 1, timedelta(hours=3)),
+        Task("Meeting", 1, timedelta(hours=1)),
+        Task("Review", 1, timedelta(hours=2)),
+        Task("Design", 2, timedelta(hours=3)),
+    ]
+
+
+def test_variants_start_with_the_greedy_plan():
+    variant_list = get_portfolio_variants()
+
+    assert variant_list[0] == DEFAULT_VARIANT
+    assert len(set(variant_list)) == len(variant_list) == PORTFOLIO_SIZE
+    assert get_plan_variant(PORTFOLIO_ENGINE, 1) not in ("", get_plan_variant(PORTFOLIO_ENGINE, 2))
+
+
+def test_plans_what_the_greedy_plan_cannot():
+    with pytest.raises(NotFullyPlannedError):
+        plan_period(START_DATE, START_DATE, _create_full_day_task_list())
+
+    TRACE.enable()
+    try:
+        planner = plan_period(START_DATE, START_DATE, _create_full_day_task_list(), engine=PORTFOLIO_ENGINE, jobs=1)
+    finally:
+        TRACE.disable()
+        TRACE.clear()
+
+    assert planner.get_total_planned_time() == timedelta(hours=9)
+    assert planner.variant.slack == timedelta()
+    assert (
+        render_trace(planner.trace_events).splitlines()[-1]
+        == "pass 0 2021-07-26: placed Meeting (1:00:00) [1] at 16:00:00"
+    )
+
+
+def test_keeps_a_plan_at_least_as_good_as_the_greedy_one():
+    end_date = START_DATE + timedelta(days=4)
+    greedy_planner = plan_period(START_DATE, end_date, generate_task_list(20, 5, seed=2))
+    planner = plan_period(START_DATE, end_date, generate_task_list(20, 5, seed=2), engine=PORTFOLIO_ENGINE, jobs=1)
+
+    assert score_plan(planner) < score_plan(greedy_planner)
+    assert score_plan(planner).similar_count == 0
+    assert planner.get_total_planned_time() == greedy_planner.get_total_planned_time()
+
+
+def test_process_pool_finds_the_same_plan(monkeypatch):
+    monkeypatch.setattr(portfolio_planner, "MIN_POOL_WORK_SEC", 0)
+    end_date = START_DATE + timedelta(days=4)
+
+    pooled_planner = plan_period(
+        START_DATE, end_date, generate_task_list(20, 5, seed=2), engine=PORTFOLIO_ENGINE, jobs=2
+    )
+    planner = plan_period(START_DATE, end_date, generate_task_list(20, 5, seed=2), engine=PORTFOLIO_ENGINE, jobs=1)
+
+    assert pooled_planner.variant == planner.variant
+    assert pooled_planner.get_scheduled_tasks() == planner.get_scheduled_tasks()
+
+
+def test_exhausted_budget_keeps_the_greedy_plan():
+    end_date = START_DATE + timedelta(days=4)
+    greedy_planner = plan_period(START_DATE, end_date, generate_task_list(20, 5, seed=2))
+    planner = plan_period(
+        START_DATE, end_date, generate_task_list(20, 5, seed=2), engine=PORTFOLIO_ENGINE, time_budget_sec=0, jobs=1
+    )
+
+    assert planner.variant == DEFAULT_VARIANT
+    assert planner.get_scheduled_tasks() == greedy_planner.get_scheduled_tasks()
+
+
+def test_records_planner_metrics_of_the_chosen_plan_only():
+    end_date = START_DATE + timedelta(days=4)
+    METRICS.reset()
+    planner = plan_period(START_DATE, end_date, generate_task_list(20, 5, seed=2), engine=PORTFOLIO_ENGINE, jobs=1)
+    portfolio_counters = dict(METRICS.counters)
+    plan_calls = METRICS.phase_calls["plan"]
+    METRICS.reset()
+    VariantTimeBlocksPlanner(START_DATE, end_date, generate_task_list(20, 5, seed=2), variant=planner.variant).plan()
+
+    assert plan_calls == 1
+    assert portfolio_counters["portfolio.planned"] == PORTFOLIO_SIZE
+    assert portfolio_counters["planner.iterations"] == METRICS.counters["planner.iterations"]
@@ -0,0 +1,100 @@
+import json
+import os
+
+import project_config
+import pytest
+from project_config import CACHE_SUFFIX, ProjectConfigError, ProjectIndex, load_project_index
+
+DEFAULT_CONFIG = {
+    "projects": {
+        "Test/Abc": {"id": 123, "alias": "test"},
+        "Test/Xyz": {"id": 456, "alias": "xyz"},
+        "Alpha/Beta": {"id": 98765, "alias": ""},
+    }
+}
+
+
+class TestProjectIndex:
+    def test_lookup(self):
+        project_index = ProjectIndex.from_config(DEFAULT_CONFIG)
+
+        assert project_index.get_project_id("Test/Xyz") == 456
+        assert project_index.get_project_id("$test") == 123
+        assert project_index.get_project_id("Alpha/Beta") == 98765
+        with pytest.raises(ValueError):
+            project_index.get_project_id("$")
+        with pytest.raises(ValueError):
+            project_index.get_project_id("Alpha")
+
+    def test_invalid_aliases(self):
+        config = {
+            "projects": {
+                "A": {"id": 1, "alias": "dup"},
+                "B": {"id": 2, "alias": "dup"},
+                "C": {"id": 3, "alias": "  "},
+            }
+        }
+
+        with pytest.raises(ProjectConfigError, match="'dup' is used by multiple projects: A, B") as error_info:
+            ProjectIndex.from_config(config)
+        assert "'C' has blank or padded alias" in str(error_info.value)
+
+    def test_non_string_alias(self):
+        with pytest.raises(ProjectConfigError, match="'A' has alias 5, which is not a string"):
+            ProjectIndex.from_config({"projects": {"A": {"id": 1, "alias": 5}}})
+
+    def test_missing_projects(self):
+        for config in ({}, {"projects": ["A"]}, ["projects"]):
+            with pytest.raises(ProjectConfigError, match="no 'projects' object"):
+                ProjectIndex.from_config(config)
+
+
+class TestLoadProjectIndex:
+    def test_compiled_config_cache(self, tmp_path, monkeypatch):
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(DEFAULT_CONFIG))
+        compiled = []
+        original_from_config = ProjectIndex.from_config
+
+        def _counting_from_config(config):
+            compiled.append(config)
+            return original_from_config(config)
+
+        monkeypatch.setattr(ProjectIndex, "from_config", _counting_from_config)
+
+        assert load_project_index(str(config_path)).get_project_id("$xyz") == 456
+        assert os.path.exists(f"{config_path}{CACHE_SUFFIX}")
+        load_project_index(str(config_path))
+        os.utime(config_path, ns=(0, 0))
+        load_project_index(str(config_path))
+        assert len(compiled) == 1
+
+        config_path.write_text(json.dumps({"projects": {"Test/Xyz": {"id": 789, "alias": "xyz"}}}))
+        assert load_project_index(str(config_path)).get_project_id("$xyz") == 789
+        assert len(compiled) == 2
+
+    def test_malformed_config(self, tmp_path):
+        config_path = tmp_path / "config.json"
+        config_path.write_text('{"projects": ')
+
+        with pytest.raises(ProjectConfigError, match="is not valid JSON"):
+            load_project_index(str(config_path))
+
+    def test_corrupted_cache_is_rebuilt(self, tmp_path):
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(DEFAULT_CONFIG))
+        (tmp_path / f"config.json{project_config.CACHE_SUFFIX}").write_bytes(b"garbage")
+
+        assert load_project_index(str(config_path)).get_project_id("$test") == 123
+
+    def test_cache_is_plain_json(self, tmp_path):
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(DEFAULT_CONFIG))
+        load_project_index(str(config_path))
+
+        cached = json.loads((tmp_path / f"config.json{CACHE_SUFFIX}").read_text())
+        assert cached["alias_index"] == {"test": 123, "xyz": 456}
+
+        cached["alias_index"]["test"] = "not an id"
+        (tmp_path / f"config.json{CACHE_SUFFIX}").write_text(json.dumps(cached))
+        assert load_project_index(str(config_path)).get_project_id("$test") == 123
@@ -0,0 +1,100 @@
+import threading
+from datetime import date, datetime, timedelta
+
+from api import TMetricsAPIError
+from push_engine import push_tasks
+from push_journal import PushJournal
+from rate_limiter import RateLimiter
+from time_blocks_planner import Task
+
+
+class FakeAPI:
+    def __init__(self, failing_notes: set[str] = frozenset()):
+        self.failing_notes = failing_notes
+        self.pushed = []
+        self._lock = threading.Lock()
+
+    def add_time_entry(self, project_id, note, start_time, end_time):
+        if note in self.failing_notes:
+            raise TMetricsAPIError("500 Server Error")
+        with self._lock:
+            self.pushed.append((project_id, note, start_time, end_time))
+
+
+def _scheduled_task(note: str, day: int, hour: int) -> Task:
+    task = Task(note, 123, timedelta(hours=1))
+    task.start_date = datetime(2021, 7, day, hour)
+    task.end_date = task.start_date + task.duration
+    return task
+
+
+class TestPushTasks:
+    def setup_method(self):
+        self.task_list = [_scheduled_task(f"Task {day}/{hour}", day, hour) for day in (26, 27) for hour in range(8, 16)]
+
+    def test_concurrent_push(self):
+        api = FakeAPI()
+
+        report = push_tasks(api, iter(self.task_list), concurrency=4)
+
+        assert len(report.get_succeeded()) == len(self.task_list)
+        assert not report.get_failed()
+        assert sorted(api.pushed) == sorted(
+            (task.project_id, task.note, task.start_date, task.end_date) for task in self.task_list
+        )
+
+    def test_failures_are_reported_per_day(self):
+        api = FakeAPI(failing_notes={"Task 27/9", "Task 27/12"})
+
+        report = push_tasks(api, self.task_list, concurrency=3)
+
+        assert {result.task.note for result in report.get_failed()} == {"Task 27/9", "Task 27/12"}
+        assert all(result.succeeded for result in report.results[date(2021, 7, 26)])
+        assert len(report.results[date(2021, 7, 27)]) == 8
+        assert len(api.pushed) == len(self.task_list) - 2
+
+
+class TestRateLimiter:
+    def test_adapts_rate(self):
+        limiter = RateLimiter(rate=10)
+
+        limiter.on_throttle()
+        limiter.on_throttle()
+        assert limiter.rate == 2.5
+
+        for _ in range(100):
+            limiter.on_success()
+        assert limiter.rate == 10
+
+
+class TestPushJournal:
+    def test_rerun_skips_acknowledged_tasks(self, tmp_path):
+        journal_path = str(tmp_path / "tasks.txt.journal")
+        task_list = [_scheduled_task(f"Task {hour}", 26, hour) for hour in range(8, 14)]
+
+        with PushJournal(journal_path) as journal:
+            first_report = push_tasks(FakeAPI(failing_notes={"Task 10", "Task 12"}), task_list, 2, journal)
+        assert len(first_report.get_failed()) == 2
+
+        api = FakeAPI()
+        with PushJournal(journal_path) as journal:
+            second_report = push_tasks(api, task_list, 2, journal)
+
+        assert len(second_report.get_skipped()) == 4
+        assert not second_report.get_failed()
+        assert sorted(note for _, note, _, _ in api.pushed) == ["Task 10", "Task 12"]
+
+    def test_removed_entries_are_no_longer_acknowledged(self, tmp_path):
+        journal_path = str(tmp_path / "tasks.txt.journal")
+        moved_task, deleted_task = _scheduled_task("Moved", 26, 8), _scheduled_task("Deleted", 26, 9)
+        with PushJournal(journal_path) as journal:
+            journal.record_acked(moved_task, 1)
+            journal.record_acked(deleted_task, 2)
+            journal.record_acked(moved_task, 3)
+            journal.record_removed(moved_task, 1)
+            journal.record_removed(deleted_task, 2)
+            assert journal.get_entry_id(moved_task) == 3
+
+        with PushJournal(journal_path) as journal:
+            assert journal.get_entry_id(moved_task) == 3
+            assert not journal.is_acked(deleted_task)
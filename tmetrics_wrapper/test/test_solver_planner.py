@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+import pytest
+from instrumentation import METRICS
+from period_planning import SOLVER_ENGINE, get_plan_variant, plan_period
+from solver_planner import SolverTimeBlocksPlanner
+from time_blocks_planner import NotFullyPlannedError, Task, TimeBlocksPlanner
+from time_entries import TimeEntryIndex
+
+START_DATE = date(2021, 7, 26)
+END_DATE = date(2021, 7, 27)
+
+
+def _create_task_list() -> list[Task]:
+    """Fits exactly into two days as 5h + 4h and 3 x 3h, which the greedy passes do not find."""
+    return [Task(note, 1, timedelta(hours=hours)) for note, hours in (("A", 5), ("B", 4), ("C", 3), ("D", 3), ("E", 3))]
+
+
+def _assert_valid(planner: TimeBlocksPlanner):
+    for workday in planner.workday_list:
+        task_list = sorted(workday.task_list + workday.existing_task_list, key=lambda task: task.start_date)
+        assert all(workday.start_date <= task.start_date and task.end_date <= workday.end_date for task in task_list)
+        assert all(
+            previous.end_date <= task.start_date for previous, task in zip(task_list, task_list[1:], strict=False)
+        )
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    METRICS.reset()
+
+
+def test_finds_plan_the_greedy_passes_miss():
+    with pytest.raises(NotFullyPlannedError):
+        TimeBlocksPlanner(START_DATE, END_DATE, _create_task_list()).plan()
+
+    planner = SolverTimeBlocksPlanner(START_DATE, END_DATE, _create_task_list())
+    planner.plan()
+
+    _assert_valid(planner)
+    assert len(planner.get_scheduled_tasks()) == 5
+    assert sorted(workday.get_occupied_time() for workday in planner.workday_list) == [timedelta(hours=9)] * 2
+    assert METRICS.counters["solver.improved"] == 1
+
+
+def test_balances_days_and_keeps_similar_tasks_apart():
+    task_list = [Task("Meeting", 1, timedelta(hours=2)) for _ in range(3)] + [Task("Coding", 2, timedelta(hours=6))]
+    planner = SolverTimeBlocksPlanner(START_DATE, date(2021, 7, 28), task_list)
+    planner.plan()
+
+    _assert_valid(planner)
+    assert all([task.note for task in workday.task_list].count("Meeting") == 1 for workday in planner.workday_list)
+    occupied_list = sorted(workday.get_occupied_time() for workday in planner.workday_list)
+    assert occupied_list == [timedelta(hours=2), timedelta(hours=2), timedelta(hours=8)]
+
+
+def test_plans_around_existing_entries():
+    existing_entry_index = TimeEntryIndex.from_entries(
+        [{"startTime": "2021-07-26T12:00:00", "endTime": "2021-07-26T13:00:00", "note": "Lunch"}]
+    )
+    planner = SolverTimeBlocksPlanner(START_DATE, END_DATE, _create_task_list()[1:], existing_entry_index)
+    planner.plan()
+
+    _assert_valid(planner)
+    assert len(planner.get_scheduled_tasks()) == 4
+
+
+def test_zero_budget_keeps_greedy_plan():
+    planner = SolverTimeBlocksPlanner(START_DATE, END_DATE, _create_task_list()[1:], time_budget_sec=0)
+    planner.plan()
+    greedy_planner = TimeBlocksPlanner(START_DATE, END_DATE, _create_task_list()[1:])
+    greedy_planner.plan()
+
+    assert planner.get_scheduled_tasks() == greedy_planner.get_scheduled_tasks()
+    assert METRICS.counters["solver.budget_exhausted"] == 1
+
+    with pytest.raises(NotFullyPlannedError):
+        SolverTimeBlocksPlanner(START_DATE, END_DATE, _create_task_list(), time_budget_sec=0).plan()
+
+
+def test_plan_period_with_solver_engine():
+    planner = plan_period(START_DATE, END_DATE, _create_task_list(), engine=SOLVER_ENGINE, time_budget_sec=5)
+
+    assert isinstance(planner, SolverTimeBlocksPlanner)
+    assert planner.time_budget_sec == 5
+    assert get_plan_variant() == ""
+    assert get_plan_variant(SOLVER_ENGINE, 5) != get_plan_variant(SOLVER_ENGINE, 1)
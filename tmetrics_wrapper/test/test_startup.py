@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from conftest import CLI_PATH, SOURCE_PATH
+
+STARTUP_TIME_BUDGET_SEC = 1.5
+HEAVY_MODULES = ("pandas", "requests", "termcolor")
+
+
+def _run_cli(*args) -> tuple[subprocess.CompletedProcess, float]:
+    env = {**os.environ, "PYTHONPATH": SOURCE_PATH}
+    start = time.perf_counter()
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, CLI_PATH, *args], capture_output=True, text=True, env=env, check=False
+    )
+    return result, time.perf_counter() - start
+
+
+def test_cli_import_does_not_load_heavy_modules():
+    code = (
+        "import sys, runpy\n"
+        f"runpy.run_path({CLI_PATH!r})\n"
+        f"print(','.join(module for module in {HEAVY_MODULES!r} if module in sys.modules))"
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": SOURCE_PATH},
+        check=True,
+    )
+
+    assert result.stdout.strip() == ""
+
+
+def test_help_startup_time():
+    result, elapsed = _run_cli("--help")
+
+    assert result.returncode == 0
+    assert elapsed < STARTUP_TIME_BUDGET_SEC
+
+
+def test_dry_run_startup_time(tmp_path):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"projects": {"Foo/Abc": {"id": 123, "alias": "foo"}}}))
+    tasks_path = tmp_path / "tasks.txt"
+    tasks_path.write_text("12.07.2021-16.07.2021\n26|Some feature|$foo\n3|Code review|Foo/Abc|3\n")
+
+    result, elapsed = _run_cli(
+        "run",
+        "--tasks-file",
+        str(tasks_path),
+        "--config-file",
+        str(config_path),
+        "--account-id",
+        "1",
+        "--user-token",
+        "token",
+        "--dry-run",
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "Planned 29.0h in total" in result.stdout
+    assert elapsed < STARTUP_TIME_BUDGET_SEC
@@ -0,0 +1,132 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from click.testing import CliRunner
+from conftest import CLI_PATH, DEFAULT_CONFIG, DEFAULT_TASKS, SOURCE_PATH, write_file
+from period_planning import plan_period
+from tasks_watcher import TasksWatcher, split_period_chunks
+
+from tmetrics_wrapper.benchmark.mock_server import MockTMetricsServer
+from tmetrics_wrapper.tmetrics_wrapper import cli
+
+FIRST_PERIOD = DEFAULT_TASKS.strip()
+SECOND_PERIOD = "02.08.2021-02.08.2021\n6|Other feature|$bar"
+
+
+def _create_watcher(tmp_path, planned_list: list) -> TasksWatcher:
+    write_file(tmp_path / "config.json", json.dumps(DEFAULT_CONFIG))
+    write_file(tmp_path / "tasks.txt", f"{FIRST_PERIOD}\n---\n{SECOND_PERIOD}\n")
+
+    def plan_function(period):
+        planned_list.append(period[0])
+        return plan_period(*period)
+
+    return TasksWatcher(str(tmp_path / "tasks.txt"), str(tmp_path / "config.json"), plan_function)
+
+
+def test_split_period_chunks_keeps_line_numbers():
+    assert split_period_chunks(f"{FIRST_PERIOD}\n---\n\n---\n{SECOND_PERIOD}\n") == [
+        (1, FIRST_PERIOD),
+        (7, SECOND_PERIOD),
+    ]
+
+
+def test_replans_only_changed_periods(tmp_path):
+    planned_list = []
+    watcher = _create_watcher(tmp_path, planned_list)
+
+    assert len(watcher.refresh()) == 2
+    assert watcher.refresh() is None
+    first_planner = watcher.periods[0].planner
+
+    write_file(tmp_path / "tasks.txt", f"{FIRST_PERIOD}\n---\n{SECOND_PERIOD.replace('6|', '7|')}\n")
+    changed_list = watcher.refresh()
+
+    assert [period.line_number for period in changed_list] == [5]
+    assert watcher.periods[0].planner is first_planner
+    assert len(planned_list) == 3
+
+    write_file(tmp_path / "config.json", json.dumps({"projects": {**DEFAULT_CONFIG["projects"], "New/One": {"id": 1}}}))
+    assert len(watcher.refresh()) == 2
+
+
+def test_reports_errors_of_changed_periods_at_file_lines(tmp_path):
+    watcher = _create_watcher(tmp_path, [])
+    watcher.refresh()
+
+    write_file(tmp_path / "tasks.txt", f"{FIRST_PERIOD}\n---\n{SECOND_PERIOD}\n1|Broken|$missing\n")
+    watcher.refresh()
+
+    assert watcher.periods[0].planner is not None
+    assert watcher.get_errors() == [
+        f"{tmp_path / 'tasks.txt'}:7: Project id not found for alias $missing ('1|Broken|$missing')"
+    ]
+
+    write_file(tmp_path / "config.json", "{")
+    watcher.refresh()
+    assert watcher.periods == []
+    assert len(watcher.get_errors()) == 1
+
+
+def test_watch_pushes_on_command(tmp_path):
+    _create_watcher(tmp_path, [])
+
+    with MockTMetricsServer() as server:
+        result = CliRunner().invoke(
+            cli,
+            [
+                "watch",
+                "--tasks-file",
+                str(tmp_path / "tasks.txt"),
+                "--config-file",
+                str(tmp_path / "config.json"),
+                "--account-id",
+                "1",
+                "--user-token",
+                "token",
+                "--host",
+                server.url,
+                "--interval",
+                "0.01",
+            ],
+            input="push\npush\nquit\n",
+        )
+        time_entry_count = len(server.time_entries)
+
+    assert result.exit_code == 0, result.output
+    assert "Planned 14.0h in total for 2021-07-26 - 2021-07-27" in result.output
+    assert time_entry_count == 5
+
+
+def test_watch_without_terminal_keeps_watching_until_sigterm(tmp_path):
+    _create_watcher(tmp_path, [])
+    args = ["watch", "--tasks-file", str(tmp_path / "tasks.txt"), "--config-file", str(tmp_path / "config.json")]
+    args += ["--account-id", "1", "--user-token", "token", "--dry-run", "--interval", "0.01"]
+
+    process = subprocess.Popen(  # noqa: S603
+        [sys.executable, CLI_PATH, *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        env={**os.environ, "PYTHONPATH": SOURCE_PATH},
+    )
+    try:
+        first_plan = process.stdout.readline()
+        while first_plan and "Planned" not in first_plan:
+            first_plan = process.stdout.readline()
+        time.sleep(0.5)
+        running_after_end_of_input = process.poll() is None
+        process.send_signal(signal.SIGTERM)
+        return_code = process.wait(timeout=10)
+    finally:
+        process.kill()
+        process.stdout.close()
+
+    assert "Planned 14.0h in total for 2021-07-26 - 2021-07-27" in first_plan
+    assert running_after_end_of_input
+    assert return_code == 0
@@ -0,0 +1,99 @@
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from time_blocks_planner import Task, TimeBlocksPlanner, WorkDay
+from time_entries import TimeEntryIndex
+
+
+class TestWorkDay:
+    def test_occupied_time_and_similar_tasks(self):
+        workday = WorkDay(date(2021, 7, 26))
+        workday.add_task(Task("Meeting", 123, timedelta(hours=2)))
+        workday.add_task(Task("Review", 456, timedelta(minutes=30)))
+
+        assert workday.get_occupied_time() == timedelta(hours=2, minutes=30)
+        assert workday.get_free_time() == timedelta(hours=6, minutes=30)
+        assert workday.has_similar_task(Task("Meeting", 123, timedelta(hours=2)))
+        assert not workday.has_similar_task(Task("Meeting", 123, timedelta(hours=1)))
+        assert workday.task_list[1].start_date == workday.task_list[0].end_date
+
+    def test_tasks_fill_gaps_between_existing_entries(self):
+        existing_task_list = TimeEntryIndex.from_entries(
+            [
+                {"startTime": "2021-07-26T09:00:00", "endTime": "2021-07-26T10:00:00", "note": "Standup"},
+                {"startTime": "2021-07-26T11:00:00", "endTime": "2021-07-26T15:00:00", "project": {"id": 1}},
+            ]
+        ).get_day(date(2021, 7, 26))
+        workday = WorkDay(date(2021, 7, 26), existing_task_list)
+
+        assert workday.get_occupied_time() == timedelta(hours=5)
+        assert workday.get_longest_free_block() == timedelta(hours=2)
+        workday.add_task(Task("Review", 456, timedelta(hours=1, minutes=30)))
+        workday.add_task(Task("Meeting", 123, timedelta(minutes=45)))
+        workday.add_task(Task("Docs", 123, timedelta(minutes=30)))
+
+        assert [(task.note, task.start_date.hour, task.start_date.minute) for task in workday.task_list] == [
+            ("Meeting", 8, 0),
+            ("Docs", 10, 0),
+            ("Review", 15, 0),
+        ]
+        assert workday.get_longest_free_block() == timedelta(minutes=30)
+
+
+SPLIT_MEMORY_BUDGET_BYTES = 8 * 1024 * 1024
+SPLIT_TIME_BUDGET_SEC = 2
+
+
+class TestTimeBlocksPlanner:
+    def test_split_tasks_memory_and_time(self):
+        task_list = [Task(f"Feature {i % 20}", i % 5, timedelta(hours=30)) for i in range(200)]
+        task_list += [Task("Code review", 123, timedelta(hours=20), 50) for _ in range(100)]
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        split_task_list = TimeBlocksPlanner._split_tasks(task_list, 250)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert len(split_task_list) == 200 * 250 + 100 * 50
+        assert split_task_list[0].duration == timedelta(hours=30) / 250
+        assert split_task_list[0].note is split_task_list[249].note
+        assert peak < SPLIT_MEMORY_BUDGET_BYTES
+        assert elapsed < SPLIT_TIME_BUDGET_SEC
+
+    def test_plan(self):
+        task_list = [
+            Task("Abc Meeting", 123, timedelta(hours=2)),
+            Task("Some Meeting", 456987, timedelta(hours=5, minutes=20), 2),
+            Task("Some feature", 4567, timedelta(hours=26)),
+            Task("Code review", 4567, timedelta(hours=3), 3),
+            Task("Code review", 456987, timedelta(hours=2, minutes=25), 5),
+        ]
+        planner = TimeBlocksPlanner(date(2021, 7, 12), date(2021, 7, 16), task_list)
+
+        planner.plan()
+
+        assert all(task.is_scheduled() for task in planner.task_list)
+        assert planner.get_total_planned_time() == timedelta(hours=38, minutes=45)
+        for workday in planner.workday_list:
+            assert workday.get_free_time() > timedelta()
+            assert [task.note for task in workday.task_list].count("Some feature") == 1
+
+    def test_plan_around_existing_entries(self):
+        existing_entry_index = TimeEntryIndex.from_entries(
+            [
+                {"startTime": f"2021-07-{day}T08:00:00", "endTime": f"2021-07-{day}T14:00:00", "note": "Support"}
+                for day in (26, 27)
+            ]
+        )
+        task_list = [Task("Feature", 123, timedelta(hours=4), 2), Task("Review", 456, timedelta(hours=1))]
+        planner = TimeBlocksPlanner(date(2021, 7, 26), date(2021, 7, 28), task_list, existing_entry_index)
+
+        planner.plan()
+
+        for task in planner.get_scheduled_tasks():
+            for existing_task in existing_entry_index.get_day(task.start_date.date()):
+                assert task.end_date <= existing_task.start_date or task.start_date >= existing_task.end_date
+        assert all(workday.get_free_time() > timedelta() for workday in planner.workday_list)
@@ -0,0 +1,125 @@
+import csv
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from api import TMetricsAPI
+from click.testing import CliRunner
+from time_entry_report import aggregate_time_entries, iter_time_entries
+
+from tmetrics_wrapper.benchmark.mock_server import MockTMetricsServer
+from tmetrics_wrapper.tmetrics_wrapper import cli
+
+START_DATE = date(2021, 7, 26)
+END_DATE = date(2021, 8, 8)
+ENTRIES = [
+    (1, "Feature", datetime(2021, 8, 2, 9), 2),
+    (1, "Feature", datetime(2021, 7, 26, 13), 3),
+    (1, "Feature", datetime(2021, 7, 26, 8), 4),
+    (2, "Review", datetime(2021, 7, 26, 12), 1),
+    (2, "Review", datetime(2021, 8, 8, 23), 1),
+    (2, "Outside", datetime(2021, 8, 9, 8), 1),
+]
+
+
+@pytest.fixture
+def server():
+    with MockTMetricsServer() as server:
+        with TMetricsAPI(account_id="1", token="token", host=server.url) as api:  # noqa: S106
+            for project_id, note, start_time, hours in ENTRIES:
+                api.add_time_entry(project_id, note, start_time, start_time + timedelta(hours=hours))
+        yield server
+
+
+def _entry(start_time: datetime, project_id: int = 1, note: str = "Feature") -> dict:
+    return {
+        "startTime": start_time.isoformat(),
+        "endTime": (start_time + timedelta(hours=1)).isoformat(),
+        "project": {"id": project_id},
+        "note": note,
+    }
+
+
+def test_fetches_sorted_entries_window_by_window(server):
+    with TMetricsAPI(account_id="1", token="token", host=server.url) as api:  # noqa: S106
+        entries = iter_time_entries(api, START_DATE, END_DATE, window_days=3)
+        first_entry = next(entries)
+        fetched_before_consuming = len(server.records) - len(ENTRIES)
+        entry_list = [first_entry, *entries]
+
+    assert fetched_before_consuming <= 2
+    assert len(server.records) - len(ENTRIES) == 5
+    assert [entry["startTime"] for entry in entry_list] == sorted(
+        start_time.isoformat() for _, _, start_time, _ in ENTRIES[:-1]
+    )
+
+
+def test_yields_a_day_before_reading_the_next_one():
+    consumed = []
+
+    def generate_entries():
+        for start_time in (datetime(2021, 7, 26, 8), datetime(2021, 7, 26, 9), datetime(2021, 7, 27, 8)):
+            consumed.append(start_time)
+            yield _entry(start_time)
+
+    rows = aggregate_time_entries(generate_entries(), ("day", "project_id"))
+
+    assert next(rows) == {"day": "2021-07-26", "project_id": 1, "entries": 2, "seconds": 7200, "hours": 2.0}
+    assert len(consumed) == 3
+    assert list(rows) == [{"day": "2021-07-27", "project_id": 1, "entries": 1, "seconds": 3600, "hours": 1.0}]
+
+
+def test_aggregates_over_the_whole_range_without_day():
+    entry_list = [
+        _entry(datetime(2021, 7, 26, 8)),
+        _entry(datetime(2021, 7, 27, 8)),
+        _entry(datetime(2021, 7, 27, 9), 2),
+    ]
+
+    assert list(aggregate_time_entries(entry_list, ("note", "project_id"))) == [
+        {"project_id": 1, "note": "Feature", "entries": 2, "seconds": 7200, "hours": 2.0},
+        {"project_id": 2, "note": "Feature", "entries": 1, "seconds": 3600, "hours": 1.0},
+    ]
+
+
+def test_report_command_writes_csv_and_jsonl(server, tmp_path):
+    args = ["report", "--account-id", "1", "--user-token", "token", "--host", server.url]
+    args += ["--start-date", "2021-07-26", "--end-date", "08.08.2021"]
+    runner = CliRunner()
+
+    csv_result = runner.invoke(cli, [*args, "--group-by", "project_id", "--group-by", "day"])
+    jsonl_result = runner.invoke(cli, [*args, "--format", "jsonl", "--output", str(tmp_path / "entries.jsonl")])
+
+    assert csv_result.exit_code == 0, csv_result.output
+    assert list(csv.DictReader(csv_result.stdout.splitlines())) == [
+        {"day": "2021-07-26", "project_id": "1", "entries": "2", "seconds": "25200", "hours": "7.0"},
+        {"day": "2021-07-26", "project_id": "2", "entries": "1", "seconds": "3600", "hours": "1.0"},
+        {"day": "2021-08-02", "project_id": "1", "entries": "1", "seconds": "7200", "hours": "2.0"},
+        {"day": "2021-08-08", "project_id": "2", "entries": "1", "seconds": "3600", "hours": "1.0"},
+    ]
+    assert jsonl_result.exit_code == 0, jsonl_result.output
+    row_list = [json.loads(line) for line in (tmp_path / "entries.jsonl").read_text().splitlines()]
+    assert [(row["day"], row["note"], row["hours"]) for row in row_list][:2] == [
+        ("2021-07-26", "Feature", 4.0),
+        ("2021-07-26", "Review", 1.0),
+    ]
+    assert len(row_list) == 5
+
+
+def test_report_command_reads_the_cache_db(server, tmp_path):
+    args = ["report", "--account-id", "1", "--user-token", "token", "--host", server.url]
+    args += ["--start-date", "2021-07-26", "--end-date", "2021-08-08", "--window-days", "3", "--group-by", "project_id"]
+    args += ["--cache-db", str(tmp_path / "cache.db")]
+    runner = CliRunner()
+
+    result = runner.invoke(cli, args)
+    offline_result = runner.invoke(cli, [*args, "--offline"])
+
+    assert result.exit_code == 0, result.output
+    assert offline_result.exit_code == 0, offline_result.output
+    expected_rows = [
+        {"project_id": "1", "entries": "3", "seconds": "32400", "hours": "9.0"},
+        {"project_id": "2", "entries": "2", "seconds": "7200", "hours": "2.0"},
+    ]
+    assert list(csv.DictReader(result.stdout.splitlines())) == expected_rows
+    assert list(csv.DictReader(offline_result.stdout.splitlines())) == expected_rows
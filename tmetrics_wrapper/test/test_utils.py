@@ -0,0 +1,27 @@
+import os
+
+import pytest
+from utils import atomic_write
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "out.json"
+    path.write_text("old")
+
+    with atomic_write(str(path)) as file:
+        file.write("new")
+
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["out.json"]
+
+
+def test_atomic_write_keeps_the_file_and_removes_the_temporary_one_on_error(tmp_path):
+    path = tmp_path / "out.json"
+    path.write_text("old")
+
+    with pytest.raises(TypeError), atomic_write(str(path)) as file:
+        file.write("partial")
+        raise TypeError("not serializable")
+
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["out.json"]
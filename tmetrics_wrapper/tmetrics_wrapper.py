@@ -1,38 +1,216 @@
+import functools
 import json
 import logging
 import os
+import queue
+import signal
 import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 
 import click
-from api import TMetricsAPI
-from input_parser import TasksParser
-from time_blocks_planner import TimeBlocksPlanner
+from api import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_SIZE,
+    REQUEST_TIMEOUT_SEC,
+    TMetricsAPI,
+    TMetricsAPIError,
+    create_session,
+)
+from batch import BatchManifestError, BatchUserRun, load_manifest, render_batch_summary
+from input_parser import AggregatedTaskParsingError, TaskParsingError, TasksParser
+from instrumentation import METRICS, profile_run
+from local_store import LocalStore
+from period_planning import PLANNER_ENGINES, PYTHON_ENGINE, get_plan_variant, plan_periods
+from plan_cache import PLAN_CACHE_SUFFIX, PlanCache
+from plan_file import PLAN_FILE_SUFFIX, PlanFileError, iter_planned_tasks, validate_plan_file, write_plan_file
+from plan_sync import (
+    attach_existing_entries,
+    load_cached_plan,
+    plan_period_cached,
+    plan_periods_cached,
+    push_plans,
+)
+from planner_trace import TRACE, render_trace
+from project_config import ProjectConfigError, load_project_index
+from push_engine import PushReport, push_tasks
+from push_journal import JOURNAL_SUFFIX, PushJournal
+from rate_limiter import RateLimiter
+from solver_planner import DEFAULT_PLAN_TIME_BUDGET_SEC
+from tasks_watcher import TasksWatcher, WatchedPeriod
+from time_blocks_planner import NotFullyPlannedError, TimeBlocksPlanner
+from time_entry_report import (
+    DEFAULT_REPORT_WINDOW_DAYS,
+    GROUP_FIELDS,
+    REPORT_FORMATS,
+    aggregate_time_entries,
+    get_report_fields,
+    iter_time_entries,
+    to_entry_row,
+    write_report_rows,
+)
 from utils import add_click_options, config_logger, query_yes_no
 
 LOG = logging.getLogger(__name__)
 
-TASK_DEFINITION_SEPARATOR = "---"
+DEFAULT_RATE_LIMIT_PER_SEC = 10.0
+DEFAULT_WATCH_INTERVAL_SEC = 0.5
+REPORT_DATE_FORMATS = ["%Y-%m-%d", "%d.%m.%Y"]
+QUIT_COMMANDS = ("quit", "q", "exit")
+PUSH_COMMANDS = ("push", "p")
+RELOAD_COMMANDS = ("reload", "r")
 
-_shared_options = [
+
+def _get_account_options(required: bool = True) -> list:
+    return [
+        click.option(
+            "--account-id",
+            default=os.environ.get("TMETRICS_ACCOUNT_ID"),
+            required=required,
+            help="Account id, can be found in tmetrics url. Can be defined through env variable: TMETRICS_ACCOUNT_ID",
+        ),
+        click.option(
+            "--user-token",
+            default=os.environ.get("TMETRICS_TOKEN"),
+            show_default=False,
+            required=required,
+            help='User API token, you can generate it in TMetrics "My profile" section. '
+            "Can be defined through env variable: TMETRICS_TOKEN",
+        ),
+    ]
+
+
+_account_options = _get_account_options()
+_client_options = [
+    click.option("--host", default="https://app.tmetric.com", help="TMetrics host.", show_default=True),
     click.option(
-        "--account-id",
-        default=os.environ.get("TMETRICS_ACCOUNT_ID"),
-        required=True,
-        help="Account id, can be found in tmetrics url. Can be defined through env variable: TMETRICS_ACCOUNT_ID",
+        "--max-retries",
+        default=DEFAULT_MAX_RETRIES,
+        type=click.IntRange(min=0),
+        show_default=True,
+        help="How many times a failed request is retried.",
     ),
     click.option(
-        "--user-token",
-        default=os.environ.get("TMETRICS_TOKEN"),
-        show_default=False,
-        required=True,
-        help='User API token, you can generate it in TMetrics "My profile" section. '
-        "Can be defined through env variable: TMETRICS_TOKEN",
+        "--request-timeout",
+        default=REQUEST_TIMEOUT_SEC,
+        type=click.FloatRange(min=0, min_open=True),
+        show_default=True,
+        help="Timeout of a single API request in seconds.",
     ),
-    click.option("--host", default="https://app.tmetric.com", help="TMetrics host.", show_default=True),
-    click.option("--dry-run", is_flag=True, default=False, help="Do not make any API calls."),
+]
+_verbose_options = [
     click.option("-v", "--verbose", is_flag=True, default=False, help="Enable debug logs."),
+]
+_common_options = [
+    click.option("--dry-run", is_flag=True, default=False, help="Do not make any API calls."),
+    *_verbose_options,
+]
+_confirm_options = [
     click.option("-y", "--assume-yes", is_flag=True, default=False, help="Do not ask for confirmation."),
 ]
+_store_options = [
+    click.option(
+        "--cache-db",
+        type=click.Path(dir_okay=False),
+        help="SQLite file mirroring time entries and projects. Reads go through it and only outdated data is fetched.",
+    ),
+    click.option("--offline", is_flag=True, default=False, help="Read only from --cache-db, never fetch."),
+    click.option(
+        "--refresh",
+        is_flag=True,
+        default=False,
+        help="Fetch again every time entry window stored in --cache-db, e.g. after editing past weeks in TMetrics.",
+    ),
+]
+_shared_options = [
+    *_account_options,
+    *_client_options,
+    *_store_options,
+    *_common_options,
+    *_confirm_options,
+]
+_push_options = [
+    click.option(
+        "--concurrency",
+        default=1,
+        type=click.IntRange(min=1),
+        show_default=True,
+        help="How many time entries are pushed in parallel.",
+    ),
+    click.option(
+        "--rate-limit",
+        default=DEFAULT_RATE_LIMIT_PER_SEC,
+        type=click.FloatRange(min=0, min_open=True),
+        show_default=True,
+        help="Maximum number of API requests per second. Lowered automatically when the server throttles.",
+    ),
+]
+_jobs_options = [
+    click.option(
+        "--jobs",
+        type=click.IntRange(min=1),
+        help="Number of processes planning periods in parallel, with --parallel or in run-batch, or otherwise the "
+        "variants of the portfolio engine. [default: number of CPUs]",
+    ),
+]
+_planning_options = [
+    click.option(
+        "--engine",
+        type=click.Choice(PLANNER_ENGINES),
+        default=PYTHON_ENGINE,
+        show_default=True,
+        help="Planner implementation. python and numpy make the same greedy plans, numpy is faster for long ranges "
+        "with many tasks. solver searches for a complete and balanced plan when the greedy one fails or is "
+        "unbalanced. portfolio makes greedy plans with many orderings and slack thresholds in parallel and keeps the "
+        "best balanced one.",
+    ),
+    click.option(
+        "--plan-time-budget",
+        default=DEFAULT_PLAN_TIME_BUDGET_SEC,
+        type=click.FloatRange(min=0),
+        show_default=True,
+        help="Seconds the solver and portfolio engines may search per period before they keep the best plan found so "
+        "far.",
+    ),
+    click.option(
+        "--trace",
+        is_flag=True,
+        default=False,
+        help="Record why the planner placed or deferred every task and print it with each plan and with the periods "
+        "that cannot be planned.",
+    ),
+]
+_sync_options = [
+    click.option(
+        "--no-journal", is_flag=True, default=False, help="Do not record nor skip already pushed time entries."
+    ),
+    click.option(
+        "--ignore-existing",
+        is_flag=True,
+        default=False,
+        help="Do not fetch already tracked time entries, plan every day as if it was empty.",
+    ),
+    click.option(
+        "--no-plan-cache",
+        is_flag=True,
+        default=False,
+        help="Always plan from scratch and push every time entry, like before the plan cache existed.",
+    ),
+]
+_profile_options = [
+    click.option(
+        "--profile",
+        type=click.Path(dir_okay=False),
+        help="Write phase timings, planner counters and per endpoint request latencies to this file as JSON.",
+    ),
+    click.option(
+        "--cprofile",
+        type=click.Path(dir_okay=False),
+        help="Run under cProfile and write its stats to this file, readable with python -m pstats.",
+    ),
+]
 
 
 @click.group()
@@ -44,14 +222,30 @@ def cli():
 @cli.command()
 @add_click_options(_shared_options)
 @click.option("--out-file", type=click.Path(exists=False), required=True)
-def init_config(verbose, account_id, user_token, host, out_file, dry_run, assume_yes):  # noqa: PLR0913
+def init_config(  # noqa: PLR0913
+    verbose,
+    account_id,
+    user_token,
+    host,
+    max_retries,
+    request_timeout,
+    cache_db,
+    offline,
+    refresh,
+    out_file,
+    dry_run,
+    assume_yes,
+):
     config_logger(verbose)
     LOG.debug(f"Listing projects for account id: {account_id}")
-    api = TMetricsAPI(account_id=account_id, token=user_token, host=host)
+    api = TMetricsAPI(
+        account_id=account_id, token=user_token, host=host, max_retries=max_retries, timeout=request_timeout
+    )
     if dry_run:
         LOG.error("Cannot generate config with dry run option.")
         sys.exit(1)
-    project_list = api.get_projects()
+    store = _open_store(api, account_id, cache_db, offline, refresh)
+    project_list = (store or api).get_projects()
     config_projects = {}
     for project in project_list:
         client_name = project.get("client", {"name": None}).get("name")
@@ -78,25 +272,750 @@ def init_config(verbose, account_id, user_token, host, out_file, dry_run, assume
     type=click.Path(exists=True),
     required=True,
 )
-def run(verbose, account_id, user_token, host, tasks_file, config_file, dry_run, assume_yes):  # noqa: PLR0913
+@add_click_options(_push_options)
+@click.option(
+    "--journal-file",
+    type=click.Path(dir_okay=False),
+    help=f"Where pushed time entries are recorded, so a rerun skips them. [default: <tasks-file>{JOURNAL_SUFFIX}]",
+)
+@click.option(
+    "--all-errors",
+    is_flag=True,
+    default=False,
+    help="Parse the whole tasks file before planning and report every error in it instead of the first one.",
+)
+@click.option(
+    "--parallel",
+    is_flag=True,
+    default=False,
+    help="Plan all periods up front in a process pool, then confirm and push them at once.",
+)
+@add_click_options(_jobs_options)
+@add_click_options(_planning_options)
+@click.option(
+    "--plan-cache",
+    "plan_cache_dir",
+    type=click.Path(file_okay=False),
+    help="Directory of cached plans and of the time entries last pushed from every period. Unchanged periods are not "
+    "planned again and changed ones only push their differences to the last pushed plan. "
+    f"[default: <tasks-file>{PLAN_CACHE_SUFFIX}]",
+)
+@add_click_options(_sync_options)
+@add_click_options(_profile_options)
+def run(  # noqa: PLR0913
+    verbose,
+    account_id,
+    user_token,
+    host,
+    max_retries,
+    request_timeout,
+    cache_db,
+    offline,
+    refresh,
+    tasks_file,
+    config_file,
+    concurrency,
+    rate_limit,
+    journal_file,
+    no_journal,
+    ignore_existing,
+    all_errors,
+    parallel,
+    jobs,
+    engine,
+    plan_time_budget,
+    trace,
+    plan_cache_dir,
+    no_plan_cache,
+    profile,
+    cprofile,
+    dry_run,
+    assume_yes,
+):
     config_logger(verbose=verbose)
+    if trace:
+        TRACE.enable()
+    click.get_current_context().with_resource(profile_run(profile, cprofile))
     LOG.debug(f"Running for account id: {account_id} on host: {host}")
-    api = TMetricsAPI(account_id=account_id, token=user_token, host=host)
-    with open(file=config_file) as config_file_:
-        config = json.load(config_file_)
-    with open(file=tasks_file) as tasks_file_:
-        tasks_definition_list = tasks_file_.read().split(TASK_DEFINITION_SEPARATOR)
-    parser = TasksParser(config)
-    LOG.debug(f"Task definitions{tasks_definition_list}")
-    for task_definition in tasks_definition_list:
-        if not task_definition:
-            LOG.warning("Empty task definition, skipping.")
-        start_date, end_date, task_list = parser.parse(task_definition)
-        planner = TimeBlocksPlanner(start_date, end_date, task_list)
-        planner.plan()
+    api = TMetricsAPI(
+        account_id=account_id,
+        token=user_token,
+        host=host,
+        pool_size=max(DEFAULT_POOL_SIZE, concurrency),
+        max_retries=max_retries,
+        timeout=request_timeout,
+        rate_limiter=RateLimiter(rate=rate_limit, burst=concurrency),
+    )
+    try:
+        project_index = load_project_index(config_file)
+    except ProjectConfigError as e:
+        LOG.error(f"{config_file}: {e}")
+        sys.exit(1)
+    parser = TasksParser(project_index=project_index)
+    period_list = METRICS.timed_iter("parse", parser.parse_file(tasks_file, collect_errors=all_errors))
+    store = _open_store(api, account_id, cache_db, offline, refresh)
+    journal = None if dry_run or no_journal else PushJournal(journal_file or f"{tasks_file}{JOURNAL_SUFFIX}")
+    plan_cache = None if no_plan_cache else PlanCache(plan_cache_dir or f"{tasks_file}{PLAN_CACHE_SUFFIX}")
+    try:
+        if all_errors:
+            period_list = list(period_list)
+        if not ignore_existing and (not dry_run or offline):
+            period_list = attach_existing_entries(store or api, period_list, journal, plan_cache)
+        planner_options = {"engine": engine, "time_budget_sec": plan_time_budget}
+        report = _plan_and_push(
+            api, period_list, journal, plan_cache, parallel, jobs, planner_options, concurrency, dry_run, assume_yes
+        )
+    except (TaskParsingError, AggregatedTaskParsingError) as e:
+        LOG.error(f"Invalid tasks file:\n{e}")
+        sys.exit(1)
+    except NotFullyPlannedError as e:
+        _log_not_fully_planned(e)
+        sys.exit(1)
+    finally:
+        if journal:
+            journal.close()
+    if store:
+        store.invalidate(report.results.keys())
+        store.close()
+    if report.get_failed():
+        LOG.error(f"Failed to push {len(report.get_failed())} time entries.")
+        sys.exit(1)
+
+
+@cli.command()
+@add_click_options(_client_options)
+@add_click_options(_common_options)
+@add_click_options(_confirm_options)
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help='JSON file listing the users: {"users": [{"name", "account_id", "user_token" or "user_token_env", '
+    '"tasks_file", "config_file"}]}. Paths are relative to the manifest.',
+)
+@add_click_options(_push_options)
+@add_click_options(_jobs_options)
+@add_click_options(_planning_options)
+@add_click_options(_sync_options)
+@click.option("--show-plans", is_flag=True, default=False, help="Display the plan of every period of every user.")
+@click.option(
+    "--report", "report_file", type=click.Path(dir_okay=False), help="Write the summary as JSON to this file."
+)
+@add_click_options(_profile_options)
+def run_batch(  # noqa: PLR0913
+    host,
+    max_retries,
+    request_timeout,
+    dry_run,
+    verbose,
+    assume_yes,
+    manifest,
+    concurrency,
+    rate_limit,
+    jobs,
+    engine,
+    plan_time_budget,
+    trace,
+    no_journal,
+    ignore_existing,
+    no_plan_cache,
+    show_plans,
+    report_file,
+    profile,
+    cprofile,
+):
+    """Plan and push the tasks of every user of a manifest in one process.
+
+    Users are parsed and their tracked time entries fetched concurrently, all periods are planned in one process
+    pool and users are pushed concurrently, each with its own rate limit, over one shared connection pool.
+    Concurrency and rate limit apply per user.
+    """
+    config_logger(verbose=verbose)
+    if trace:
+        TRACE.enable()
+    context = click.get_current_context()
+    context.with_resource(profile_run(profile, cprofile))
+    try:
+        user_list = load_manifest(manifest)
+    except BatchManifestError as e:
+        LOG.error(str(e))
+        sys.exit(1)
+
+    session = create_session(max(DEFAULT_POOL_SIZE, len(user_list) * concurrency))
+    context.call_on_close(session.close)
+    run_list = [
+        BatchUserRun(
+            user,
+            TMetricsAPI(
+                account_id=user.account_id,
+                token=user.user_token,
+                host=host,
+                max_retries=max_retries,
+                timeout=request_timeout,
+                rate_limiter=RateLimiter(rate=rate_limit, burst=concurrency),
+                session=session,
+            ),
+            journal=None if dry_run or no_journal else PushJournal(f"{user.tasks_file}{JOURNAL_SUFFIX}"),
+            plan_cache=None if no_plan_cache else PlanCache(f"{user.tasks_file}{PLAN_CACHE_SUFFIX}"),
+        )
+        for user in user_list
+    ]
+    try:
+        with ThreadPoolExecutor(max_workers=len(run_list), thread_name_prefix="batch") as executor:
+            list(
+                executor.map(
+                    functools.partial(_load_batch_user, fetch_existing=not (ignore_existing or dry_run)), run_list
+                )
+            )
+            _plan_batch(run_list, jobs, {"engine": engine, "time_budget_sec": plan_time_budget})
+            ready_list = [user_run for user_run in run_list if not user_run.result.error]
+            if show_plans:
+                for user_run in ready_list:
+                    click.echo(f"\n{user_run.user.name}:")
+                    for planner in user_run.planner_list:
+                        planner.display_current_plan()
+                        _print_trace(planner.trace_events)
+            planned_count = sum(user_run.result.planned_count for user_run in ready_list)
+            question = f"Push {planned_count} planned time entries of {len(ready_list)} users?"
+            if ready_list and not dry_run and (assume_yes or _confirm(question)):
+                list(executor.map(functools.partial(_push_batch_user, concurrency=concurrency), ready_list))
+    finally:
+        for user_run in run_list:
+            user_run.close()
+
+    result_list = [user_run.result for user_run in run_list]
+    click.echo(render_batch_summary(result_list))
+    if report_file:
+        with open(report_file, "w", encoding="utf-8") as file:
+            json.dump({"users": [result.to_dict() for result in result_list]}, file, indent=4)
+    if not all(result.succeeded for result in result_list):
+        sys.exit(1)
+
+
+def _load_batch_user(user_run: BatchUserRun, fetch_existing: bool):
+    """Parse the tasks file of the user and fetch their tracked time entries, recording errors in the result."""
+    user = user_run.user
+    try:
+        parser = TasksParser(project_index=load_project_index(user.config_file))
+        period_list = list(parser.parse_file(user.tasks_file, collect_errors=True))
+        if fetch_existing:
+            period_list = list(
+                attach_existing_entries(user_run.api, period_list, user_run.journal, user_run.plan_cache)
+            )
+    except (OSError, ProjectConfigError) as e:
+        user_run.fail(f"Invalid configuration: {e}")
+    except AggregatedTaskParsingError as e:
+        user_run.fail(f"Invalid tasks file:\n{e}")
+    except TMetricsAPIError as e:
+        user_run.fail(f"Fetching tracked time entries failed: {e}")
+    else:
+        user_run.period_list = period_list
+        user_run.result.period_count = len(period_list)
+
+
+def _plan_batch(run_list: list[BatchUserRun], jobs: int | None, planner_options: dict):
+    """Plan the periods of all users without a cached plan in one process pool.
+
+    A user with a period that cannot be planned is marked as failed and none of their periods is pushed.
+    """
+    variant = get_plan_variant(**planner_options)
+    missing_list = []
+    for user_run in run_list:
+        for period in user_run.period_list:
+            key, planner = (
+                load_cached_plan(period, user_run.plan_cache, variant) if user_run.plan_cache else (None, None)
+            )
+            user_run.planner_list.append(planner)
+            if not planner:
+                missing_list.append((user_run, len(user_run.planner_list) - 1, key, period))
+
+    if missing_list:
+        planned_list = plan_periods(
+            (period for *_, period in missing_list), jobs=jobs, return_exceptions=True, **planner_options
+        )
+        for (user_run, index, key, period), planner in zip(missing_list, planned_list, strict=True):
+            if isinstance(planner, NotFullyPlannedError):
+                user_run.fail(f"Cannot plan {period[0]} - {period[1]}: {planner}")
+                _print_trace(planner.trace_events)
+                continue
+            if user_run.plan_cache:
+                user_run.plan_cache.store_plan(key, planner)
+            user_run.planner_list[index] = planner
+
+    for user_run in run_list:
+        if not user_run.result.error:
+            user_run.result.planned_count = sum(len(planner.get_scheduled_tasks()) for planner in user_run.planner_list)
+
+
+def _push_batch_user(user_run: BatchUserRun, concurrency: int):
+    user_run.result.report = push_plans(
+        user_run.api,
+        user_run.planner_list,
+        user_run.journal,
+        user_run.plan_cache,
+        concurrency=concurrency,
+    )
+
+
+@cli.command()
+@add_click_options(_account_options)
+@add_click_options(_client_options)
+@add_click_options(_common_options)
+@click.option("--tasks-file", help="Path to your task definitons file", type=click.Path(exists=True), required=True)
+@click.option(
+    "--config-file",
+    help="Path to your configuration",
+    show_default=True,
+    default="config.json",
+    type=click.Path(exists=True),
+    required=True,
+)
+@add_click_options(_push_options)
+@add_click_options(_planning_options)
+@add_click_options(_sync_options)
+@click.option(
+    "--interval",
+    default=DEFAULT_WATCH_INTERVAL_SEC,
+    type=click.FloatRange(min=0, min_open=True),
+    show_default=True,
+    help="How often the files are checked for changes, in seconds.",
+)
+def watch(  # noqa: PLR0913
+    account_id,
+    user_token,
+    host,
+    max_retries,
+    request_timeout,
+    dry_run,
+    verbose,
+    tasks_file,
+    config_file,
+    concurrency,
+    rate_limit,
+    engine,
+    plan_time_budget,
+    trace,
+    no_journal,
+    ignore_existing,
+    no_plan_cache,
+    interval,
+):
+    """Keep replanning the tasks file while it is edited and push on request.
+
+    Only periods whose text changed are parsed and planned again, and only their plans are displayed. Type push to
+    push the current plans, reload to replan everything, or quit. Without a terminal, e.g. as a service, commands are
+    read until the end of the input and watching goes on until SIGINT or SIGTERM.
+    """
+    config_logger(verbose=verbose)
+    if trace:
+        TRACE.enable()
+    api = TMetricsAPI(
+        account_id=account_id,
+        token=user_token,
+        host=host,
+        pool_size=max(DEFAULT_POOL_SIZE, concurrency),
+        max_retries=max_retries,
+        timeout=request_timeout,
+        rate_limiter=RateLimiter(rate=rate_limit, burst=concurrency),
+    )
+    journal = None if dry_run or no_journal else PushJournal(f"{tasks_file}{JOURNAL_SUFFIX}")
+    plan_cache = None if no_plan_cache else PlanCache(f"{tasks_file}{PLAN_CACHE_SUFFIX}")
+    planner_options = {"engine": engine, "time_budget_sec": plan_time_budget}
+
+    def plan_watched_period(period) -> TimeBlocksPlanner:
+        if not (ignore_existing or dry_run):
+            period = next(attach_existing_entries(api, [period], journal, plan_cache))
+        return plan_period_cached(period, plan_cache, planner_options)
+
+    watcher = TasksWatcher(tasks_file, config_file, plan_watched_period)
+    command_queue: queue.Queue[str] = queue.Queue()
+    threading.Thread(target=_read_commands, args=(command_queue,), name="watch-stdin", daemon=True).start()
+    previous_sigterm_handler = signal.signal(signal.SIGTERM, _interrupt)
+    force_refresh = False
+    try:
+        while True:
+            start = time.perf_counter()
+            changed_list = watcher.refresh(force=force_refresh)
+            force_refresh = False
+            if changed_list is not None:
+                _display_watched(watcher, changed_list, time.perf_counter() - start)
+            try:
+                command = command_queue.get(timeout=interval)
+            except queue.Empty:
+                continue
+            if command in QUIT_COMMANDS:
+                break
+            if command in PUSH_COMMANDS:
+                _push_watched(api, watcher, journal, plan_cache, concurrency, dry_run)
+            elif command in RELOAD_COMMANDS:
+                force_refresh = True
+            elif command:
+                LOG.warning(f"Unknown command {command!r}, expected push, reload or quit.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous_sigterm_handler)
+        if journal:
+            journal.close()
+        api.close()
+
+
+@cli.command()
+@add_click_options(_get_account_options(required=False))
+@add_click_options(_client_options)
+@add_click_options(_store_options)
+@add_click_options(_verbose_options)
+@click.option("--tasks-file", help="Path to your task definitons file", type=click.Path(exists=True), required=True)
+@click.option(
+    "--config-file",
+    help="Path to your configuration",
+    show_default=True,
+    default="config.json",
+    type=click.Path(exists=True),
+    required=True,
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    help=f"Where to write the plans. [default: <tasks-file>{PLAN_FILE_SUFFIX}]",
+)
+@add_click_options(_jobs_options)
+@add_click_options(_planning_options)
+@click.option(
+    "--ignore-existing",
+    is_flag=True,
+    default=False,
+    help="Do not fetch already tracked time entries, plan every day as if it was empty. Needs no account.",
+)
+@click.option("--no-plan-cache", is_flag=True, default=False, help="Plan every period, even unchanged ones.")
+def plan(  # noqa: PLR0913
+    verbose,
+    account_id,
+    user_token,
+    host,
+    max_retries,
+    request_timeout,
+    cache_db,
+    offline,
+    refresh,
+    tasks_file,
+    config_file,
+    output,
+    jobs,
+    engine,
+    plan_time_budget,
+    trace,
+    ignore_existing,
+    no_plan_cache,
+):
+    """Plan every period of a tasks file into a plan file, without pushing anything.
+
+    Periods are planned in a process pool. Push the file later with the push command.
+    """
+    config_logger(verbose=verbose)
+    if trace:
+        TRACE.enable()
+    if not (ignore_existing or (account_id and user_token)):
+        raise click.UsageError("--account-id and --user-token are required unless --ignore-existing is given.")
+    output = output or f"{tasks_file}{PLAN_FILE_SUFFIX}"
+    try:
+        project_index = load_project_index(config_file)
+    except ProjectConfigError as e:
+        LOG.error(f"{config_file}: {e}")
+        sys.exit(1)
+
+    api = None
+    if not ignore_existing:
+        api = TMetricsAPI(
+            account_id=account_id, token=user_token, host=host, max_retries=max_retries, timeout=request_timeout
+        )
+    store = _open_store(api, account_id, cache_db, offline, refresh) if api else None
+    journal_path = f"{output}{JOURNAL_SUFFIX}"
+    journal = PushJournal(journal_path) if os.path.exists(journal_path) else None
+    plan_cache = None if no_plan_cache else PlanCache(f"{tasks_file}{PLAN_CACHE_SUFFIX}")
+    try:
+        period_list = METRICS.timed_iter("parse", TasksParser(project_index=project_index).parse_file(tasks_file))
+        if api:
+            # Entries applied by run are not excluded: push creates every planned entry, so they must block their slots.
+            period_list = attach_existing_entries(store or api, period_list, journal, None)
+        planner_options = {"engine": engine, "time_budget_sec": plan_time_budget}
+        planner_list = plan_periods_cached(period_list, plan_cache, jobs, planner_options)
+    except (TaskParsingError, AggregatedTaskParsingError) as e:
+        LOG.error(f"Invalid tasks file:\n{e}")
+        sys.exit(1)
+    except NotFullyPlannedError as e:
+        _log_not_fully_planned(e)
+        sys.exit(1)
+    finally:
+        for resource in (journal, store, api):
+            if resource:
+                resource.close()
+
+    for planner in planner_list:
+        _print_trace(planner.trace_events)
+        LOG.info(
+            f"{planner.start_date} - {planner.end_date}: {len(planner.get_scheduled_tasks())} time entries, "
+            f"{planner.get_total_planned_time()}"
+        )
+    header = write_plan_file(output, planner_list)
+    LOG.info(f"Wrote {header.task_count} time entries of {header.period_count} periods to {output}")
+
+
+@cli.command()
+@add_click_options(_account_options)
+@add_click_options(_client_options)
+@add_click_options(_common_options)
+@add_click_options(_confirm_options)
+@click.option("--plan-file", type=click.Path(exists=True, dir_okay=False), required=True, help="File written by plan.")
+@add_click_options(_push_options)
+@click.option(
+    "--journal-file",
+    type=click.Path(dir_okay=False),
+    help=f"Where pushed time entries are recorded, so a rerun skips them. [default: <plan-file>{JOURNAL_SUFFIX}]",
+)
+@click.option("--no-journal", is_flag=True, default=False, help="Do not record nor skip already pushed time entries.")
+@add_click_options(_profile_options)
+def push(  # noqa: PLR0913
+    verbose,
+    account_id,
+    user_token,
+    host,
+    max_retries,
+    request_timeout,
+    plan_file,
+    concurrency,
+    rate_limit,
+    journal_file,
+    no_journal,
+    profile,
+    cprofile,
+    dry_run,
+    assume_yes,
+):
+    """Push the time entries of a plan file written by plan.
+
+    The whole file is validated first, so a malformed or truncated one pushes nothing. It is then streamed into the
+    API without planning again, with confirmation asked once up front.
+    """
+    config_logger(verbose=verbose)
+    click.get_current_context().with_resource(profile_run(profile, cprofile))
+    try:
+        header = validate_plan_file(plan_file)
+    except PlanFileError as e:
+        LOG.error(str(e))
+        sys.exit(1)
+    LOG.info(
+        f"{plan_file}: {header.task_count} time entries of {header.period_count} periods, planned {header.created_at}"
+    )
+    question = f"Push {header.task_count} time entries?"
+    if dry_run or not header.task_count or not (assume_yes or _confirm(question)):
+        return
+
+    api = TMetricsAPI(
+        account_id=account_id,
+        token=user_token,
+        host=host,
+        pool_size=max(DEFAULT_POOL_SIZE, concurrency),
+        max_retries=max_retries,
+        timeout=request_timeout,
+        rate_limiter=RateLimiter(rate=rate_limit, burst=concurrency),
+    )
+    journal = None if no_journal else PushJournal(journal_file or f"{plan_file}{JOURNAL_SUFFIX}")
+    try:
+        report = push_tasks(api, iter_planned_tasks(plan_file), concurrency=concurrency, journal=journal)
+    finally:
+        if journal:
+            journal.close()
+        api.close()
+    report.log_summary()
+    if report.get_failed():
+        LOG.error(f"Failed to push {len(report.get_failed())} time entries.")
+        sys.exit(1)
+
+
+@cli.command()
+@add_click_options(_account_options)
+@add_click_options(_client_options)
+@add_click_options(_store_options)
+@add_click_options(_verbose_options)
+@click.option("--start-date", type=click.DateTime(REPORT_DATE_FORMATS), required=True, help="First day of the report.")
+@click.option("--end-date", type=click.DateTime(REPORT_DATE_FORMATS), required=True, help="Last day of the report.")
+@click.option(
+    "--group-by",
+    type=click.Choice(GROUP_FIELDS),
+    multiple=True,
+    help="Sum time entries per distinct values of these fields, can be repeated. [default: one row per time entry]",
+)
+@click.option(
+    "--format", "report_format", type=click.Choice(REPORT_FORMATS), default=REPORT_FORMATS[0], show_default=True
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, allow_dash=True),
+    default="-",
+    show_default=True,
+    help="File to write the report to, - for stdout.",
+)
+@click.option(
+    "--window-days",
+    default=DEFAULT_REPORT_WINDOW_DAYS,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Days of time entries fetched per request.",
+)
+def report(  # noqa: PLR0913
+    verbose,
+    account_id,
+    user_token,
+    host,
+    max_retries,
+    request_timeout,
+    cache_db,
+    offline,
+    refresh,
+    start_date,
+    end_date,
+    group_by,
+    report_format,
+    output,
+    window_days,
+):
+    """Export tracked time entries of a date range, or their sums, as CSV or JSON lines.
+
+    Time entries are fetched window by window and rows are written as soon as they are complete, so memory stays
+    flat however long the range is.
+    """
+    config_logger(verbose=verbose)
+    if start_date > end_date:
+        raise click.BadParameter("must not be before --start-date", param_hint="--end-date")
+    api = TMetricsAPI(
+        account_id=account_id, token=user_token, host=host, max_retries=max_retries, timeout=request_timeout
+    )
+    store = _open_store(api, account_id, cache_db, offline, refresh)
+    start = time.perf_counter()
+    try:
+        entries = iter_time_entries(store or api, start_date.date(), end_date.date(), window_days)
+        rows = aggregate_time_entries(entries, group_by) if group_by else map(to_entry_row, entries)
+        with click.open_file(output, "w", encoding="utf-8") as output_file:
+            row_count = write_report_rows(rows, get_report_fields(group_by), output_file, report_format)
+    finally:
+        if store:
+            store.close()
+        api.close()
+    LOG.info(
+        f"Wrote {row_count} rows for {start_date.date()} - {end_date.date()} in {time.perf_counter() - start:.1f}s"
+    )
+
+
+def _read_commands(command_queue: "queue.Queue[str]"):
+    """Queue the lines of stdin as commands. The end of input quits only when typed in a terminal."""
+    for line in sys.stdin:
+        command_queue.put(line.strip().lower())
+    if sys.stdin.isatty():
+        command_queue.put(QUIT_COMMANDS[0])
+    else:
+        LOG.info("End of input, no more commands are read. Watching until interrupted.")
+
+
+def _interrupt(signal_number, _frame):
+    raise KeyboardInterrupt(signal.Signals(signal_number).name)
+
+
+def _display_watched(watcher: TasksWatcher, changed_list: list[WatchedPeriod], elapsed_sec: float):
+    for period in changed_list:
+        if period.planner:
+            period.planner.display_current_plan()
+            _print_trace(period.planner.trace_events)
+    for error in watcher.get_errors():
+        LOG.error(error)
+    LOG.info(
+        f"{len(watcher.periods)} periods, {len(changed_list)} replanned in {elapsed_sec * 1000:.0f}ms. "
+        "Watching for changes, type push, reload or quit."
+    )
+
+
+def _push_watched(  # noqa: PLR0913
+    api: TMetricsAPI,
+    watcher: TasksWatcher,
+    journal: PushJournal | None,
+    plan_cache: PlanCache | None,
+    concurrency: int,
+    dry_run: bool,
+):
+    """Push the current plans, typing push being the confirmation. Nothing is pushed while any period has errors."""
+    errors = watcher.get_errors()
+    if errors:
+        LOG.error(f"Not pushing, fix {len(errors)} errors first.")
+        return
+    if dry_run:
+        LOG.info("Dry run, not pushing.")
+        return
+    planner_list = [period.planner for period in watcher.periods if period.planner]
+    report = push_plans(api, planner_list, journal, plan_cache, concurrency)
+    if report.get_failed():
+        LOG.error(f"Failed to push {len(report.get_failed())} time entries.")
+
+
+def _plan_and_push(  # noqa: PLR0913
+    api: TMetricsAPI,
+    period_list,
+    journal: PushJournal | None,
+    plan_cache: PlanCache | None,
+    parallel: bool,
+    jobs: int | None,
+    planner_options: dict,
+    concurrency: int,
+    dry_run: bool,
+    assume_yes: bool,
+) -> PushReport:
+    if parallel:
+        planner_list = plan_periods_cached(period_list, plan_cache, jobs, planner_options)
+        for planner in planner_list:
+            planner.display_current_plan()
+            _print_trace(planner.trace_events)
+        confirm = _get_confirmation(f"Push all {len(planner_list)} periods?", dry_run, assume_yes)
+        return push_plans(api, planner_list, journal, plan_cache, concurrency, confirm)
+
+    report = PushReport()
+    for period in period_list:
+        planner = plan_period_cached(period, plan_cache, planner_options, jobs)
         planner.display_current_plan()
-        if not dry_run and (assume_yes or query_yes_no(question="Are you sure?")):
-            planner.apply_plan(api)
+        _print_trace(planner.trace_events)
+        confirm = _get_confirmation("Are you sure?", dry_run, assume_yes)
+        report.merge(push_plans(api, [planner], journal, plan_cache, concurrency, confirm))
+    return report
+
+
+def _print_trace(trace_events: list):
+    if trace_events:
+        print(f"Planner trace:\n{render_trace(trace_events)}")
+
+
+def _log_not_fully_planned(error: NotFullyPlannedError):
+    LOG.error(str(error))
+    if error.trace_events:
+        _print_trace(error.trace_events)
+    else:
+        LOG.info("Run with --trace to see why the planner left them out.")
+
+
+def _get_confirmation(question: str, dry_run: bool, assume_yes: bool) -> Callable[[], bool]:
+    return lambda: not dry_run and (assume_yes or _confirm(question))
+
+
+def _confirm(question: str) -> bool:
+    with METRICS.phase("confirm"):
+        return query_yes_no(question=question)
+
+
+def _open_store(api: TMetricsAPI, account_id, cache_db: str | None, offline: bool, refresh: bool) -> LocalStore | None:
+    if (offline or refresh) and not cache_db:
+        raise click.UsageError("--offline and --refresh require --cache-db.")
+    if offline and refresh:
+        raise click.UsageError("--refresh cannot fetch with --offline.")
+    if not cache_db:
+        return None
+    return LocalStore(cache_db, api, account_id, offline=offline, refresh=refresh)
 
 
 if __name__ == "__main__":